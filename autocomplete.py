@@ -0,0 +1,163 @@
+# autocomplete.py
+import bisect
+import heapq
+import tkinter as tk
+
+MAX_SUGGESTIONS = 8  # Anzahl der angezeigten Vorschläge
+PREFIX_END = chr(0x10FFFF)  # Größtmögliches Zeichen, begrenzt den Bereich eines Präfixes im sortierten Index
+
+class PrefixIndex:
+    """
+    Sortierter Präfixindex über unterschiedliche Werte einer Spalte.
+    Vorschläge werden per binärer Suche gefunden und nach Häufigkeit sortiert.
+    """
+    def __init__(self, value_counts=()):
+        """
+        :param value_counts: Paare aus Wert und Häufigkeit, z. B. aus database.load_value_counts.
+        """
+        self.counts = {}
+        for value, count in value_counts:
+            if value:
+                value = str(value)
+                self.counts[value] = self.counts.get(value, 0) + count
+        # Einträge (Suchschlüssel, Wert) sortiert nach Suchschlüssel, ohne Berücksichtigung der Groß-/Kleinschreibung
+        self.keys = sorted((value.casefold(), value) for value in self.counts)
+
+    def add(self, value, count=1):
+        """
+        Nimmt einen Wert in den Index auf oder erhöht seine Häufigkeit.
+
+        :param value: Der Wert.
+        :param count: Um wie viel die Häufigkeit erhöht werden soll.
+        """
+        if not value:
+            return
+        value = str(value)
+        if value not in self.counts:
+            bisect.insort(self.keys, (value.casefold(), value))
+            self.counts[value] = 0
+        self.counts[value] += count
+
+    def discard(self, value, count=1):
+        """
+        Verringert die Häufigkeit eines Wertes und entfernt ihn, wenn er nicht mehr vorkommt.
+
+        :param value: Der Wert.
+        :param count: Um wie viel die Häufigkeit verringert werden soll.
+        """
+        value = str(value) if value else value
+        if value not in self.counts:
+            return
+        self.counts[value] -= count
+        if self.counts[value] <= 0:
+            del self.counts[value]
+            key = (value.casefold(), value)
+            position = bisect.bisect_left(self.keys, key)
+            if position < len(self.keys) and self.keys[position] == key:
+                del self.keys[position]
+
+    def suggest(self, prefix, limit=MAX_SUGGESTIONS):
+        """
+        Liefert die häufigsten Werte, die mit dem angegebenen Präfix beginnen.
+
+        :param prefix: Der bisher eingegebene Text.
+        :param limit: Die maximale Anzahl der Vorschläge.
+        :return: Eine Liste von Werten, die häufigsten zuerst.
+        """
+        if not prefix:
+            return []
+        prefix = prefix.casefold()
+        low = bisect.bisect_left(self.keys, (prefix,))
+        high = bisect.bisect_left(self.keys, (prefix + PREFIX_END,), low)
+        if high - low <= limit:
+            candidates = self.keys[low:high]
+        else:
+            candidates = heapq.nlargest(limit, self.keys[low:high], key=lambda key: self.counts[key[1]])
+        return [value for _, value in sorted(candidates, key=lambda key: -self.counts[key[1]])]
+
+class AutocompleteEntry(tk.Entry):
+    """
+    Eingabefeld, das beim Tippen Vorschläge aus einem PrefixIndex in einer Liste unterhalb des Feldes anzeigt.
+    """
+    def __init__(self, master, index=None, max_suggestions=MAX_SUGGESTIONS, **kwargs):
+        super().__init__(master, **kwargs)
+        self.index = index
+        self.max_suggestions = max_suggestions
+        self.popup = None
+        self.listbox = None
+
+        self.bind('<KeyRelease>', self.on_key_release)
+        self.bind('<Down>', self.on_down)
+        self.bind('<Up>', self.on_up)
+        self.bind('<Return>', self.on_return)
+        self.bind('<Escape>', lambda event: self.hide_suggestions())
+        # Verzögert schließen, damit ein Klick in die Vorschlagsliste noch ankommt
+        self.bind('<FocusOut>', lambda event: self.after(150, self.hide_suggestions))
+        self.bind('<Destroy>', lambda event: self.hide_suggestions())
+
+    def on_key_release(self, event):
+        if event.keysym in ('Up', 'Down', 'Return', 'Escape', 'Tab'):
+            return
+        suggestions = self.index.suggest(self.get(), self.max_suggestions) if self.index else []
+        # Keine Liste anzeigen, wenn der einzige Vorschlag bereits eingegeben ist
+        if not suggestions or suggestions == [self.get()]:
+            self.hide_suggestions()
+        else:
+            self.show_suggestions(suggestions)
+
+    def show_suggestions(self, suggestions):
+        """ Zeigt die Vorschläge in einem rahmenlosen Fenster direkt unter dem Eingabefeld an. """
+        if self.popup is None:
+            self.popup = tk.Toplevel(self)
+            self.popup.overrideredirect(True)
+            self.listbox = tk.Listbox(self.popup, exportselection=False)
+            self.listbox.pack(fill=tk.BOTH, expand=True)
+            self.listbox.bind('<ButtonRelease-1>', lambda event: self.accept_suggestion())
+
+        self.listbox.delete(0, tk.END)
+        for suggestion in suggestions:
+            self.listbox.insert(tk.END, suggestion)
+        self.listbox.configure(height=len(suggestions))
+        self.popup.geometry(f"{self.winfo_width()}x{self.listbox.winfo_reqheight()}"
+                            f"+{self.winfo_rootx()}+{self.winfo_rooty() + self.winfo_height()}")
+        self.popup.lift()
+
+    def hide_suggestions(self):
+        if self.popup is not None:
+            self.popup.destroy()
+            self.popup = None
+            self.listbox = None
+
+    def move_selection(self, step):
+        if self.listbox is None:
+            return
+        current = self.listbox.curselection()
+        position = (current[0] + step) if current else (0 if step > 0 else self.listbox.size() - 1)
+        position = max(0, min(position, self.listbox.size() - 1))
+        self.listbox.selection_clear(0, tk.END)
+        self.listbox.selection_set(position)
+        self.listbox.see(position)
+
+    def on_down(self, event):
+        self.move_selection(1)
+        return "break"
+
+    def on_up(self, event):
+        self.move_selection(-1)
+        return "break"
+
+    def on_return(self, event):
+        if self.listbox is not None and self.listbox.curselection():
+            self.accept_suggestion()
+            return "break"
+
+    def accept_suggestion(self):
+        """ Übernimmt den markierten Vorschlag in das Eingabefeld. """
+        selection = self.listbox.curselection() if self.listbox is not None else ()
+        if selection:
+            value = self.listbox.get(selection[0])
+            self.delete(0, tk.END)
+            self.insert(0, value)
+            self.icursor(tk.END)
+        self.hide_suggestions()
+        self.focus_set()
@@ -1,52 +1,214 @@
 # config.py
 import json
 import os
+import time
 from tkinter import filedialog, messagebox
 
 CONFIG_FILE = 'config.json'
+DEFAULT_DATABASE = 'default.db'
+DEFAULT_CATEGORIES = ['Finanzen', 'Lohnabrechnungen', 'Versicherungen']
+DEFAULT_EXTENSIONS = ['.jpeg', '.jpg', '.pdf']
+CHECK_INTERVAL = 1.0  # Sekunden, in denen der Änderungszeitpunkt der Konfigurationsdatei höchstens einmal geprüft wird
+
+# Erlaubte Schlüssel mit Typ und Standardwert (None = optional, ohne Standardwert)
+SCHEMA = {
+    'file_path': (str, os.getcwd),
+    'categories': (list, lambda: list(DEFAULT_CATEGORIES)),
+    'extensions': (list, lambda: list(DEFAULT_EXTENSIONS)),
+    'database': (str, lambda: DEFAULT_DATABASE),
+    'libraries': (list, None),
+    'active_library': (str, None),
+    'ingestion': (dict, None),
+    'duplicates': (dict, None),
+    'watcher': (dict, None),
+    'poll_interval_ms': (int, None),
+    'maintenance_idle_s': ((int, float), None),
+    'backup_dir': (str, None),
+    'backup_keep': (int, None),
+}
+
+_cache = {'key': None, 'checked': 0.0, 'config': None}
+# Die in diesem Prozess gewählte Bibliothek; hat Vorrang vor 'active_library' in der gemeinsam genutzten Datei,
+# damit der Wechsel in einer anderen Instanz nicht die Datenbank dieser Instanz austauscht
+_session = {'library': None}
 
 def load_or_create_config():
-    """ Lädt die Konfigurationsdatei oder erstellt eine neue, wenn sie nicht existiert. """
+    """
+    Erstellt die Konfigurationsdatei mit Standardwerten, wenn sie nicht existiert, legt die Kategorieordner an
+    und liefert die Konfiguration. Für den Start der Anwendung gedacht; alle übrigen Stellen verwenden get_config.
+    """
     if not os.path.isfile(CONFIG_FILE):
-        config = {
-            'file_path': os.getcwd(),
-            'categories': ['Finanzen', 'Lohnabrechnungen', 'Versicherungen'],
-            'extensions': ['.jpeg', '.jpg', '.pdf']
-        }
-        with open(CONFIG_FILE, 'w') as configfile:
-            json.dump(config, configfile, indent=4)
-    else:
-        with open(CONFIG_FILE, 'r') as configfile:
-            config = json.load(configfile)
-            
-    # Ordner gemäß der Kategorienbezeichnungen anlegen, wenn sie noch nicht existieren
-    for category in config['categories']:
-        category_path = os.path.join(config['file_path'], category)
-        if not os.path.exists(category_path):
-            os.makedirs(category_path)
-            # Benutzer über die Erstellung des Ordners informieren
-            messagebox.showinfo("Information", f"Ordner '{category}' wurde erstellt.")
-            
+        save_config({key: SCHEMA[key][1]() for key in ('file_path', 'categories', 'extensions')})
+    ensure_category_folders()
+    return get_config()
+
+def ensure_category_folders():
+    """ Legt die Ordner gemäß der Kategorienbezeichnungen in allen Bibliotheken an, wenn sie noch nicht existieren. """
+    libraries = library_list(get_config())
+    for library in libraries:
+        if len(libraries) > 1 and not os.path.isdir(library['file_path']):
+            # Ein nicht eingebundenes Laufwerk nicht neu anlegen
+            print(f"Bibliothek '{library['name']}' ist nicht erreichbar: {library['file_path']}")
+            continue
+        for category in library['categories']:
+            category_path = os.path.join(library['file_path'], category)
+            if not os.path.exists(category_path):
+                os.makedirs(category_path)
+                # Benutzer über die Erstellung des Ordners informieren
+                messagebox.showinfo("Information", f"Ordner '{category}' wurde erstellt.")
+
+def get_config():
+    """
+    Liefert die geprüfte Konfiguration. Die Datei wird nur neu gelesen, wenn sich ihr Änderungszeitpunkt oder
+    ihre Größe geändert hat. Stammordner, Datenbank und Kategorien entsprechen der aktiven Bibliothek.
+
+    Das zurückgegebene Dictionary wird zwischengespeichert und darf nicht verändert werden;
+    Änderungen werden über read_config und save_config gespeichert.
+    """
+    now = time.monotonic()
+    if _cache['config'] is not None and now - _cache['checked'] < CHECK_INTERVAL:
+        return _cache['config']
+    _cache['checked'] = now
+    try:
+        stat = os.stat(CONFIG_FILE)
+        key = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        key = None
+    if _cache['config'] is None or key != _cache['key']:
+        try:
+            raw = read_config()
+        except (OSError, ValueError) as e:
+            print(f"Konfigurationsdatei konnte nicht gelesen werden: {e}")
+            if _cache['config'] is not None:
+                return _cache['config']
+            raw = {}
+        config = validate(raw)
+        apply_library(config, active_library(config))
+        _cache['config'] = config
+        _cache['key'] = key
+    return _cache['config']
+
+def validate(raw):
+    """
+    Prüft eine gelesene Konfiguration gegen SCHEMA. Fehlende Pflichtschlüssel erhalten ihren Standardwert,
+    Werte mit falschem Typ werden gemeldet und durch den Standardwert ersetzt bzw. entfernt.
+    Unbekannte Schlüssel bleiben erhalten.
+
+    :param raw: Das gelesene Konfigurationsdictionary.
+    :return: Ein neues, geprüftes Konfigurationsdictionary.
+    """
+    config = dict(raw)
+    for key, (expected, default) in SCHEMA.items():
+        value = config.get(key)
+        if value is not None and not isinstance(value, expected):
+            print(f"Konfiguration: '{key}' hat einen ungültigen Wert und wird ignoriert: {value!r}")
+            value = None
+        if value is None:
+            config.pop(key, None)
+            if default is not None:
+                config[key] = default()
+    config['extensions'] = sorted(suffix_set(config['extensions']))
+    if 'libraries' in config:
+        libraries = [library for library in config['libraries']
+                     if isinstance(library, dict) and isinstance(library.get('name'), str) and isinstance(library.get('file_path'), str)]
+        if len(libraries) != len(config['libraries']):
+            print("Konfiguration: Bibliotheken ohne Name oder Stammordner werden ignoriert.")
+        config['libraries'] = libraries
     return config
 
+def suffix_set(extensions):
+    """ Bereitet Dateiendungen für den Vergleich auf: Kleinbuchstaben mit führendem Punkt, als Menge. """
+    return frozenset(extension.lower() if extension.startswith('.') else '.' + extension.lower()
+                     for extension in extensions if isinstance(extension, str) and extension)
+
+def library_list(config):
+    """
+    Liefert die konfigurierten Bibliotheken, jede mit eigenem Stammordner und eigener Datenbank.
+    Ohne den Schlüssel 'libraries' ergeben file_path, database und categories eine einzige Bibliothek.
+
+    :param config: Das Konfigurationsdictionary.
+    :return: Eine Liste von Dictionaries mit name, file_path, database und categories.
+    """
+    if not config.get('libraries'):
+        return [{
+            'name': 'Standard',
+            'file_path': config['file_path'],
+            'database': config.get('database', DEFAULT_DATABASE),
+            'categories': config['categories'],
+        }]
+    return [{
+        'name': library['name'],
+        'file_path': library['file_path'],
+        'database': library.get('database', os.path.join(library['file_path'], DEFAULT_DATABASE)),
+        'categories': library.get('categories', config.get('categories', [])),
+    } for library in config['libraries']]
+
+def active_library(config):
+    """ Liefert die in diesem Prozess bzw. unter 'active_library' gewählte Bibliothek, sonst die erste. """
+    libraries = library_list(config)
+    for name in (_session['library'], config.get('active_library')):
+        for library in libraries:
+            if library['name'] == name:
+                return library
+    return libraries[0]
+
+def set_active_library(name):
+    """
+    Legt die aktive Bibliothek für diesen Prozess fest. Datenbankzugriffe ohne ausdrückliche Datenbankdatei
+    verwenden danach ihre Datenbank, auch wenn eine andere Instanz die Konfigurationsdatei ändert.
+    """
+    _session['library'] = name
+    _cache['config'] = None
+
+def apply_library(config, library):
+    """
+    Übernimmt Stammordner, Datenbank und Kategorien einer Bibliothek in das Konfigurationsdictionary,
+    damit die übrigen Funktionen unverändert mit der aktiven Bibliothek arbeiten.
+    """
+    config['file_path'] = library['file_path']
+    config['database'] = library['database']
+    config['categories'] = library['categories']
+
+def read_config():
+    """
+    Liest die Konfigurationsdatei ungeprüft, ohne Ordner anzulegen oder Meldungen anzuzeigen,
+    z. B. um sie zu ändern und mit save_config zu speichern.
+
+    :return: Das Konfigurationsdictionary oder ein leeres Dictionary, wenn keine Konfigurationsdatei existiert.
+    """
+    if not os.path.isfile(CONFIG_FILE):
+        return {}
+    with open(CONFIG_FILE, 'r') as configfile:
+        return json.load(configfile)
+
 def save_config(config):
     """
     Speichert die aktuelle Konfiguration in der Konfigurationsdatei.
-    
+
     :param config: Das Konfigurationsdictionary, das gespeichert werden soll.
     """
     with open(CONFIG_FILE, 'w') as configfile:
         json.dump(config, configfile, indent=4)
-    
+    # Nicht auf den Änderungszeitpunkt verlassen, dessen Auflösung auf Netzlaufwerken grob sein kann
+    _cache['config'] = None
+
 def change_default_path():
     """
     Ermöglicht dem Benutzer, den Standardpfad für die Dokumentenspeicherung zu ändern.
     """
     new_path = filedialog.askdirectory()
     if new_path:
-        config = load_or_create_config()
-        config['file_path'] = new_path
+        config = read_config()
+        if config.get('libraries'):
+            # Bei mehreren Bibliotheken gilt der Pfad für die aktive Bibliothek
+            name = active_library(validate(config))['name']
+            for library in config['libraries']:
+                if library['name'] == name:
+                    library['file_path'] = new_path
+        else:
+            config['file_path'] = new_path
         save_config(config)
+        ensure_category_folders()
         messagebox.showinfo("Erfolg", f"Der neue Standardpfad '{new_path}' wurde gespeichert.")
 
-            
+
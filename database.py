@@ -1,44 +1,235 @@
 # database.py
 import os
+import json
 import sqlite3
 from tkinter import messagebox
 import config
-from config import load_or_create_config
 import time
-import gui
+from collections import namedtuple
+import metadata
 
 DATABASE_FILE = 'default.db'
-config = load_or_create_config()
+BUSY_TIMEOUT = 10  # Sekunden, die auf eine von einer anderen Instanz gesperrte Datenbank gewartet wird
+WRITE_RETRIES = 5  # Anzahl der Versuche für Schreibzugriffe, wenn die Datenbank trotzdem gesperrt ist
+RETRY_DELAY = 0.2  # Anfangswartezeit zwischen zwei Versuchen in Sekunden (verdoppelt sich je Versuch)
+CHANGELOG_KEEP = 10000  # Anzahl der Einträge, die im Änderungsprotokoll behalten werden
+AUTOCOMPLETE_COLUMNS = ['beschreibung', 'kategorie', 'autor']
+DOCUMENT_COLUMNS = ('beschreibung', 'kategorie', 'seitenzahl', 'erstelldatum', 'link', 'autor')
+JOURNAL_KEEP_ROWS = 200000  # Höchstzahl der Deltas im Journal; ältere Vorgänge werden vollständig verworfen
+JOURNAL_KEEP_OPERATIONS = 100  # Höchstzahl der Vorgänge im Journal
+MIN_SQLITE_VERSION = (3, 33, 0)  # UPDATE ... FROM im Journal (apply_deltas); zusätzlich werden die JSON-Funktionen benötigt
 
-def connect_db():
-    """ Stellt eine Verbindung zur SQLite-Datenbank her und gibt diese zurück. """
-    db_name = config.get('database', DATABASE_FILE)
+# Ergebnis einer Abfrage des Änderungsprotokolls: geänderte Zeilen, gelöschte IDs und ob ein vollständiges Neuladen nötig ist
+ChangeSet = namedtuple('ChangeSet', ['rows', 'deleted_ids', 'full_reload'])
+
+def connect_db(db_name=None, report=True):
+    """
+    Stellt eine Verbindung zur SQLite-Datenbank her und gibt diese zurück.
+
+    :param db_name: Die Datenbankdatei einer anderen Bibliothek, standardmäßig die der aktiven Bibliothek.
+    :param report: True, um Fehler in einem Dialog anzuzeigen; Hintergrund-Threads übergeben False, da Tk nicht
+                   threadsicher ist, und erhalten Fehler nur als Ausgabe.
+    :return: Die Verbindung oder None, wenn die Datenbank nicht geöffnet werden kann.
+    """
+    db_name = db_name or config.get_config().get('database', DATABASE_FILE)
     db_path = os.path.dirname(db_name)
         
     if not db_path:
         db_path = os.getcwd()
         
-    if db_path and not os.path.exists(db_path):
-        os.makedirs(db_path)
-            
     try:
-        return sqlite3.connect(db_name)
-    except sqlite3.Error as e:
-        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        if db_path and not os.path.exists(db_path):
+            os.makedirs(db_path)
+        # Der Timeout setzt den Busy-Handler, damit gleichzeitige Instanzen auf Sperren warten
+        conn = sqlite3.connect(db_name, timeout=BUSY_TIMEOUT)
+        conn.create_function('tag_key', 1, tag_key, deterministic=True)
+        return conn
+    except (sqlite3.Error, OSError) as e:
+        if report:
+            messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        else:
+            print(f"Datenbank {db_name} konnte nicht geöffnet werden: {e}")
         return None
 
-def create_table():
+def tag_key(name):
+    """
+    Liefert den Suchschlüssel eines Tags. Anders als COLLATE NOCASE, das nur ASCII-Buchstaben angleicht,
+    gilt casefold für alle Zeichen, z. B. auch für Umlaute. In SQL als Funktion tag_key verfügbar.
+    """
+    return None if name is None else str(name).casefold()
+
+def is_locked_error(error):
+    """ Prüft, ob ein Fehler von einer gesperrten Datenbank herrührt. """
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+def execute_with_retry(cursor, query, params=()):
+    """
+    Führt eine schreibende Anweisung aus und wiederholt sie mit wachsender Wartezeit,
+    solange die Datenbank von einer anderen Instanz gesperrt ist.
+
+    :param cursor: Der Cursor, über den die Anweisung ausgeführt wird.
+    :param query: Die SQL-Anweisung.
+    :param params: Die Parameter der SQL-Anweisung.
+    """
+    for attempt in range(WRITE_RETRIES):
+        try:
+            return cursor.execute(query, params)
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY * (2 ** attempt))
+
+def commit_with_retry(conn):
+    """ Schreibt eine Transaktion fest und wiederholt den Versuch, solange die Datenbank gesperrt ist. """
+    for attempt in range(WRITE_RETRIES):
+        try:
+            return conn.commit()
+        except sqlite3.OperationalError as e:
+            if not is_locked_error(e) or attempt == WRITE_RETRIES - 1:
+                raise
+            time.sleep(RETRY_DELAY * (2 ** attempt))
+
+def check_sqlite_features(conn):
+    """ Prüft, ob die SQLite-Bibliothek alle vom Journal benötigten Funktionen bietet. """
+    if sqlite3.sqlite_version_info < MIN_SQLITE_VERSION:
+        raise sqlite3.NotSupportedError(f"SQLite {sqlite3.sqlite_version} ist zu alt, benötigt wird mindestens "
+                                        f"{'.'.join(map(str, MIN_SQLITE_VERSION))}")
+    try:
+        conn.execute("SELECT json_object('a', 1)")
+    except sqlite3.OperationalError:
+        raise sqlite3.NotSupportedError("SQLite wurde ohne JSON-Funktionen (json1) erstellt")
+
+def create_table(db_name=None):
     """ Erstellt die Tabelle in der SQLite-Datenbank, falls sie noch nicht existiert. """
     try:
-        with connect_db() as conn:
+        with connect_db(db_name) as conn:
             if conn is not None:
+                check_sqlite_features(conn)
                 cursor = conn.cursor()
-                cursor.execute('''CREATE TABLE IF NOT EXISTS dokumente
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS dokumente
                                 (id INTEGER PRIMARY KEY, beschreibung TEXT, kategorie TEXT, seitenzahl TEXT, erstelldatum TEXT, link TEXT, autor TEXT)''')
-                conn.commit()
+
+                # Änderungsprotokoll, über das mehrere Instanzen mit derselben Datenbank ihre Ansicht abgleichen
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS aenderungen
+                                (version INTEGER PRIMARY KEY AUTOINCREMENT, dokument_id INTEGER NOT NULL, aktion TEXT NOT NULL)''')
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS dokumente_nach_insert AFTER INSERT ON dokumente
+                                BEGIN
+                                    INSERT INTO aenderungen (dokument_id, aktion) VALUES (NEW.id, 'I');
+                                END''')
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS dokumente_nach_update AFTER UPDATE ON dokumente
+                                BEGIN
+                                    INSERT INTO aenderungen (dokument_id, aktion) SELECT OLD.id, 'D' WHERE OLD.id <> NEW.id;
+                                    INSERT INTO aenderungen (dokument_id, aktion) VALUES (NEW.id, 'U');
+                                END''')
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS dokumente_nach_delete AFTER DELETE ON dokumente
+                                BEGIN
+                                    INSERT INTO aenderungen (dokument_id, aktion) VALUES (OLD.id, 'D');
+                                END''')
+
+                # Aus den EXIF-Daten gelesene Bildmetadaten, werden mit dem Dokument gelöscht
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS bildmetadaten
+                                (dokument_id INTEGER PRIMARY KEY, aufnahmedatum TEXT, orientierung INTEGER, breite INTEGER, hoehe INTEGER)''')
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS bildmetadaten_loeschen AFTER DELETE ON dokumente
+                                BEGIN
+                                    DELETE FROM bildmetadaten WHERE dokument_id = OLD.id;
+                                END''')
+
+                # Dateisystemmerkmale und Fingerabdruck des Inhalts, ermittelt beim Einlesen neuer Dateien
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS dateiinfo
+                                (dokument_id INTEGER PRIMARY KEY, groesse INTEGER, mtime_ns INTEGER, geraet INTEGER, inode INTEGER, fingerabdruck TEXT)''')
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS dateiinfo_loeschen AFTER DELETE ON dokumente
+                                BEGIN
+                                    DELETE FROM dateiinfo WHERE dokument_id = OLD.id;
+                                END''')
+                execute_with_retry(cursor, "CREATE INDEX IF NOT EXISTS idx_dokumente_link ON dokumente (link)")
+
+                # Tags als Ergänzung zur Kategorie: ein Dokument kann beliebig viele Tags tragen
+                # Eindeutig ist der Schlüssel tag_key(name), damit z. B. 'Übersicht' und 'übersicht' dasselbe Tag sind
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS tags
+                                (id INTEGER PRIMARY KEY, name TEXT NOT NULL, schluessel TEXT NOT NULL)''')
+                if 'schluessel' not in {row[1] for row in cursor.execute("PRAGMA table_info(tags)")}:
+                    migrate_tag_keys(cursor)
+                execute_with_retry(cursor, "CREATE UNIQUE INDEX IF NOT EXISTS idx_tags_schluessel ON tags (schluessel)")
+                # Der Primärschlüssel dient als Index je Dokument, der zweite Index für die Suche nach Tags
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS dokument_tags
+                                (dokument_id INTEGER NOT NULL, tag_id INTEGER NOT NULL, PRIMARY KEY (dokument_id, tag_id)) WITHOUT ROWID''')
+                execute_with_retry(cursor, "CREATE INDEX IF NOT EXISTS idx_dokument_tags_tag ON dokument_tags (tag_id, dokument_id)")
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS dokument_tags_loeschen AFTER DELETE ON dokumente
+                                BEGIN
+                                    DELETE FROM dokument_tags WHERE dokument_id = OLD.id;
+                                END''')
+                # Geänderte Tags vermerken add_tags und remove_tags einmal je Dokument als Aktion 'T' im Änderungsprotokoll;
+                # die früheren Trigger schrieben einen Eintrag je Zuordnung
+                execute_with_retry(cursor, "DROP TRIGGER IF EXISTS dokument_tags_nach_insert")
+                execute_with_retry(cursor, "DROP TRIGGER IF EXISTS dokument_tags_nach_delete")
+
+                # MinHash-Signaturen und LSH-Bänder für die Suche nach ähnlichen PDF-Dokumenten (duplicates.py)
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS minhash
+                                (dokument_id INTEGER PRIMARY KEY, mtime_ns INTEGER, schindeln INTEGER, signatur BLOB)''')
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS minhash_baender
+                                (band INTEGER NOT NULL, hash INTEGER NOT NULL, dokument_id INTEGER NOT NULL, PRIMARY KEY (band, hash, dokument_id)) WITHOUT ROWID''')
+                execute_with_retry(cursor, "CREATE INDEX IF NOT EXISTS idx_minhash_baender_dokument ON minhash_baender (dokument_id)")
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS duplikat_paare
+                                (dokument_a INTEGER NOT NULL, dokument_b INTEGER NOT NULL, aehnlichkeit REAL, verworfen INTEGER NOT NULL DEFAULT 0,
+                                 PRIMARY KEY (dokument_a, dokument_b)) WITHOUT ROWID''')
+                execute_with_retry(cursor, "CREATE INDEX IF NOT EXISTS idx_duplikat_paare_b ON duplikat_paare (dokument_b)")
+                execute_with_retry(cursor, '''CREATE TRIGGER IF NOT EXISTS minhash_loeschen AFTER DELETE ON dokumente
+                                BEGIN
+                                    DELETE FROM minhash WHERE dokument_id = OLD.id;
+                                    DELETE FROM minhash_baender WHERE dokument_id = OLD.id;
+                                    DELETE FROM duplikat_paare WHERE dokument_a = OLD.id OR dokument_b = OLD.id;
+                                END''')
+
+                # Letzter Lauf der Wartungsaufgaben (maintenance.py), gemeinsam für alle Instanzen
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS wartung
+                                (aufgabe TEXT PRIMARY KEY, zuletzt REAL, dauer_s REAL, ergebnis TEXT)''')
+
+                # Journal der Änderungen für Rückgängig/Wiederholen: je Vorgang nur die geänderten Spalten der betroffenen
+                # Dokumente als JSON; vorher NULL bzw. nachher NULL steht für ein fehlendes bzw. gelöschtes Dokument
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS journal
+                                (id INTEGER PRIMARY KEY, zeitpunkt REAL, beschreibung TEXT, anzahl INTEGER NOT NULL DEFAULT 0, rueckgaengig REAL)''')
+                execute_with_retry(cursor, '''CREATE TABLE IF NOT EXISTS journal_deltas
+                                (journal_id INTEGER NOT NULL, dokument_id INTEGER NOT NULL, vorher TEXT, nachher TEXT,
+                                 PRIMARY KEY (journal_id, dokument_id)) WITHOUT ROWID''')
+
+                # Indizes für die Autovervollständigung der häufig eingegebenen Felder
+                for column in AUTOCOMPLETE_COLUMNS:
+                    execute_with_retry(cursor, f"CREATE INDEX IF NOT EXISTS idx_dokumente_{column} ON dokumente ({column})")
+
+                trim_changelog(cursor)
+                commit_with_retry(conn)
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten bei der Datenbankoperation: {e}")
 
+def migrate_tag_keys(cursor):
+    """
+    Ergänzt eine Tag-Tabelle aus einer früheren Version um den Schlüssel. Tags, die sich nur in der Schreibweise
+    von Nicht-ASCII-Buchstaben unterscheiden, werden dabei zum ältesten Tag zusammengeführt.
+    """
+    execute_with_retry(cursor, "ALTER TABLE tags ADD COLUMN schluessel TEXT")
+    first_id = {}
+    for tag_id, name in cursor.execute("SELECT id, name FROM tags ORDER BY id").fetchall():
+        key = tag_key(name)
+        if key not in first_id:
+            first_id[key] = tag_id
+            execute_with_retry(cursor, "UPDATE tags SET schluessel = ? WHERE id = ?", (key, tag_id))
+            continue
+        execute_with_retry(cursor, "UPDATE OR IGNORE dokument_tags SET tag_id = ? WHERE tag_id = ?", (first_id[key], tag_id))
+        execute_with_retry(cursor, "DELETE FROM dokument_tags WHERE tag_id = ?", (tag_id,))
+        execute_with_retry(cursor, "DELETE FROM tags WHERE id = ?", (tag_id,))
+
+def trim_changelog(cursor):
+    """
+    Entfernt alte Einträge aus dem Änderungsprotokoll, damit die Tabelle nicht unbegrenzt wächst. Instanzen, die
+    entfernte Einträge noch nicht abgeglichen haben, laden ihre Ansicht vollständig neu.
+
+    :return: Die Anzahl der entfernten Einträge.
+    """
+    execute_with_retry(cursor, "DELETE FROM aenderungen WHERE version <= (SELECT MAX(version) FROM aenderungen) - ?",
+                       (CHANGELOG_KEEP,))
+    return cursor.rowcount
+
 def insert_document(beschreibung, kategorie, seitenzahl, erstelldatum, link, autor):
     try:
         with connect_db() as conn:
@@ -50,33 +241,149 @@ def insert_document(beschreibung, kategorie, seitenzahl, erstelldatum, link, aut
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten bei der Datenbankoperation: {e}")
 
-def insert_file_if_not_exists(file_path, category):
+def insert_file_if_not_exists(file_path, category, jpeg_metadata=None):
     """
     Fügt eine Datei in die Datenbank ein, falls sie noch nicht vorhanden ist.
     
     :param file_path: Der Pfad der Datei.
     :param category: Die Kategorie, unter der die Datei gespeichert werden soll.
+    :param jpeg_metadata: Bereits gelesene JPEG-Metadaten, sonst werden sie bei JPEG-Dateien hier gelesen.
     """
     try:
         with connect_db() as conn:
             cursor = conn.cursor()
             cursor.execute("SELECT * FROM dokumente WHERE link=?", (file_path,))
             if cursor.fetchone() is None:
-                # Dateiinformationen extrahieren
-                beschreibung = time.strftime('%Y%m%d', time.localtime(os.path.getmtime(file_path))) + "_" + os.path.splitext(os.path.basename(file_path))[0]
+                # Dateiinformationen extrahieren, bei JPEG-Bildern bevorzugt aus den EXIF-Daten
+                if jpeg_metadata is None and metadata.is_jpeg(file_path):
+                    jpeg_metadata = metadata.read_jpeg_metadata(file_path)
+                creation_time = metadata.get_creation_time(file_path, jpeg_metadata)
+                beschreibung = time.strftime('%Y%m%d', creation_time) + "_" + os.path.splitext(os.path.basename(file_path))[0]
                 seitenzahl = 1
-                erstelldatum = time.strftime('%d.%m.%Y', time.localtime(os.path.getmtime(file_path)))
+                erstelldatum = time.strftime('%d.%m.%Y', creation_time)
                 autor = "Unbekannt"
                 # Neuen Eintrag in die Datenbank einfügen
                 print(f"Neue Datei gefunden: {file_path}")
-                cursor.execute("INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) VALUES (?, ?, ?, ?, ?, ?)",
+                execute_with_retry(cursor, "INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) VALUES (?, ?, ?, ?, ?, ?)",
                                 (beschreibung, category, seitenzahl, erstelldatum, file_path, autor))
-                conn.commit()
+                if jpeg_metadata:
+                    insert_image_metadata(cursor, cursor.lastrowid, jpeg_metadata)
+                commit_with_retry(conn)
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten bei der Datenbankoperation: {e}")
 
+def insert_image_metadata(cursor, doc_id, jpeg_metadata):
+    """
+    Speichert die aus dem EXIF-Segment gelesenen Metadaten eines Bildes.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param doc_id: Die ID des Dokuments.
+    :param jpeg_metadata: Das Dictionary aus metadata.read_jpeg_metadata.
+    """
+    execute_with_retry(cursor, "INSERT OR REPLACE INTO bildmetadaten (dokument_id, aufnahmedatum, orientierung, breite, hoehe) VALUES (?, ?, ?, ?, ?)",
+                       (doc_id, jpeg_metadata.get('aufnahmedatum'), jpeg_metadata.get('orientierung'),
+                        jpeg_metadata.get('breite'), jpeg_metadata.get('hoehe')))
+
+def insert_new_files(cursor, records):
+    """
+    Fügt mehrere beim Einlesen gefundene Dateien in der laufenden Transaktion ein.
+    Dateien, deren Link inzwischen (z. B. durch eine andere Instanz) eingetragen wurde, werden übersprungen.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param records: Die Dateien als ingestion.FileRecord.
+    :return: Die IDs der neu eingefügten Dokumente.
+    """
+    inserted_ids = []
+    for record in records:
+        creation_time = metadata.get_creation_time(record.path, record.jpeg_metadata or {}, record.mtime_ns / 1e9)
+        beschreibung = time.strftime('%Y%m%d', creation_time) + "_" + os.path.splitext(os.path.basename(record.path))[0]
+        erstelldatum = time.strftime('%d.%m.%Y', creation_time)
+        execute_with_retry(cursor, '''INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor)
+                                      SELECT ?, ?, ?, ?, ?, ? WHERE NOT EXISTS (SELECT 1 FROM dokumente WHERE link=?)''',
+                           (beschreibung, record.category, record.seitenzahl, erstelldatum, record.path, "Unbekannt", record.path))
+        if cursor.rowcount != 1:
+            continue
+        doc_id = cursor.lastrowid
+        execute_with_retry(cursor, "INSERT OR REPLACE INTO dateiinfo (dokument_id, groesse, mtime_ns, geraet, inode, fingerabdruck) VALUES (?, ?, ?, ?, ?, ?)",
+                           (doc_id, record.size, record.mtime_ns, record.device, record.inode, record.fingerprint))
+        if record.jpeg_metadata:
+            insert_image_metadata(cursor, doc_id, record.jpeg_metadata)
+        print(f"Neue Datei gefunden: {record.path}")
+        inserted_ids.append(doc_id)
+    return inserted_ids
+
+def load_file_index(db_name=None):
+    """
+    Lädt Link und gespeicherte Dateimerkmale aller Dokumente für die Erkennung verschobener Dateien.
+
+    :param db_name: Die Datenbankdatei, standardmäßig die der aktiven Bibliothek.
+    :return: Eine Liste von Tupeln (id, link, groesse, mtime_ns, geraet, inode, fingerabdruck).
+    """
+    # Wird aus Hintergrund-Threads aufgerufen, daher nur eine Ausgabe statt eines Dialogs
+    conn = connect_db(db_name, report=False)
+    if conn is None:
+        return []
+    try:
+        with conn:
+            return conn.execute("""SELECT d.id, d.link, i.groesse, i.mtime_ns, i.geraet, i.inode, i.fingerabdruck
+                                   FROM dokumente d LEFT JOIN dateiinfo i ON i.dokument_id = d.id""").fetchall()
+    except sqlite3.Error as e:
+        print(f"Dateimerkmale konnten nicht geladen werden: {e}")
+        return []
+    finally:
+        conn.close()
+
+def update_file_info(cursor, rows):
+    """
+    Speichert die Dateimerkmale bestehender Dokumente.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param rows: Tupel (dokument_id, groesse, mtime_ns, geraet, inode, fingerabdruck).
+    """
+    for row in rows:
+        execute_with_retry(cursor, "INSERT OR REPLACE INTO dateiinfo (dokument_id, groesse, mtime_ns, geraet, inode, fingerabdruck) VALUES (?, ?, ?, ?, ?, ?)",
+                           row)
+
+def relink_documents(cursor, matches):
+    """
+    Aktualisiert den Link verschobener oder umbenannter Dateien, alle übrigen Metadaten bleiben erhalten.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param matches: Paare aus moves.VanishedDocument und der neu gefundenen Datei als ingestion.FileRecord.
+    """
+    for document, record in matches:
+        execute_with_retry(cursor, "UPDATE dokumente SET link=? WHERE id=?", (record.path, document.doc_id))
+        print(f"Datei verschoben: {document.link} -> {record.path}")
+    update_file_info(cursor, [(document.doc_id, record.size, record.mtime_ns, record.device, record.inode, record.fingerprint)
+                              for document, record in matches])
+
+def load_all_links(db_name=None):
+    """
+    Lädt die Links aller Dokumente.
+
+    :param db_name: Die Datenbankdatei, standardmäßig die der aktiven Bibliothek.
+    :return: Eine Menge aller in der Datenbank gespeicherten Links oder None, wenn die Datenbank nicht gelesen werden kann.
+    """
+    # Wird aus Hintergrund-Threads aufgerufen, daher nur eine Ausgabe statt eines Dialogs
+    conn = connect_db(db_name, report=False)
+    if conn is None:
+        return None
+    try:
+        with conn:
+            return {row[0] for row in conn.execute("SELECT link FROM dokumente")}
+    except sqlite3.Error as e:
+        print(f"Links konnten nicht geladen werden: {e}")
+        return None
+    finally:
+        conn.close()
+
 def file_is_valid(file_path, extensions):
-    return any(file_path.lower().endswith(ext) for ext in extensions)
+    """
+    Prüft die Dateiendung mit einem einzigen Nachschlagen in einer Menge.
+
+    :param extensions: Die gültigen Endungen, vorbereitet mit config.suffix_set.
+    """
+    return os.path.splitext(file_path)[1].lower() in extensions
 
 def insert_document(id, beschreibung, kategorie, seitenzahl, erstelldatum, link, autor):
     """
@@ -103,12 +410,12 @@ def insert_document(id, beschreibung, kategorie, seitenzahl, erstelldatum, link,
             if id is not None:
                 existing_data = get_document_by_id(id)
                 if existing_data:
-                    cursor.execute("UPDATE dokumente SET beschreibung=?, kategorie=?, seitenzahl=?, erstelldatum=?, link=?, autor=? WHERE id=?",
+                    execute_with_retry(cursor, "UPDATE dokumente SET beschreibung=?, kategorie=?, seitenzahl=?, erstelldatum=?, link=?, autor=? WHERE id=?",
                                     (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor, id))
             else:
-                cursor.execute("INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) VALUES (?, ?, ?, ?, ?, ?)",
+                execute_with_retry(cursor, "INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) VALUES (?, ?, ?, ?, ?, ?)",
                                 (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor))
-            conn.commit()
+            commit_with_retry(conn)
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
 
@@ -116,27 +423,227 @@ def update_document_link(doc_id, new_link):
     try:
         with connect_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("UPDATE dokumente SET link=? WHERE id=?", (new_link, doc_id))
-            conn.commit()
+            execute_with_retry(cursor, "UPDATE dokumente SET link=? WHERE id=?", (new_link, doc_id))
+            commit_with_retry(conn)
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
         
-def update_multiple_documents(ids, changes):
+def update_multiple_documents(ids, changes, beschreibung=None):
     """
     Aktualisiert ein bestimmtes Merkmal für mehrere Dokumente in der Datenbank.
+    Die Änderung wird als ein Vorgang im Journal vermerkt und kann rückgängig gemacht werden.
 
     :param ids: Eine Liste von Dokumenten-IDs, die aktualisiert werden sollen.
     :param changes: Ein Dictionary, das die zu ändernden Merkmale und ihre neuen Werte enthält.
+    :param beschreibung: Die Bezeichnung des Vorgangs im Journal.
+    :return: Die ID des Vorgangs oder None, wenn sich nichts geändert hat.
+    """
+    if beschreibung is None:
+        beschreibung = f"Merkmale setzen: {', '.join(changes)} ({len(ids)} Dokumente)"
+    return update_documents({doc_id: changes for doc_id in ids}, beschreibung)
+
+def update_documents(updates, beschreibung):
     """
+    Ändert mehrere Dokumente mit jeweils eigenen Werten in einer Transaktion und vermerkt die Änderung im Journal.
+    Je Dokument wird nur ein Delta mit den tatsächlich geänderten Spalten gespeichert; die Änderung selbst wird
+    anschließend mengenbasiert aus den Deltas übernommen.
+
+    :param updates: Ein Dictionary von Dokument-ID auf ein Dictionary der neuen Werte je Spalte.
+    :param beschreibung: Die Bezeichnung des Vorgangs im Journal.
+    :return: Die ID des Vorgangs oder None, wenn sich nichts geändert hat.
+    """
+    for changes in updates.values():
+        unknown = set(changes) - set(DOCUMENT_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unbekannte Spalten: {', '.join(sorted(unknown))}")
+    ids = list(updates)
     try:
         with connect_db() as conn:
             cursor = conn.cursor()
-            for doc_id in ids:
-                for key, value in changes.items():
-                    cursor.execute(f"UPDATE dokumente SET {key}=? WHERE id=?", (value, doc_id))
-            conn.commit()
+            operation_id = start_operation(cursor, beschreibung)
+            # In Blöcken lesen, um die Höchstzahl an SQL-Parametern nicht zu überschreiten
+            for start in range(0, len(ids), 500):
+                deltas = []
+                for row in load_documents_by_ids(conn, ids[start:start + 500]):
+                    current = dict(zip(DOCUMENT_COLUMNS, row[1:7]))
+                    changed = {column: value for column, value in updates[row[0]].items() if str(value) != str(current[column])}
+                    if changed:
+                        deltas.append((operation_id, row[0], json.dumps({column: current[column] for column in changed}),
+                                       json.dumps(changed)))
+                cursor.executemany("INSERT INTO journal_deltas (journal_id, dokument_id, vorher, nachher) VALUES (?, ?, ?, ?)", deltas)
+            if not finish_operation(cursor, operation_id):
+                conn.rollback()
+                return None
+            apply_deltas(cursor, operation_id, 'nachher', 'vorher')
+            commit_with_retry(conn)
+            return operation_id
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return None
+
+def delete_documents(ids, beschreibung=None):
+    """
+    Löscht mehrere Dokumente in einer Transaktion. Die vollständigen Zeilen samt Tags werden im Journal vermerkt,
+    damit das Löschen rückgängig gemacht werden kann.
+
+    :param ids: Die IDs der zu löschenden Dokumente.
+    :param beschreibung: Die Bezeichnung des Vorgangs im Journal.
+    :return: Die ID des Vorgangs oder None, wenn keines der Dokumente existiert.
+    """
+    ids = list(ids)
+    if beschreibung is None:
+        beschreibung = f"Löschen ({len(ids)} Dokumente)"
+    row_json = ", ".join(f"'{column}', {column}" for column in DOCUMENT_COLUMNS)
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            operation_id = start_operation(cursor, beschreibung)
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                execute_with_retry(cursor, f"""INSERT INTO journal_deltas (journal_id, dokument_id, vorher, nachher)
+                                   SELECT ?, id, json_object({row_json}, 'tags', json((SELECT json_group_array(t.name)
+                                       FROM dokument_tags dt JOIN tags t ON t.id = dt.tag_id WHERE dt.dokument_id = dokumente.id))), NULL
+                                   FROM dokumente WHERE id IN ({placeholders})""", [operation_id] + chunk)
+            if not finish_operation(cursor, operation_id):
+                conn.rollback()
+                return None
+            apply_deltas(cursor, operation_id, 'nachher', 'vorher')
+            commit_with_retry(conn)
+            return operation_id
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return None
+
+def start_operation(cursor, beschreibung):
+    """
+    Legt einen neuen Vorgang im Journal an und liefert seine ID. Rückgängig gemachte Vorgänge werden dabei
+    verworfen, da sie auf einem Stand aufbauen, den der neue Vorgang ersetzt.
+    """
+    execute_with_retry(cursor, "DELETE FROM journal_deltas WHERE journal_id IN (SELECT id FROM journal WHERE rueckgaengig IS NOT NULL)")
+    execute_with_retry(cursor, "DELETE FROM journal WHERE rueckgaengig IS NOT NULL")
+    execute_with_retry(cursor, "INSERT INTO journal (zeitpunkt, beschreibung) VALUES (?, ?)", (time.time(), beschreibung))
+    return cursor.lastrowid
+
+def finish_operation(cursor, operation_id):
+    """
+    Vermerkt die Anzahl der Deltas eines Vorgangs und begrenzt die Größe des Journals.
+
+    :return: Die Anzahl der Deltas; 0, wenn der Vorgang nichts geändert hat.
+    """
+    count = cursor.execute("SELECT COUNT(*) FROM journal_deltas WHERE journal_id = ?", (operation_id,)).fetchone()[0]
+    execute_with_retry(cursor, "UPDATE journal SET anzahl = ? WHERE id = ?", (count, operation_id))
+    prune_journal(cursor)
+    return count
+
+def prune_journal(cursor):
+    """
+    Entfernt die ältesten Vorgänge, sobald das Journal mehr als JOURNAL_KEEP_OPERATIONS Vorgänge oder
+    JOURNAL_KEEP_ROWS Deltas enthält. Der neueste Vorgang bleibt immer erhalten.
+    """
+    total, cutoff = 0, None
+    for position, (operation_id, count) in enumerate(cursor.execute("SELECT id, anzahl FROM journal ORDER BY id DESC").fetchall()):
+        total += count
+        if position > 0 and (position >= JOURNAL_KEEP_OPERATIONS or total > JOURNAL_KEEP_ROWS):
+            cutoff = operation_id
+            break
+    if cutoff is not None:
+        # Über den Primärschlüssel der Deltas ist das Löschen eines Bereichs von Vorgängen günstig
+        execute_with_retry(cursor, "DELETE FROM journal_deltas WHERE journal_id <= ?", (cutoff,))
+        execute_with_retry(cursor, "DELETE FROM journal WHERE id <= ?", (cutoff,))
+
+def apply_deltas(cursor, operation_id, target, expected):
+    """
+    Bringt die Dokumente eines Vorgangs mengenbasiert auf den Stand der Spalte target der Deltas:
+    Dokumente ohne Zielstand werden gelöscht, fehlende Dokumente samt Tags neu angelegt und
+    alle übrigen mit einer einzigen Anweisung in den im Delta enthaltenen Spalten geändert.
+
+    :param target: 'nachher' zum Ausführen bzw. Wiederholen, 'vorher' zum Rückgängigmachen.
+    :param expected: Die jeweils andere Spalte, sie beschreibt den erwarteten aktuellen Stand.
+    """
+    execute_with_retry(cursor, f"""DELETE FROM dokumente WHERE id IN
+                       (SELECT dokument_id FROM journal_deltas WHERE journal_id = ? AND {target} IS NULL AND {expected} IS NOT NULL)""",
+                       (operation_id,))
+
+    inserted = f"FROM journal_deltas d WHERE d.journal_id = ? AND d.{expected} IS NULL AND d.{target} IS NOT NULL"
+    values = ", ".join(f"json_extract(d.{target}, '$.{column}')" for column in DOCUMENT_COLUMNS)
+    execute_with_retry(cursor, f"INSERT INTO dokumente (id, {', '.join(DOCUMENT_COLUMNS)}) SELECT d.dokument_id, {values} {inserted}",
+                       (operation_id,))
+    execute_with_retry(cursor, f"INSERT OR IGNORE INTO tags (name, schluessel) SELECT j.value, tag_key(j.value) "
+                       f"FROM journal_deltas d, json_each(d.{target}, '$.tags') j WHERE d.journal_id = ? AND d.{expected} IS NULL",
+                       (operation_id,))
+    execute_with_retry(cursor, f"""INSERT OR IGNORE INTO dokument_tags (dokument_id, tag_id)
+                       SELECT d.dokument_id, t.id FROM journal_deltas d, json_each(d.{target}, '$.tags') j JOIN tags t ON t.schluessel = tag_key(j.value)
+                       WHERE d.journal_id = ? AND d.{expected} IS NULL""", (operation_id,))
+
+    # Nicht enthaltene Spalten behalten ihren Wert; so löst jedes Dokument nur einen Eintrag im Änderungsprotokoll aus
+    assignments = ", ".join(f"{column} = CASE WHEN json_type(d.{target}, '$.{column}') IS NULL THEN dokumente.{column} "
+                            f"ELSE json_extract(d.{target}, '$.{column}') END" for column in DOCUMENT_COLUMNS)
+    execute_with_retry(cursor, f"""UPDATE dokumente SET {assignments} FROM journal_deltas d
+                       WHERE d.journal_id = ? AND d.dokument_id = dokumente.id AND d.{target} IS NOT NULL AND d.{expected} IS NOT NULL""",
+                       (operation_id,))
+
+def count_conflicts(cursor, operation_id, expected):
+    """
+    Zählt die Dokumente eines Vorgangs, deren aktueller Stand nicht dem erwarteten Stand entspricht,
+    z. B. weil ein späterer Vorgang oder eine andere Instanz sie inzwischen geändert hat.
+    """
+    mismatch = " OR ".join(f"(json_type(d.{expected}, '$.{column}') IS NOT NULL AND x.{column} IS NOT json_extract(d.{expected}, '$.{column}'))"
+                           for column in DOCUMENT_COLUMNS)
+    return cursor.execute(f"""SELECT COUNT(*) FROM journal_deltas d LEFT JOIN dokumente x ON x.id = d.dokument_id
+                          WHERE d.journal_id = ? AND CASE WHEN d.{expected} IS NULL THEN x.id IS NOT NULL
+                                                         ELSE x.id IS NULL OR {mismatch} END""", (operation_id,)).fetchone()[0]
+
+def switch_operation(operation_id=None, undo=True):
+    """
+    Macht einen Vorgang aus dem Journal rückgängig oder wiederholt ihn, als eine Transaktion.
+    Haben sich betroffene Dokumente seitdem geändert, wird nichts verändert.
+
+    :param operation_id: Die ID des Vorgangs; None für den letzten wirksamen (undo) bzw. den zuletzt rückgängig gemachten Vorgang.
+    :param undo: True zum Rückgängigmachen, False zum Wiederholen.
+    :return: Ein Tupel (Beschreibung des Vorgangs oder None, wenn es keinen passenden Vorgang gibt, Anzahl der Konflikte).
+    """
+    target, expected = ('vorher', 'nachher') if undo else ('nachher', 'vorher')
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            # Sofort sperren, damit keine andere Instanz zwischen Prüfung und Änderung schreibt
+            execute_with_retry(cursor, "BEGIN IMMEDIATE")
+            if operation_id is None:
+                query = ("SELECT id, beschreibung FROM journal WHERE rueckgaengig IS NULL ORDER BY id DESC LIMIT 1" if undo else
+                         "SELECT id, beschreibung FROM journal WHERE rueckgaengig IS NOT NULL ORDER BY rueckgaengig DESC LIMIT 1")
+                row = cursor.execute(query).fetchone()
+            else:
+                row = cursor.execute("SELECT id, beschreibung FROM journal WHERE id = ? AND (rueckgaengig IS NULL) = ?",
+                                     (operation_id, undo)).fetchone()
+            if row is None:
+                conn.rollback()
+                return None, 0
+            operation_id, beschreibung = row
+            conflicts = count_conflicts(cursor, operation_id, expected)
+            if conflicts:
+                conn.rollback()
+                return beschreibung, conflicts
+            apply_deltas(cursor, operation_id, target, expected)
+            execute_with_retry(cursor, "UPDATE journal SET rueckgaengig = ? WHERE id = ?", (time.time() if undo else None, operation_id))
+            commit_with_retry(conn)
+            return beschreibung, 0
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return None, 0
+
+def load_journal():
+    """
+    Lädt die Vorgänge des Journals, die neuesten zuerst.
+
+    :return: Eine Liste von Tupeln (id, zeitpunkt, beschreibung, anzahl, rueckgaengig).
+    """
+    try:
+        with connect_db() as conn:
+            return conn.execute("SELECT id, zeitpunkt, beschreibung, anzahl, rueckgaengig FROM journal ORDER BY id DESC").fetchall()
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return []
 
 def load_ordered_documents(sort_column, sort_direction):
     """
@@ -167,7 +674,236 @@ def load_all_documents():
                 
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
-        
+
+def load_value_counts(column):
+    """
+    Lädt die unterschiedlichen Werte einer Spalte zusammen mit ihrer Häufigkeit.
+    Die Abfrage wird über den Index der Spalte beantwortet.
+
+    :param column: Der Name der Spalte, z. B. 'autor'.
+    :return: Eine Liste von Paaren aus Wert und Häufigkeit.
+    """
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT {column}, COUNT(*) FROM dokumente WHERE {column} IS NOT NULL AND {column} <> '' GROUP BY {column}")
+            return cursor.fetchall()
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return []
+
+def tag_ids(cursor, names, create=False):
+    """
+    Ermittelt die IDs der angegebenen Tags über ihren Schlüssel, die Groß-/Kleinschreibung spielt keine Rolle.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param names: Die Namen der Tags.
+    :param create: True, um fehlende Tags anzulegen.
+    :return: Eine Liste der gefundenen Tag-IDs.
+    """
+    names = list(names)
+    if create:
+        for name in names:
+            execute_with_retry(cursor, "INSERT OR IGNORE INTO tags (name, schluessel) VALUES (?, ?)", (name, tag_key(name)))
+    keys = list({tag_key(name) for name in names})
+    placeholders = ", ".join("?" * len(keys))
+    return [row[0] for row in cursor.execute(f"SELECT id FROM tags WHERE schluessel IN ({placeholders})", keys)]
+
+def add_tags(ids, names):
+    """
+    Versieht mehrere Dokumente mit Tags. Bereits vorhandene Zuordnungen bleiben unverändert.
+
+    :param ids: Die IDs der Dokumente.
+    :param names: Die Namen der Tags, fehlende Tags werden angelegt.
+    """
+    ids = list(ids)
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            tags = tag_ids(cursor, names, create=True)
+            if not tags:
+                return
+            tag_placeholders = ", ".join("?" * len(tags))
+            # Mengenbasiert je Block, um die Höchstzahl an SQL-Parametern nicht zu überschreiten
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                # Nur Dokumente vermerken, die mindestens ein Tag neu erhalten
+                execute_with_retry(cursor, f"""INSERT INTO aenderungen (dokument_id, aktion)
+                                               SELECT d.id, 'T' FROM dokumente d WHERE d.id IN ({placeholders})
+                                               AND EXISTS (SELECT 1 FROM tags t WHERE t.id IN ({tag_placeholders}) AND NOT EXISTS
+                                                   (SELECT 1 FROM dokument_tags dt WHERE dt.dokument_id = d.id AND dt.tag_id = t.id))""",
+                                   chunk + tags)
+                execute_with_retry(cursor, f"""INSERT OR IGNORE INTO dokument_tags (dokument_id, tag_id)
+                                               SELECT d.id, t.id FROM dokumente d, tags t
+                                               WHERE d.id IN ({placeholders}) AND t.id IN ({tag_placeholders})""",
+                                   chunk + tags)
+            commit_with_retry(conn)
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+
+def remove_tags(ids, names):
+    """
+    Entfernt Tags von mehreren Dokumenten. Tags, die danach keinem Dokument mehr zugeordnet sind, werden gelöscht.
+
+    :param ids: Die IDs der Dokumente.
+    :param names: Die Namen der Tags.
+    """
+    ids = list(ids)
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            tags = tag_ids(cursor, names)
+            if not tags:
+                return
+            tag_placeholders = ", ".join("?" * len(tags))
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                placeholders = ", ".join("?" * len(chunk))
+                execute_with_retry(cursor, f"""INSERT INTO aenderungen (dokument_id, aktion) SELECT DISTINCT dokument_id, 'T' FROM dokument_tags
+                                               WHERE dokument_id IN ({placeholders}) AND tag_id IN ({tag_placeholders})""", chunk + tags)
+                execute_with_retry(cursor, f"DELETE FROM dokument_tags WHERE dokument_id IN ({placeholders}) AND tag_id IN ({tag_placeholders})",
+                                   chunk + tags)
+            execute_with_retry(cursor, f"""DELETE FROM tags WHERE id IN ({tag_placeholders})
+                                           AND NOT EXISTS (SELECT 1 FROM dokument_tags WHERE tag_id = tags.id)""", tags)
+            commit_with_retry(conn)
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+
+def load_tag_counts():
+    """
+    Lädt alle Tags zusammen mit der Anzahl der zugeordneten Dokumente.
+    Die Zählung wird allein über den Index idx_dokument_tags_tag beantwortet.
+
+    :return: Eine Liste von Paaren aus Tag-Name und Häufigkeit, sortiert nach Namen.
+    """
+    try:
+        with connect_db() as conn:
+            return conn.execute("""SELECT t.name, COUNT(dt.dokument_id) FROM tags t
+                                   LEFT JOIN dokument_tags dt ON dt.tag_id = t.id
+                                   GROUP BY t.id ORDER BY t.name""").fetchall()
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return []
+
+def load_document_tags(doc_id):
+    """
+    Lädt die Tags eines Dokuments.
+
+    :param doc_id: Die ID des Dokuments.
+    :return: Eine nach Namen sortierte Liste der Tags.
+    """
+    try:
+        with connect_db() as conn:
+            return [row[0] for row in conn.execute("""SELECT t.name FROM dokument_tags dt JOIN tags t ON t.id = dt.tag_id
+                                                      WHERE dt.dokument_id = ? ORDER BY t.name""", (doc_id,))]
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return []
+
+def find_documents_by_tags(names, match_all=True):
+    """
+    Sucht die Dokumente, die die angegebenen Tags tragen.
+
+    :param names: Die Namen der Tags.
+    :param match_all: True, wenn alle Tags vorhanden sein müssen (UND), False für mindestens einen (ODER).
+    :return: Eine Menge von Dokument-IDs.
+    """
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            tags = tag_ids(cursor, names)
+            if not tags or (match_all and len(tags) < len({tag_key(name) for name in names})):
+                return set()
+            placeholders = ", ".join("?" * len(tags))
+            # Beide Abfragen lesen nur den Index (tag_id, dokument_id)
+            if match_all:
+                query = f"SELECT dokument_id FROM dokument_tags WHERE tag_id IN ({placeholders}) GROUP BY dokument_id HAVING COUNT(*) = ?"
+                return {row[0] for row in cursor.execute(query, tags + [len(tags)])}
+            query = f"SELECT DISTINCT dokument_id FROM dokument_tags WHERE tag_id IN ({placeholders})"
+            return {row[0] for row in cursor.execute(query, tags)}
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return set()
+
+def load_signature_state(conn):
+    """
+    Lädt, für welche Dokumente bereits eine MinHash-Signatur berechnet wurde.
+
+    :param conn: Die Datenbankverbindung.
+    :return: Ein Dictionary Dokument-ID -> mtime_ns der Datei bei der Berechnung.
+    """
+    return dict(conn.execute("SELECT dokument_id, mtime_ns FROM minhash"))
+
+def save_signature(cursor, doc_id, mtime_ns, shingle_count, signature, bands):
+    """
+    Speichert die MinHash-Signatur eines Dokuments und ersetzt eine ältere Signatur samt ihrer Bänder und Paare.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param signature: Die Signatur als Bytes oder None, wenn das Dokument zu wenig Text enthält.
+    :param bands: Die Hashwerte der LSH-Bänder in der Reihenfolge der Bänder.
+    """
+    execute_with_retry(cursor, "DELETE FROM minhash_baender WHERE dokument_id=?", (doc_id,))
+    execute_with_retry(cursor, "DELETE FROM duplikat_paare WHERE dokument_a=? OR dokument_b=?", (doc_id, doc_id))
+    execute_with_retry(cursor, "INSERT OR REPLACE INTO minhash (dokument_id, mtime_ns, schindeln, signatur) VALUES (?, ?, ?, ?)",
+                       (doc_id, mtime_ns, shingle_count, signature))
+    for band, band_hash in enumerate(bands):
+        execute_with_retry(cursor, "INSERT OR IGNORE INTO minhash_baender (band, hash, dokument_id) VALUES (?, ?, ?)",
+                           (band, band_hash, doc_id))
+
+def find_lsh_candidates(conn, bands):
+    """
+    Sucht Dokumente, die mindestens ein LSH-Band mit der angegebenen Signatur teilen.
+    Jede Teilabfrage liest nur den Primärschlüssel (band, hash, dokument_id).
+
+    :param conn: Die Datenbankverbindung.
+    :param bands: Die Hashwerte der LSH-Bänder in der Reihenfolge der Bänder.
+    :return: Ein Dictionary Dokument-ID -> Signatur als Bytes.
+    """
+    conditions = " UNION ".join("SELECT dokument_id FROM minhash_baender WHERE band=? AND hash=?" for _ in bands)
+    params = [value for band, band_hash in enumerate(bands) for value in (band, band_hash)]
+    return dict(conn.execute(f"SELECT dokument_id, signatur FROM minhash WHERE dokument_id IN ({conditions})", params))
+
+def save_duplicate_pairs(cursor, pairs):
+    """
+    Speichert gefundene Paare ähnlicher Dokumente. Bereits verworfene Paare bleiben verworfen.
+
+    :param cursor: Der Cursor der laufenden Transaktion.
+    :param pairs: Tupel (dokument_a, dokument_b, aehnlichkeit) mit dokument_a < dokument_b.
+    """
+    for pair in pairs:
+        execute_with_retry(cursor, "INSERT OR IGNORE INTO duplikat_paare (dokument_a, dokument_b, aehnlichkeit) VALUES (?, ?, ?)", pair)
+
+def load_duplicate_pairs():
+    """
+    Lädt alle nicht verworfenen Paare ähnlicher Dokumente.
+
+    :return: Eine Liste von Tupeln (dokument_a, dokument_b, aehnlichkeit).
+    """
+    try:
+        with connect_db() as conn:
+            return conn.execute("SELECT dokument_a, dokument_b, aehnlichkeit FROM duplikat_paare WHERE verworfen = 0").fetchall()
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+        return []
+
+def dismiss_duplicate_pairs(ids):
+    """
+    Markiert alle Paare innerhalb einer Gruppe von Dokumenten als keine Duplikate, damit sie nicht erneut erscheinen.
+
+    :param ids: Die IDs der Dokumente der Gruppe.
+    """
+    ids = list(ids)
+    placeholders = ", ".join("?" * len(ids))
+    try:
+        with connect_db() as conn:
+            cursor = conn.cursor()
+            execute_with_retry(cursor, f"UPDATE duplikat_paare SET verworfen = 1 WHERE dokument_a IN ({placeholders}) AND dokument_b IN ({placeholders})",
+                               ids + ids)
+            commit_with_retry(conn)
+    except sqlite3.Error as e:
+        messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+
 def validate_link(id, link):
     try:
         with connect_db() as conn:
@@ -186,8 +922,8 @@ def delete_by_link(document_link):
     try:
         with connect_db() as conn:
             cursor = conn.cursor()
-            cursor.execute("DELETE FROM dokumente WHERE link=?", (document_link,))
-            conn.commit()
+            execute_with_retry(cursor, "DELETE FROM dokumente WHERE link=?", (document_link,))
+            commit_with_retry(conn)
     except sqlite3.Error as e:
             messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
 
@@ -233,3 +969,92 @@ def get_document_by_id(id):
     except sqlite3.Error as e:
         messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
         return None
+
+def get_change_version(conn):
+    """
+    Ermittelt die höchste Version im Änderungsprotokoll.
+
+    :param conn: Die Datenbankverbindung.
+    :return: Die aktuelle Version oder 0, wenn das Protokoll leer ist.
+    """
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM aenderungen").fetchone()[0]
+
+def load_documents_by_ids(conn, ids):
+    """
+    Lädt die Dokumente mit den angegebenen IDs.
+
+    :param conn: Die Datenbankverbindung.
+    :param ids: Die IDs der zu ladenden Dokumente.
+    :return: Eine Liste der gefundenen Zeilen.
+    """
+    ids = list(ids)
+    rows = []
+    # In Blöcken abfragen, um die Höchstzahl an SQL-Parametern nicht zu überschreiten
+    for start in range(0, len(ids), 500):
+        chunk = ids[start:start + 500]
+        placeholders = ", ".join("?" * len(chunk))
+        rows.extend(conn.execute(f"SELECT * FROM dokumente WHERE id IN ({placeholders})", chunk).fetchall())
+    return rows
+
+class ChangeMonitor:
+    """
+    Erkennt Änderungen, die andere Verbindungen (auch andere Instanzen der Anwendung) an der Datenbank
+    vornehmen, und liefert nur die geänderten Dokumente seit dem letzten Abgleich.
+    """
+    def __init__(self):
+        # Eine dauerhaft geöffnete Verbindung ist nötig, da PRAGMA data_version nur je Verbindung aussagekräftig ist
+        self.conn = connect_db()
+        self.data_version = self.read_data_version()
+        self.version = get_change_version(self.conn)
+
+    def read_data_version(self):
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def mark_synced(self):
+        """ Merkt sich den aktuellen Stand des Änderungsprotokolls, z. B. nach einem vollständigen Neuladen. """
+        try:
+            self.data_version = self.read_data_version()
+            self.version = get_change_version(self.conn)
+        except sqlite3.Error as e:
+            print(f"Änderungsprotokoll konnte nicht gelesen werden: {e}")
+
+    def poll(self):
+        """
+        Prüft, ob sich die Datenbank seit dem letzten Abgleich geändert hat.
+
+        :return: None, wenn keine Änderung vorliegt, sonst ein ChangeSet mit den geänderten Zeilen und gelöschten IDs.
+        """
+        try:
+            data_version = self.read_data_version()
+            if data_version == self.data_version:
+                return None
+            self.data_version = data_version
+
+            oldest = self.conn.execute("SELECT MIN(version) FROM aenderungen").fetchone()[0]
+            if oldest is not None and oldest > self.version + 1:
+                # Die benötigten Einträge wurden bereits aus dem Protokoll entfernt
+                self.version = get_change_version(self.conn)
+                return ChangeSet([], [], True)
+
+            # Nur die jeweils letzte Aktion je Dokument ist für die Ansicht relevant; geänderte Tags ('T') erfordern
+            # kein erneutes Laden der Zeile, nur den Abgleich des Tag-Filters
+            last_action = {}
+            tags_changed = False
+            for doc_id, aktion, version in self.conn.execute(
+                    "SELECT dokument_id, aktion, version FROM aenderungen WHERE version > ? ORDER BY version", (self.version,)):
+                if aktion == 'T':
+                    tags_changed = True
+                else:
+                    last_action[doc_id] = aktion
+                self.version = version
+            if not last_action:
+                return ChangeSet([], [], False) if tags_changed else None
+
+            changed_ids = [doc_id for doc_id, aktion in last_action.items() if aktion != 'D']
+            rows = load_documents_by_ids(self.conn, changed_ids)
+            found_ids = {row[0] for row in rows}
+            deleted_ids = [doc_id for doc_id in last_action if doc_id not in found_ids]
+            return ChangeSet(rows, deleted_ids, False)
+        except sqlite3.Error as e:
+            print(f"Änderungsprotokoll konnte nicht gelesen werden: {e}")
+            return None
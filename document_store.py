@@ -0,0 +1,122 @@
+# document_store.py
+import re
+
+COLUMNS = ('beschreibung', 'kategorie', 'seitenzahl', 'erstelldatum', 'link', 'autor')
+
+def text_key(value):
+    """ Sortierschlüssel für Textspalten, ohne Berücksichtigung der Groß-/Kleinschreibung. """
+    return '' if value is None else str(value).casefold()
+
+def page_key(value):
+    """ Sortierschlüssel für die Seitenzahl, '1-12' wird nach der Seitenanzahl 12 sortiert. """
+    numbers = re.findall(r'\d+', '' if value is None else str(value))
+    return int(numbers[-1]) if numbers else 0
+
+def date_key(value):
+    """ Sortierschlüssel für Datumsangaben im Format TT.MM.JJJJ als Zahl JJJJMMTT, sortiert chronologisch. """
+    try:
+        day, month, year = str(value).split('.')
+        return int(year) * 10000 + int(month) * 100 + int(day)
+    except ValueError:
+        return -1
+
+SORT_KEYS = (text_key, text_key, page_key, date_key, text_key, text_key)
+
+class DocumentStore:
+    """
+    Hält alle Dokumente spaltenweise im Speicher, damit Sortieren, Filtern und Nachschlagen ohne Datenbankzugriff auskommen.
+    Je Spalte wird ein skalarer Sortierschlüssel vorberechnet; bei gleichem Schlüssel entscheidet die ID.
+
+    Der Abgleich mit der Datenbank erfolgt über das Änderungsprotokoll (database.ChangeMonitor);
+    jede Änderung erhöht den Generationszähler und macht die zwischengespeicherten Sortierungen ungültig.
+    """
+    def __init__(self):
+        self.values = {}  # Dokument-ID -> angezeigte Werte
+        self.by_link = {}  # Link -> Dokument-ID
+        self.sort_keys = [{} for _ in COLUMNS]  # je Spalte: Dokument-ID -> Sortierschlüssel
+        self.generation = 0
+        self.order_cache = {}  # Spalte -> (Generation, aufsteigend sortierte IDs)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.values
+
+    def load(self, rows):
+        """
+        Ersetzt den gesamten Inhalt durch die angegebenen Zeilen der Tabelle dokumente.
+
+        :param rows: Die Zeilen als Tupel (id, beschreibung, kategorie, seitenzahl, erstelldatum, link, autor).
+        """
+        self.values = {row[0]: tuple(row[1:7]) for row in rows}
+        self.by_link = {values[4]: doc_id for doc_id, values in self.values.items()}
+        self.sort_keys = [{doc_id: key(values[index]) for doc_id, values in self.values.items()}
+                          for index, key in enumerate(SORT_KEYS)]
+        self.generation += 1
+
+    def apply(self, rows, deleted_ids):
+        """
+        Übernimmt geänderte, neue und gelöschte Dokumente.
+
+        :param rows: Die geänderten oder neuen Zeilen.
+        :param deleted_ids: Die IDs der gelöschten Dokumente.
+        """
+        for doc_id in deleted_ids:
+            self.remove(doc_id)
+        for row in rows:
+            doc_id = row[0]
+            self.remove(doc_id)
+            values = tuple(row[1:7])
+            self.values[doc_id] = values
+            self.by_link[values[4]] = doc_id
+            for index, key in enumerate(SORT_KEYS):
+                self.sort_keys[index][doc_id] = key(values[index])
+        self.generation += 1
+
+    def remove(self, doc_id):
+        values = self.values.pop(doc_id, None)
+        if values is None:
+            return
+        if self.by_link.get(values[4]) == doc_id:
+            del self.by_link[values[4]]
+        for keys in self.sort_keys:
+            del keys[doc_id]
+
+    def get(self, doc_id):
+        """
+        Liefert die Werte eines Dokuments.
+
+        :param doc_id: Die ID des Dokuments.
+        :return: Ein Tupel (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) oder None.
+        """
+        return self.values.get(doc_id)
+
+    def id_by_link(self, link):
+        return self.by_link.get(link)
+
+    def sort_key(self, doc_id, column):
+        """ Liefert den Sortierschlüssel eines Dokuments für eine Spalte, bei gleichem Wert entscheidet die ID. """
+        return (self.sort_keys[COLUMNS.index(column.lower())][doc_id], doc_id)
+
+    def sorted_ids(self, column, reverse=False, predicate=None):
+        """
+        Liefert die Dokument-IDs sortiert nach einer Spalte. Die Sortierung wird je Spalte zwischengespeichert,
+        bis sich der Inhalt ändert.
+
+        :param column: Die Spalte, nach der sortiert wird.
+        :param reverse: True für absteigende Sortierung.
+        :param predicate: Optionale Filterfunktion, die eine Dokument-ID erhält.
+        :return: Eine Liste von Dokument-IDs.
+        """
+        column = column.lower()
+        cached = self.order_cache.get(column)
+        if cached is None or cached[0] != self.generation:
+            # Die Sortierung ist stabil, daher entscheidet bei gleichem Schlüssel die vorsortierte ID
+            keys = self.sort_keys[COLUMNS.index(column)]
+            cached = (self.generation, sorted(sorted(keys), key=keys.__getitem__))
+            self.order_cache[column] = cached
+        order = cached[1]
+        if predicate is not None:
+            order = [doc_id for doc_id in order if predicate(doc_id)]
+        return order[::-1] if reverse else list(order)
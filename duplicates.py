@@ -0,0 +1,166 @@
+# duplicates.py
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+import database
+import minhash
+
+# Standardeinstellungen der Duplikatsuche, einzeln über den Konfigurationsschlüssel 'duplicates' überschreibbar
+DEFAULT_SETTINGS = {
+    'workers': os.cpu_count() or 1,  # Prozesse für das Auslesen des PDF-Textes
+    'threshold': 0.8,  # Mindestens geschätzte Jaccard-Ähnlichkeit für ein Paar
+    'batch_rows': 50,  # Spätestens nach so vielen Dokumenten wird festgeschrieben
+}
+
+class DuplicateSearch:
+    """
+    Sucht ähnliche PDF-Dokumente, z. B. denselben zweimal eingescannten Brief.
+
+    Für jedes neue oder geänderte Dokument wird aus dem Text eine MinHash-Signatur berechnet und mit ihren
+    LSH-Bändern gespeichert. Verglichen werden nur Dokumente, die mindestens ein Band teilen, und nur die
+    neu berechneten Dokumente; Paare aus früheren Läufen bleiben in der Tabelle duplikat_paare erhalten.
+    """
+    def __init__(self, documents, settings=None):
+        """
+        :param documents: Paare aus Dokument-ID und Link.
+        :param settings: Abweichende Einstellungen, siehe DEFAULT_SETTINGS.
+        """
+        self.documents = [(doc_id, link) for doc_id, link in documents if link and link.lower().endswith('.pdf')]
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.cancelled = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.total = 0
+        self.done = 0
+        self.without_text = 0
+        self.pairs = []
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='duplikate', daemon=True)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        """ :return: Ein Tupel (verarbeitete Dokumente, zu verarbeitende Dokumente, gefundene Paare). """
+        with self.lock:
+            return self.done, self.total, len(self.pairs)
+
+    def pending_documents(self, known):
+        """ Ermittelt die Dokumente ohne Signatur oder mit seit der Berechnung geänderter Datei. """
+        pending = []
+        for doc_id, link in self.documents:
+            try:
+                mtime_ns = os.stat(link).st_mtime_ns
+            except OSError:
+                continue
+            if known.get(doc_id) != mtime_ns:
+                pending.append((doc_id, link, mtime_ns))
+        return pending
+
+    def run(self):
+        conn = database.connect_db(report=False)
+        executor = None
+        try:
+            if conn is None:
+                raise RuntimeError("Die Datenbank konnte nicht geöffnet werden.")
+            pending = self.pending_documents(database.load_signature_state(conn))
+            with self.lock:
+                self.total = len(pending)
+            if not pending:
+                return
+            workers = self.settings['workers']
+            executor = ProcessPoolExecutor(max_workers=workers)
+            cursor = conn.cursor()
+            # Nur ein begrenztes Fenster an Aufträgen einreichen, damit Speicherbedarf und Abbruch
+            # nicht von der Größe der Bibliothek abhängen
+            documents = iter(pending)
+            running = deque()
+            while not self.cancelled.is_set():
+                while len(running) < 2 * workers:
+                    document = next(documents, None)
+                    if document is None:
+                        break
+                    running.append((document, executor.submit(minhash.pdf_signature, document[1])))
+                if not running:
+                    break
+                (doc_id, link, mtime_ns), future = running.popleft()
+                signature, shingle_count = future.result()
+                self.compare_and_save(cursor, doc_id, mtime_ns, signature, shingle_count)
+                with self.lock:
+                    self.done += 1
+                if self.done % self.settings['batch_rows'] == 0:
+                    database.commit_with_retry(conn)
+            database.commit_with_retry(conn)
+        except Exception as e:
+            # Z. B. Datenbankfehler oder ein abgebrochener Prozess im Pool (BrokenProcessPool)
+            self.error = e
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            if conn is not None:
+                conn.close()
+            with self.lock:
+                self.finished = time.perf_counter()
+            print(f"Duplikatsuche: {self.done} Dokumente in {self.finished - self.started:.1f} s verarbeitet, "
+                  f"{self.without_text} ohne ausreichenden Text, {len(self.pairs)} ähnliche Paare gefunden")
+
+    def compare_and_save(self, cursor, doc_id, mtime_ns, signature, shingle_count):
+        """ Vergleicht ein Dokument mit den Kandidaten aus den LSH-Bändern und speichert danach seine Signatur. """
+        if signature is None:
+            # Ohne Text (z. B. Scan ohne Texterkennung) ist kein Vergleich möglich, die Datei wird trotzdem vermerkt
+            self.without_text += 1
+            database.save_signature(cursor, doc_id, mtime_ns, shingle_count, None, [])
+            return
+        values = minhash.unpack_signature(signature)
+        bands = minhash.band_hashes(values)
+        pairs = []
+        for other_id, other_signature in database.find_lsh_candidates(cursor.connection, bands).items():
+            if other_id == doc_id or other_signature is None:
+                continue
+            score = minhash.similarity(values, minhash.unpack_signature(other_signature))
+            if score >= self.settings['threshold']:
+                pairs.append((min(doc_id, other_id), max(doc_id, other_id), score))
+        database.save_signature(cursor, doc_id, mtime_ns, shingle_count, signature, bands)
+        database.save_duplicate_pairs(cursor, pairs)
+        with self.lock:
+            self.pairs.extend(pairs)
+
+def build_clusters(pairs):
+    """
+    Fasst Paare ähnlicher Dokumente mit Union-Find zu Gruppen zusammen.
+
+    :param pairs: Tupel (dokument_a, dokument_b, aehnlichkeit).
+    :return: Eine Liste von Tupeln (Dokument-IDs, niedrigste Ähnlichkeit innerhalb der Gruppe), größte Gruppen zuerst.
+    """
+    parent = {}
+
+    def find(doc_id):
+        root = doc_id
+        while parent.setdefault(root, root) != root:
+            root = parent[root]
+        while parent[doc_id] != root:
+            parent[doc_id], doc_id = root, parent[doc_id]
+        return root
+
+    for first, second, _ in pairs:
+        parent[find(first)] = find(second)
+
+    members, lowest = {}, {}
+    for first, second, score in pairs:
+        root = find(first)
+        members.setdefault(root, set()).update((first, second))
+        lowest[root] = min(lowest.get(root, score), score)
+    clusters = [(sorted(ids), lowest[root]) for root, ids in members.items()]
+    clusters.sort(key=lambda cluster: (-len(cluster[0]), -cluster[1]))
+    return clusters
@@ -0,0 +1,148 @@
+# export.py
+import csv
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+
+CHUNK_SIZE = 1024 * 1024  # Dateien werden blockweise kopiert, der Speicherbedarf bleibt unabhängig von der Dateigröße
+# Bereits komprimierte Formate werden unverändert gespeichert, erneutes Komprimieren kostet nur Zeit
+STORED_EXTENSIONS = {'.pdf', '.jpg', '.jpeg', '.png', '.gif', '.zip', '.docx', '.xlsx', '.pptx', '.mp3', '.mp4'}
+MANIFEST_HEADERS = ['ID', 'Beschreibung', 'Kategorie', 'Seitenzahl', 'Erstelldatum', 'Link', 'Autor', 'Datei im Archiv', 'Groesse']
+
+class ExportCancelled(Exception):
+    pass
+
+def archive_name(kategorie, link, used_names):
+    """
+    Bildet einen eindeutigen Namen im Archiv in der Form Kategorie/Dateiname.
+
+    :param used_names: Die bereits vergebenen Namen, in Kleinbuchstaben; wird ergänzt.
+    """
+    folder = (kategorie or 'Ohne Kategorie').replace('/', '_').replace('\\', '_')
+    stem, extension = os.path.splitext(os.path.basename(link))
+    name = f"{folder}/{stem}{extension}"
+    counter = 1
+    while name.lower() in used_names:
+        counter += 1
+        name = f"{folder}/{stem} ({counter}){extension}"
+    used_names.add(name.lower())
+    return name
+
+class BundleExport:
+    """
+    Schreibt ausgewählte Dokumente zusammen mit einem Verzeichnis ihrer Metadaten (CSV und JSON) in ein ZIP-Archiv.
+    Der Export läuft in einem eigenen Thread und kann abgebrochen werden; das Archiv wird erst nach
+    vollständigem Schreiben unter dem Zielnamen abgelegt.
+    """
+    def __init__(self, target_path, documents):
+        """
+        :param target_path: Der Pfad des zu erstellenden ZIP-Archivs.
+        :param documents: Paare aus Dokument-ID und den Werten (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor).
+        """
+        self.target_path = target_path
+        self.documents = list(documents)
+        self.cancelled = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.files_done = 0
+        self.bytes_done = 0
+        self.bytes_total = 0
+        self.missing = []
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    def start(self):
+        self.started = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, name='export', daemon=True)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        """
+        :return: Ein Tupel (verarbeitete Dateien, Anzahl Dateien, geschriebene Bytes, Bytes insgesamt, Bytes pro Sekunde).
+        """
+        with self.lock:
+            elapsed = (self.finished or time.perf_counter()) - self.started if self.started else 0
+            throughput = self.bytes_done / elapsed if elapsed > 0 else 0.0
+            return self.files_done, len(self.documents), self.bytes_done, self.bytes_total, throughput
+
+    def run(self):
+        temporary = self.target_path + '.part'
+        try:
+            entries = self.plan()
+            with zipfile.ZipFile(temporary, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for entry in entries:
+                    if entry['Datei im Archiv']:
+                        self.copy_file(archive, entry)
+                    with self.lock:
+                        self.files_done += 1
+                self.write_manifest(archive, entries)
+            os.replace(temporary, self.target_path)
+        except ExportCancelled:
+            self.remove_partial(temporary)
+        except Exception as e:
+            # Jeder Fehler muss gemeldet werden, sonst erscheint der Export in der Anzeige als erfolgreich
+            self.error = e
+            self.remove_partial(temporary)
+        finally:
+            with self.lock:
+                self.finished = time.perf_counter()
+
+    def plan(self):
+        """ Ermittelt Archivnamen und Größen aller Dateien; fehlende Dateien erscheinen nur im Verzeichnis. """
+        entries = []
+        used_names = {'manifest.csv', 'manifest.json'}
+        for doc_id, values in self.documents:
+            beschreibung, kategorie, seitenzahl, erstelldatum, link, autor = values
+            entry = dict(zip(MANIFEST_HEADERS, (doc_id, beschreibung, kategorie, seitenzahl, erstelldatum, link, autor, '', None)))
+            try:
+                entry['Groesse'] = os.stat(link).st_size
+                entry['Datei im Archiv'] = archive_name(kategorie, link, used_names)
+            except (OSError, TypeError):
+                self.missing.append(link)
+            entries.append(entry)
+        with self.lock:
+            self.bytes_total = sum(entry['Groesse'] or 0 for entry in entries)
+        return entries
+
+    def copy_file(self, archive, entry):
+        """ Kopiert eine Datei blockweise in das Archiv und prüft zwischen den Blöcken, ob abgebrochen wurde. """
+        link = entry['Link']
+        # Änderungszeitpunkte vor 1980 kann ZIP nicht speichern, sie werden auf 1980 gesetzt
+        info = zipfile.ZipInfo.from_file(link, entry['Datei im Archiv'], strict_timestamps=False)
+        extension = os.path.splitext(link)[1].lower()
+        info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+        with open(link, 'rb') as source, archive.open(info, 'w') as target:
+            while True:
+                if self.cancelled.is_set():
+                    raise ExportCancelled()
+                chunk = source.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                target.write(chunk)
+                with self.lock:
+                    self.bytes_done += len(chunk)
+
+    def write_manifest(self, archive, entries):
+        csv_buffer = io.StringIO()
+        writer = csv.writer(csv_buffer, delimiter=';')  # Wie beim CSV-Export mit Semikolon als Trennzeichen
+        writer.writerow(MANIFEST_HEADERS)
+        for entry in entries:
+            writer.writerow([entry[header] for header in MANIFEST_HEADERS])
+        archive.writestr('manifest.csv', csv_buffer.getvalue().encode('utf-8-sig'))
+        archive.writestr('manifest.json', json.dumps(entries, ensure_ascii=False, indent=2).encode('utf-8'))
+
+    def remove_partial(self, temporary):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
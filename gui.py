@@ -8,9 +8,28 @@ import shutil
 import sys
 import subprocess
 import csv
+import sqlite3
+import threading
 import PyPDF2
 import database
 import config
+import autocomplete
+import metadata
+import ingestion
+import document_store
+import export
+import duplicates
+import maintenance
+import libraries
+import watcher
+import profiling
+
+POLL_INTERVAL_MS = 2000  # Intervall, in dem die Datenbank auf Änderungen anderer Instanzen geprüft wird
+MAINTENANCE_CHECK_MS = 60000  # Intervall, in dem fällige Wartungsaufgaben geprüft werden
+MAINTENANCE_IDLE_S = 300  # Wartung erst starten, wenn so lange keine Eingabe erfolgt ist
+# Im Profiling-Modus zusätzlich unter ihrem Namen gemessene Methoden, auch wenn sie innerhalb anderer Ereignisse laufen
+PROFILED_METHODS = ('new_entry_window', 'treeview_sort_column', 'on_selection_change', 'on_treeview_double_click',
+                    'display_documents', 'load_and_display_documents', 'apply_document_changes', 'poll_changes_now')
 
 class DocumentManagerGUI:
     def __init__(self, root):
@@ -18,13 +37,62 @@ class DocumentManagerGUI:
         self.root.title("Dokumentenverwaltung")
         self.sort_column = 'erstelldatum'  # Standard-Sortierspalte
         self.sort_direction = False  # False für aufsteigend, True für absteigend
-        self.config = config.load_or_create_config()
-        database.create_table()
-        self.setup_gui()
-        self.load_and_display_documents()
-        self.create_menu()
-        self.search_and_insert_new_files()
-        self.delete_not_existing_files()
+        # Konfiguration anlegen und Kategorieordner erstellen; danach liefert self.config den zwischengespeicherten Stand
+        with profiling.phase('Konfiguration'):
+            config.load_or_create_config()
+        # Die aktive Bibliothek bestimmt Stammordner, Kategorien und Datenbank; sie gilt bis zum Wechsel
+        # in dieser Instanz, unabhängig von der Auswahl anderer Instanzen
+        self.library = config.active_library(self.config)
+        config.set_active_library(self.library['name'])
+        with profiling.phase('Datenbank vorbereiten'):
+            database.create_table()
+            self.change_monitor = database.ChangeMonitor()
+        with profiling.phase('Autovervollständigung'):
+            self.load_indexes()
+        self.store = document_store.DocumentStore()
+        self.visible_order = []  # Dokument-IDs in Anzeigereihenfolge
+        self.ingestions = {}  # Bibliotheksname -> Einlese-Pipeline
+        self.watchers = {}  # Bibliotheksname -> Ordnerüberwachung
+        self.tag_filter = None  # (Tag-Namen, alle erforderlich) oder None, wenn kein Tag-Filter aktiv ist
+        self.tag_filter_ids = set()  # IDs der Dokumente, die den Tag-Filter erfüllen
+        self.maintenance_thread = None
+        self.maintenance_results = {}
+        self.last_activity = time.monotonic()
+        with profiling.phase('Oberfläche aufbauen'):
+            self.setup_gui()
+        with profiling.phase('Dokumente laden'):
+            self.load_and_display_documents()
+        with profiling.phase('Menü'):
+            self.create_menu()
+        # Die Prüfung der Links erst nach dem Einlesen starten, da beide den Fortschrittsbalken verwenden
+        with profiling.phase('Einlesen starten'):
+            self.search_and_insert_new_files(on_finished=self.delete_not_existing_files)
+        self.root.after(self.config.get('poll_interval_ms', POLL_INTERVAL_MS), self.poll_changes)
+        # Eingaben merken, damit die Wartung nur bei Untätigkeit läuft
+        self.root.bind_all('<Any-KeyPress>', self.register_activity, add='+')
+        self.root.bind_all('<Any-ButtonPress>', self.register_activity, add='+')
+        self.root.after(MAINTENANCE_CHECK_MS, self.check_maintenance)
+        self.update_title()
+
+    @property
+    def config(self):
+        return config.get_config()
+
+    def load_indexes(self):
+        """ Baut die Präfixindizes für die Autovervollständigung einmalig aus der Datenbank auf. """
+        self.autocomplete_indexes = {column: autocomplete.PrefixIndex(database.load_value_counts(column))
+                                     for column in database.AUTOCOMPLETE_COLUMNS}
+        self.tag_index = autocomplete.PrefixIndex(database.load_tag_counts())
+
+    def update_title(self):
+        """ Zeigt die aktive Bibliothek (bei mehreren) und einen aktiven Tag-Filter im Fenstertitel an. """
+        title = "Dokumentenverwaltung"
+        if len(config.library_list(self.config)) > 1:
+            title += f" - {self.library['name']}"
+        if self.tag_filter is not None:
+            names, match_all = self.tag_filter
+            title += f" - Tags: {(' und ' if match_all else ' oder ').join(names)}"
+        self.root.title(title)
 
     def setup_gui(self):
         """
@@ -99,6 +167,13 @@ class DocumentManagerGUI:
         # Fortschrittsbalken initialisieren
         self.progress = ttk.Progressbar(self.progress_frame)
         self.progress.pack(fill=tk.X, padx=5, pady=5)
+
+        # Wird nur während eines Bündel-Exports angezeigt
+        self.cancel_export_button = tk.Button(self.progress_frame, text="Export abbrechen", command=self.cancel_export)
+        # Wird nur während der Suche nach ähnlichen Dokumenten angezeigt
+        self.cancel_duplicates_button = tk.Button(self.progress_frame, text="Suche abbrechen", command=self.cancel_duplicate_search)
+        self.bundle_export = None
+        self.duplicate_search = None
         
     def on_selection_change(self, event):
         selected_items = self.tree.selection()
@@ -120,15 +195,138 @@ class DocumentManagerGUI:
         Lädt alle Dokumente aus der Datenbank und zeigt sie im Treeview-Widget an,
         sortiert nach dem aktuellen Sortierkriterium
         """
-        rows = database.load_ordered_documents(self.sort_column, self.sort_direction)
-                
+        # Stand des Änderungsprotokolls vor dem Laden merken, damit keine Änderung verloren geht
+        self.change_monitor.mark_synced()
+        self.store.load(database.load_all_documents() or [])
+        self.refresh_tag_filter()
+        self.display_documents()
+
+    def display_documents(self):
+        """
+        Baut das Treeview aus dem Dokumentenspeicher neu auf, ohne die Datenbank abzufragen.
+        """
+        self.visible_order = self.store.sorted_ids(self.sort_column, self.sort_direction, self.document_filter())
+
         # Löschen aller vorhandenen Einträge im Treeview
-        for item in self.tree.get_children():
-            self.tree.delete(item)
+        self.tree.delete(*self.tree.get_children())
+
+        # Einfügen der neuen Einträge, die Dokument-ID dient als Item-ID
+        for doc_id in self.visible_order:
+            self.tree.insert('', 'end', iid=str(doc_id), values=self.store.get(doc_id))
+
+    def poll_changes(self):
+        """
+        Prüft regelmäßig, ob andere Instanzen die Datenbank geändert haben, und übernimmt nur die Änderungen in die Ansicht.
+        """
+        self.poll_changes_now()
+        self.root.after(self.config.get('poll_interval_ms', POLL_INTERVAL_MS), self.poll_changes)
+
+    def poll_changes_now(self):
+        """ Übernimmt sofort alle seit dem letzten Abgleich vorgenommenen Änderungen in die Ansicht. """
+        changes = self.change_monitor.poll()
+        if changes is not None:
+            if changes.full_reload:
+                self.load_and_display_documents()
+                self.load_indexes()
+            else:
+                self.apply_document_changes(changes.rows, changes.deleted_ids)
+                # Tag-Änderungen erscheinen als 'U' im Protokoll, daher die Treffer des Filters neu ermitteln
+                if self.tag_filter is not None and self.refresh_tag_filter():
+                    self.display_documents()
+
+    def document_filter(self):
+        """ Liefert die Filterfunktion für die Anzeige oder None, wenn kein Tag-Filter aktiv ist. """
+        return None if self.tag_filter is None else self.tag_filter_ids.__contains__
+
+    def refresh_tag_filter(self):
+        """
+        Ermittelt die Dokumente, die den aktiven Tag-Filter erfüllen, über den Index der Tag-Zuordnungen.
 
-        # Einfügen der neuen Einträge
-        for row in rows:
-            self.tree.insert('', 'end', values=(row[1], row[2], row[3], row[4], row[5], row[6]))
+        :return: True, wenn sich die Treffermenge geändert hat.
+        """
+        if self.tag_filter is None:
+            return False
+        names, match_all = self.tag_filter
+        ids = database.find_documents_by_tags(names, match_all)
+        changed = ids != self.tag_filter_ids
+        self.tag_filter_ids = ids
+        return changed
+
+    def set_tag_filter(self, names, match_all=True):
+        """
+        Zeigt nur Dokumente mit den angegebenen Tags an.
+
+        :param names: Die Namen der Tags, eine leere Liste hebt den Filter auf.
+        :param match_all: True, wenn alle Tags vorhanden sein müssen, False für mindestens einen.
+        """
+        self.tag_filter = (tuple(names), match_all) if names else None
+        self.tag_filter_ids = set()
+        self.refresh_tag_filter()
+        self.display_documents()
+        self.update_title()
+
+    def parse_tag_names(self, text):
+        """ Zerlegt eine durch Kommas getrennte Eingabe in Tag-Namen, doppelte Namen werden entfernt. """
+        names = {}
+        for name in text.split(','):
+            name = name.strip()
+            if name:
+                names.setdefault(name.casefold(), name)
+        return list(names.values())
+
+    def apply_document_changes(self, rows, deleted_ids):
+        """
+        Übernimmt geänderte, neue und gelöschte Dokumente in den Dokumentenspeicher und das Treeview,
+        ohne die Ansicht neu aufzubauen.
+
+        :param rows: Die geänderten oder neuen Zeilen der Tabelle dokumente.
+        :param deleted_ids: Die IDs der gelöschten Dokumente.
+        """
+        changed_rows = [row for row in rows if self.store.get(row[0]) != tuple(row[1:7])]
+        # Die Autovervollständigung folgt allen Änderungen, egal ob aus diesem Fenster, aus Rückgängig/Wiederholen
+        # oder aus einer anderen Instanz, und zählt jede Änderung damit genau einmal
+        for row in changed_rows:
+            self.update_autocomplete(row[1:7], self.store.get(row[0]))
+        for doc_id in deleted_ids:
+            self.remove_autocomplete(self.store.get(doc_id))
+        self.store.apply(changed_rows, deleted_ids)
+
+        for doc_id in deleted_ids:
+            self.remove_visible_row(doc_id)
+
+        visible = self.document_filter()
+        for row in changed_rows:
+            doc_id = row[0]
+            self.remove_visible_row(doc_id)
+            if visible is not None and not visible(doc_id):
+                continue
+            index = self.sorted_position(doc_id)
+            self.visible_order.insert(index, doc_id)
+            self.tree.insert('', index, iid=str(doc_id), values=self.store.get(doc_id))
+
+    def remove_visible_row(self, doc_id):
+        """ Entfernt ein Dokument aus dem Treeview, falls es angezeigt wird. """
+        if self.tree.exists(str(doc_id)):
+            self.visible_order.remove(doc_id)
+            self.tree.delete(str(doc_id))
+
+    def sorted_position(self, doc_id):
+        """
+        Ermittelt per binärer Suche die Position, an der ein Dokument gemäß der aktuellen Sortierung eingefügt werden muss.
+
+        :param doc_id: Die ID des Dokuments im Dokumentenspeicher.
+        :return: Der Index in der Anzeigereihenfolge.
+        """
+        key = self.store.sort_key(doc_id, self.sort_column)
+        low, high = 0, len(self.visible_order)
+        while low < high:
+            middle = (low + high) // 2
+            other = self.store.sort_key(self.visible_order[middle], self.sort_column)
+            if (other > key) if self.sort_direction else (other < key):
+                low = middle + 1
+            else:
+                high = middle
+        return low
         
     def new_entry_window(self, id=None):
         """
@@ -159,7 +357,11 @@ class DocumentManagerGUI:
                 category_dropdown.grid(row=idx, column=1, sticky="w", padx=5)  # Position anpassen
                 entries[label] = category_var              
             else:
-                entry = tk.Entry(new_window, width=100)
+                index = self.autocomplete_indexes.get(label.lower())
+                if index is not None:
+                    entry = autocomplete.AutocompleteEntry(new_window, index=index, width=100)
+                else:
+                    entry = tk.Entry(new_window, width=100)
                 entry.grid(row=idx, column=1, sticky="w")
                 entries[label] = entry
                 
@@ -191,7 +393,7 @@ class DocumentManagerGUI:
         link_var.trace("w", validate)
 
         if id is not None:
-            data = database.get_document_by_id(id)
+            data = self.store.get(id)
             if data is not None:
                 for idx, label in enumerate(labels):
                     if label == 'Kategorie':
@@ -213,8 +415,8 @@ class DocumentManagerGUI:
                 entries['Link'].delete(0, tk.END)
                 entries['Link'].insert(0, filename)
                 
-                # Erstelldatum aus den Dateieigenschaften lesen
-                erstelldatum = time.strftime('%d.%m.%Y', time.localtime(os.path.getmtime(filename)))
+                # Erstelldatum aus den EXIF-Daten bzw. den Dateieigenschaften lesen
+                erstelldatum = time.strftime('%d.%m.%Y', metadata.get_creation_time(filename))
                 entries['Erstelldatum'].delete(0, tk.END)
                 entries['Erstelldatum'].insert(0, erstelldatum)
                 
@@ -239,40 +441,102 @@ class DocumentManagerGUI:
                 
             response = messagebox.askyesno("Löschen bestätigen", message_text)
             if response:
-                for item in selected_items:
-                    item_values = self.tree.item(item, "values")
-                    document_name = item_values[0]
-                    document_link = item_values[4]
-                    database.delete_by_link(document_link)
-                    self.tree.delete(item)
-                self.load_and_display_documents()
+                # Ein Vorgang im Journal, damit das Löschen mit Rückgängig wiederhergestellt werden kann
+                database.delete_documents([int(item) for item in selected_items])  # Die Item-ID ist die Dokument-ID
+                self.poll_changes_now()
         else:
             messagebox.showinfo("Hinweis", "Kein Dokument zum Loeschen ausgewaehlt.")
 
-    def search_and_insert_new_files(self):
+    def search_and_insert_new_files(self, on_finished=None):
         """
-        Durchsucht den Standardpfad nach neuen Dateien und fügt sie in die Datenbank ein, falls sie noch nicht vorhanden sind.
+        Durchsucht die Stammordner aller Bibliotheken nach neuen Dateien und fügt sie in die jeweilige Datenbank ein,
+        falls sie noch nicht vorhanden sind. Jede Bibliothek erhält eine eigene Pipeline im Hintergrund, damit ein
+        langsames Netzlaufwerk die übrigen nicht aufhält. Anschließend werden die Kategorieordner überwacht, damit
+        später hinzukommende Dateien ohne Neustart eingelesen werden. Neue Dokumente der aktiven Bibliothek erscheinen
+        über den Abgleich mit dem Änderungsprotokoll.
+
+        :param on_finished: Optionale Funktion, die nach dem Einlesen der aktiven Bibliothek aufgerufen wird.
         """
-        total_files = sum([len(files) for r, d, files in os.walk(self.config['file_path']) if r.startswith(tuple(self.config['categories']))])
-        processed_files = 0
-
-        self.progress['maximum'] = total_files  # Gesamtzahl der zu verarbeitenden Dateien setzen
-
-        for category in self.config['categories']:
-            category_path = os.path.join(self.config['file_path'], category)
-            if os.path.exists(category_path):
-                for filename in os.listdir(category_path):
-                    file_path = os.path.join(category_path, filename)
-                    if os.path.isfile(file_path) and self.file_is_valid(file_path, self.config.get('extensions', [])):
-                        database.insert_file_if_not_exists(file_path, category)
-                    processed_files += 1
-                    self.progress['value'] = processed_files  # Aktualisiere den Fortschrittsbalken
-                    self.progress_label.config(text=f"Verarbeite {processed_files}/{total_files} Dateien...")
-                    self.root.update_idletasks()
-
-        self.progress_label.config(text="Fertig!")
-        self.progress['value'] = 0  # Setze den Fortschrittsbalken zurück
-        
+        self.ingestions = {}
+        libraries = []
+        for library in config.library_list(self.config):
+            if library['name'] != self.library['name'] and not os.path.isdir(library['file_path']):
+                print(f"Bibliothek '{library['name']}' ist nicht erreichbar und wird nicht eingelesen.")
+                continue
+            libraries.append(library)
+        # Die Prozesse für das Auslesen der Metadaten auf die Bibliotheken aufteilen, statt je Bibliothek alle Kerne zu belegen
+        settings = dict(self.config.get('ingestion') or {})
+        workers = settings.get('extract_workers', ingestion.DEFAULT_SETTINGS['extract_workers'])
+        if workers > 0:
+            settings['extract_workers'] = max(1, workers // len(libraries))
+        for library in libraries:
+            if library['name'] != self.library['name']:
+                database.create_table(library['database'])
+            sources = [(category, os.path.join(library['file_path'], category)) for category in library['categories']]
+            pipeline = ingestion.IngestionPipeline(self.config.get('extensions', []), settings, library['database'])
+            pipeline.start(sources=sources)
+            self.ingestions[library['name']] = pipeline
+            self.start_watcher(library, sources, pipeline)
+        self.ingestion = self.ingestions[self.library['name']]
+        self.check_ingestion_progress(on_finished)
+
+    def start_watcher(self, library, sources, pipeline):
+        """
+        Startet die Ordnerüberwachung einer Bibliothek. Sie wartet das Einlesen beim Start ab,
+        damit keine Datei von beiden zugleich eingefügt wird.
+        """
+        settings = dict(watcher.DEFAULT_SETTINGS, **(self.config.get('watcher') or {}))
+        previous = self.watchers.pop(library['name'], None)
+        if previous is not None:
+            previous.cancel()
+        if not settings['enabled']:
+            return
+        folder_watcher = watcher.FolderWatcher(sources, self.config.get('extensions', []), settings, library['database'], after=pipeline)
+        folder_watcher.start()
+        self.watchers[library['name']] = folder_watcher
+
+    def check_ingestion_progress(self, on_finished=None, finished=None):
+        """
+        Aktualisiert den Fortschrittsbalken, solange eine Einlese-Pipeline läuft.
+
+        :param on_finished: Optionale Funktion, die nach dem Einlesen der aktiven Bibliothek aufgerufen wird.
+        :param finished: Die Namen der bereits abgeschlossenen Bibliotheken.
+        """
+        finished = set() if finished is None else finished
+        discovered = processed = 0
+        newly_finished = []
+        for name, pipeline in self.ingestions.items():
+            library_discovered, library_processed = pipeline.progress()
+            discovered += library_discovered
+            processed += library_processed
+            if name not in finished and not pipeline.is_running():
+                finished.add(name)
+                newly_finished.append(name)
+
+        if len(finished) < len(self.ingestions):
+            self.progress['maximum'] = max(discovered, 1)  # Gesamtzahl der bisher gefundenen Dateien setzen
+            self.progress['value'] = processed  # Aktualisiere den Fortschrittsbalken
+            self.progress_label.config(text=f"Verarbeite {processed}/{discovered} Dateien...")
+            self.root.after(100, self.check_ingestion_progress, on_finished, finished)
+        else:
+            self.progress_label.config(text="Fertig!")
+            self.progress['value'] = 0  # Setze den Fortschrittsbalken zurück
+
+        for name in newly_finished:
+            pipeline = self.ingestions[name]
+            prefix = f"[{name}] " if len(self.ingestions) > 1 else ""
+            for stage in pipeline.summary():
+                print(f"{prefix}Einlesen {stage['stufe']}: {stage['dateien']} Dateien, {stage['fehler']} Fehler, "
+                      f"{stage['aktiv_s']} s aktiv, {stage['dateien_pro_s']} Dateien/s")
+            if pipeline.relinked:
+                print(f"{prefix}{len(pipeline.relinked)} verschobene oder umbenannte Dateien wurden ihrem Dokument zugeordnet.")
+            if pipeline.error:
+                messagebox.showerror("Einlesen fehlgeschlagen", f"{prefix}{pipeline.error}")
+            if pipeline is self.ingestion:
+                self.poll_changes_now()
+                if on_finished is not None:
+                    on_finished()
+
     def delete_not_existing_files(self):
         """
         Durchsucht den Standardpfad nach neuen Dateien und fügt sie in die Datenbank ein, falls sie noch nicht vorhanden sind.
@@ -300,6 +564,120 @@ class DocumentManagerGUI:
         self.progress_label.config(text=f"Überprüfung abgeschlossen. {deleted_count} ungültige Links gelöscht.")
         self.progress['value'] = 0  # Fortschrittsbalken zurücksetzen
         
+    def register_activity(self, event=None):
+        self.last_activity = time.monotonic()
+
+    def check_maintenance(self):
+        """
+        Startet die fälligen Wartungsaufgaben im Hintergrund, sobald die Anwendung untätig ist
+        und kein Einlesen läuft. Welche Aufgaben fällig sind, entscheidet maintenance.run_tasks.
+        """
+        idle = time.monotonic() - self.last_activity >= self.config.get('maintenance_idle_s', MAINTENANCE_IDLE_S)
+        if idle and not any(pipeline.is_running() for pipeline in self.ingestions.values()):
+            self.start_maintenance()
+        self.root.after(MAINTENANCE_CHECK_MS, self.check_maintenance)
+
+    def start_maintenance(self, force=False, on_finished=None, tasks=None):
+        """
+        Führt die Wartung in einem eigenen Thread aus, damit die Oberfläche nicht blockiert.
+
+        :param force: True, um alle Aufgaben unabhängig vom letzten Lauf auszuführen.
+        :param on_finished: Optionale Funktion, die nach der Wartung aufgerufen wird.
+        :param tasks: Die auszuführenden Aufgaben, standardmäßig die zeitgesteuerten.
+        :return: False, wenn bereits eine Wartung läuft.
+        """
+        if self.maintenance_thread is not None and self.maintenance_thread.is_alive():
+            return False
+        def run():
+            self.maintenance_results = maintenance.run_tasks(tasks, force=force)
+        self.maintenance_thread = threading.Thread(target=run, name='wartung', daemon=True)
+        self.maintenance_thread.start()
+        self.check_maintenance_progress(on_finished)
+        return True
+
+    def check_maintenance_progress(self, on_finished=None):
+        if self.maintenance_thread.is_alive():
+            self.root.after(200, self.check_maintenance_progress, on_finished)
+            return
+        errors = [f"{maintenance.TASK_LABELS[task]}: {result}"
+                  for task, result in self.maintenance_results.items() if result.startswith("Fehler")]
+        if errors:
+            messagebox.showwarning("Wartung", "\n".join(errors))
+        if on_finished is not None:
+            on_finished()
+
+    def open_diagnostics_window(self):
+        """
+        Zeigt Größe und Fragmentierung der Datenbank sowie Zeitpunkt, Dauer und Ergebnis der letzten Wartungsläufe an.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Diagnose")
+        text = tk.Text(window, width=90, height=20)
+        text.pack(fill='both', expand=True, padx=10, pady=10)
+
+        def refresh():
+            try:
+                stats = maintenance.collect_statistics()
+            except (sqlite3.Error, OSError) as e:
+                messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}")
+                return
+            lines = [
+                f"Datenbank: {stats['datei']}",
+                f"Größe: {stats['groesse_bytes'] / (1024 * 1024):.2f} MB",
+                f"Seiten: {stats['seiten']} zu {stats['seitengroesse']} Bytes",
+                f"Freie Seiten: {stats['freie_seiten']} ({stats['fragmentierung']:.1%} Fragmentierung)",
+                f"auto_vacuum: {stats['auto_vacuum']}",
+                f"Dokumente im Speicher: {len(self.store)}",
+            ]
+            for name, folder_watcher in self.watchers.items():
+                waiting, ingested, batches, error = folder_watcher.progress()
+                state = (folder_watcher.mode or "wartet auf das Einlesen") if folder_watcher.is_running() else "beendet"
+                lines.append(f"Ordnerüberwachung {name}: {state}, {waiting} Dateien wartend, "
+                             f"{ingested} Dateien in {batches} Stapeln eingelesen")
+                if error:
+                    lines.append(f"  Letzter Fehler: {error}")
+            lines += ["", "Wartung:"]
+            for task, label in maintenance.TASK_LABELS.items():
+                run = stats['verlauf'].get(task)
+                if run is None or not run['zuletzt']:
+                    lines.append(f"  {label}: noch nicht ausgeführt")
+                    continue
+                when = time.strftime('%d.%m.%Y %H:%M', time.localtime(run['zuletzt']))
+                duration = f"{run['dauer_s']:.2f} s" if run['dauer_s'] is not None else "läuft"
+                lines.append(f"  {label}: {when}, {duration}, {run['ergebnis'] or ''}")
+            text.config(state='normal')
+            text.delete('1.0', tk.END)
+            text.insert(tk.END, "\n".join(lines))
+            text.config(state='disabled')
+            vacuum_button.config(state='disabled' if stats['auto_vacuum'] == 'INCREMENTAL' else 'normal')
+
+        def run_now(tasks=None):
+            def finished():
+                if window.winfo_exists():
+                    run_button.config(state='normal')
+                    refresh()
+            if self.start_maintenance(force=True, on_finished=finished, tasks=tasks):
+                run_button.config(state='disabled')
+                vacuum_button.config(state='disabled')
+            else:
+                messagebox.showinfo("Wartung", "Die Wartung läuft bereits.", parent=window)
+
+        def enable_incremental_vacuum():
+            # Das VACUUM sperrt die Datenbank für alle Instanzen, bis die Datei neu aufgebaut ist
+            if messagebox.askyesno("auto_vacuum umstellen",
+                                   "Die Datenbank wird dafür vollständig neu aufgebaut. Bis dahin können andere Instanzen "
+                                   "nicht auf die Datenbank zugreifen. Jetzt umstellen?", parent=window):
+                run_now(['enable_incremental_vacuum'])
+
+        button_frame = tk.Frame(window)
+        button_frame.pack(pady=(0, 10))
+        tk.Button(button_frame, text="Aktualisieren", command=refresh).pack(side='left', padx=5)
+        run_button = tk.Button(button_frame, text="Wartung jetzt ausführen", command=run_now)
+        run_button.pack(side='left', padx=5)
+        vacuum_button = tk.Button(button_frame, text="auto_vacuum umstellen", command=enable_incremental_vacuum)
+        vacuum_button.pack(side='left', padx=5)
+        refresh()
+
     def create_menu(self):
         """
         Erstellt das Hauptmenü der Anwendung.
@@ -312,8 +690,156 @@ class DocumentManagerGUI:
         file_menu.add_command(label="Standardpfad aendern", command=config.change_default_path)
         file_menu.add_command(label="Importieren aus CSV", command=self.import_from_csv)
         file_menu.add_command(label="Exportieren als CSV", command=self.export_to_csv)
+        file_menu.add_command(label="Bündel exportieren (ZIP)", command=self.export_bundle)
         menu_bar.add_cascade(label="Datei", menu=file_menu)
 
+        edit_menu = Menu(menu_bar, tearoff=0)
+        edit_menu.add_command(label="Rückgängig", accelerator="Strg+Z", command=lambda: self.switch_operation(undo=True))
+        edit_menu.add_command(label="Wiederholen", accelerator="Strg+Y", command=lambda: self.switch_operation(undo=False))
+        edit_menu.add_separator()
+        edit_menu.add_command(label="Verlauf...", command=self.open_journal_window)
+        menu_bar.add_cascade(label="Bearbeiten", menu=edit_menu)
+        self.root.bind('<Control-z>', lambda event: self.switch_operation(undo=True))
+        self.root.bind('<Control-y>', lambda event: self.switch_operation(undo=False))
+
+        tag_menu = Menu(menu_bar, tearoff=0)
+        tag_menu.add_command(label="Nach Tags filtern...", command=self.open_tag_filter_window)
+        tag_menu.add_command(label="Filter aufheben", command=lambda: self.set_tag_filter([]))
+        menu_bar.add_cascade(label="Tags", menu=tag_menu)
+
+        library_list = config.library_list(self.config)
+        if len(library_list) > 1:
+            library_menu = Menu(menu_bar, tearoff=0)
+            self.library_var = tk.StringVar(self.root, value=self.library['name'])
+            for library in library_list:
+                library_menu.add_radiobutton(label=library['name'], variable=self.library_var, value=library['name'],
+                                             command=lambda name=library['name']: self.switch_library(name))
+            library_menu.add_separator()
+            library_menu.add_command(label="Alle Bibliotheken durchsuchen", command=self.open_combined_window)
+            menu_bar.add_cascade(label="Bibliothek", menu=library_menu)
+
+        extras_menu = Menu(menu_bar, tearoff=0)
+        extras_menu.add_command(label="Ähnliche Dokumente suchen", command=self.search_duplicates)
+        extras_menu.add_command(label="Ähnliche Dokumente anzeigen", command=self.open_duplicates_window)
+        extras_menu.add_command(label="Diagnose", command=self.open_diagnostics_window)
+        menu_bar.add_cascade(label="Extras", menu=extras_menu)
+
+    def switch_library(self, name, select_id=None):
+        """
+        Wechselt die aktive Bibliothek und lädt ihre Dokumente. Die Auswahl wird in der Konfiguration gespeichert.
+
+        :param name: Der Name der Bibliothek.
+        :param select_id: Optional die ID eines Dokuments, das danach ausgewählt wird.
+        """
+        if name != self.library['name']:
+            config.set_active_library(name)
+            # Als Vorgabe für den nächsten Start speichern
+            stored = config.read_config()
+            stored['active_library'] = name
+            config.save_config(stored)
+            self.library = config.active_library(self.config)
+
+            database.create_table()
+            self.change_monitor.conn.close()
+            self.change_monitor = database.ChangeMonitor()
+            self.load_indexes()
+            self.tag_filter = None
+            self.tag_filter_ids = set()
+            self.ingestion = self.ingestions.get(name, self.ingestion)
+            self.load_and_display_documents()
+            self.library_var.set(name)
+            self.update_title()
+        if select_id is not None and self.tree.exists(str(select_id)):
+            self.tree.selection_set(str(select_id))
+            self.tree.see(str(select_id))
+
+    def open_combined_window(self):
+        """
+        Durchsucht alle Bibliotheken gemeinsam. Die Datenbanken werden schreibgeschützt angehängt,
+        Suche und Sortierung laufen in einer Abfrage; angezeigt werden jeweils 500 Treffer.
+        """
+        combined = libraries.CombinedLibrary(config.library_list(self.config))
+        if combined.unavailable:
+            messagebox.showwarning("Bibliotheken", "Nicht verfügbar:\n" + "\n".join(f"{name}: {reason}" for name, reason in combined.unavailable))
+
+        window = tk.Toplevel(self.root)
+        window.title("Alle Bibliotheken durchsuchen")
+        window.bind('<Destroy>', lambda event: combined.close() if event.widget is window else None)
+
+        search_frame = tk.Frame(window)
+        search_frame.grid(row=0, column=0, columnspan=2, sticky='ew', padx=5, pady=5)
+        tk.Label(search_frame, text="Suche:").pack(side='left')
+        search_entry = tk.Entry(search_frame, width=40)
+        search_entry.pack(side='left', padx=5)
+        tk.Label(search_frame, text="Kategorie:").pack(side='left')
+        categories = sorted({category for library in config.library_list(self.config) for category in library['categories']})
+        category_box = ttk.Combobox(search_frame, values=[''] + categories, state='readonly', width=20)
+        category_box.pack(side='left', padx=5)
+        result_label = tk.Label(search_frame, text="")
+        result_label.pack(side='left', padx=10)
+
+        columns = ('Bibliothek',) + tuple(column.capitalize() for column in document_store.COLUMNS)
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=20)
+        for column, width in zip(columns, (120, 250, 120, 80, 100, 300, 120)):
+            tree.heading(column, text=column, command=lambda column=column: sort_by(column.lower()))
+            tree.column(column, width=width)
+        scroll = tk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scroll.set)
+        tree.grid(row=1, column=0, sticky='nsew', padx=(5, 0))
+        scroll.grid(row=1, column=1, sticky='ns')
+        window.grid_rowconfigure(1, weight=1)
+        window.grid_columnconfigure(0, weight=1)
+
+        state = {'sort': 'erstelldatum', 'descending': False, 'offset': 0}
+        rows = {}  # Item-ID -> (Bibliothek, Dokument-ID, Link)
+
+        def search(append=False):
+            if not append:
+                state['offset'] = 0
+                tree.delete(*tree.get_children())
+                rows.clear()
+            try:
+                total, results = combined.search(search_entry.get().strip(), category_box.get() or None,
+                                                 state['sort'], state['descending'], offset=state['offset'])
+            except sqlite3.Error as e:
+                messagebox.showerror("Datenbankfehler", f"Ein Fehler ist aufgetreten: {e}", parent=window)
+                return
+            for row in results:
+                item = tree.insert('', 'end', values=(row[0],) + tuple(row[2:]))
+                rows[item] = (row[0], row[1], row[6])
+            state['offset'] += len(results)
+            result_label.config(text=f"{state['offset']} von {total} Treffern")
+            more_button.config(state='normal' if state['offset'] < total else 'disabled')
+
+        def sort_by(column):
+            state['descending'] = not state['descending'] if state['sort'] == column else False
+            state['sort'] = column
+            search()
+
+        def show_in_library():
+            selection = tree.selection()
+            if selection:
+                name, doc_id, link = rows[selection[0]]
+                self.switch_library(name, select_id=doc_id)
+
+        def open_document_folder():
+            selection = tree.selection()
+            if selection:
+                self.open_folder(rows[selection[0]][2])
+
+        search_entry.bind('<Return>', lambda event: search())
+        category_box.bind('<<ComboboxSelected>>', lambda event: search())
+        tree.bind('<Double-1>', lambda event: open_document_folder())
+
+        button_frame = tk.Frame(window)
+        button_frame.grid(row=2, column=0, columnspan=2, pady=5)
+        tk.Button(button_frame, text="Suchen", command=search).pack(side='left', padx=5)
+        more_button = tk.Button(button_frame, text="Weitere laden", command=lambda: search(append=True))
+        more_button.pack(side='left', padx=5)
+        tk.Button(button_frame, text="In Bibliothek anzeigen", command=show_in_library).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Ordner öffnen", command=open_document_folder).pack(side='left', padx=5)
+        search()
+
     def open_update_window(self):
         selected_items = self.tree.selection()
         if not selected_items:
@@ -322,7 +848,7 @@ class DocumentManagerGUI:
 
         update_window = tk.Toplevel(self.root)
         update_window.title("Merkmale setzen")
-        update_window.geometry("400x200")
+        update_window.geometry("400x260")
 
         # Dropdown-Menü für die Auswahl des Merkmals
         tk.Label(update_window, text="Merkmal:").grid(row=0, column=0, sticky="w")
@@ -333,22 +859,87 @@ class DocumentManagerGUI:
 
         # Eingabefeld für den neuen Wert des Merkmals
         tk.Label(update_window, text="Neuer Wert:").grid(row=1, column=0, sticky="w")
-        new_value_entry = tk.Entry(update_window)
+        new_value_entry = autocomplete.AutocompleteEntry(update_window)
         new_value_entry.grid(row=1, column=1, sticky="w")
 
+        # Vorschläge passend zum gewählten Merkmal anbieten
+        def on_attribute_change(*args):
+            new_value_entry.index = self.autocomplete_indexes.get(attribute_var.get().lower())
+        attribute_var.trace("w", on_attribute_change)
+
         def update_documents():
             attribute = attribute_var.get().lower()
             new_value = new_value_entry.get()
             if attribute and new_value:
-                ids = [database.get_document_id_by_link(self.tree.item(item, "values")[4]) for item in selected_items]  # Angenommen, der Link ist das fünfte Element in values
-                database.update_multiple_documents(ids, {attribute: new_value})
+                ids = [int(item) for item in selected_items]  # Die Item-ID ist die Dokument-ID
+                # Die Autovervollständigung übernimmt je Dokument alten und neuen Wert über den Abgleich
+                if database.update_multiple_documents(ids, {attribute: new_value}) is not None:
+                    self.poll_changes_now()
                 update_window.destroy()
-                self.load_and_display_documents()
             else:
                 messagebox.showerror("Fehler", "Bitte wählen Sie ein Merkmal und geben Sie einen neuen Wert ein.")
 
         update_button = tk.Button(update_window, text="Aktualisieren", command=update_documents)
         update_button.grid(row=2, column=1, sticky="w")
+
+        # Tags für alle ausgewählten Dokumente hinzufügen oder entfernen, mehrere Tags durch Kommas trennen
+        tk.Label(update_window, text="Tags:").grid(row=3, column=0, sticky="w", pady=(15, 0))
+        tag_entry = autocomplete.AutocompleteEntry(update_window, index=self.tag_index)
+        tag_entry.grid(row=3, column=1, sticky="w", pady=(15, 0))
+
+        def change_tags(add):
+            names = self.parse_tag_names(tag_entry.get())
+            if not names:
+                messagebox.showerror("Fehler", "Bitte geben Sie mindestens ein Tag ein.", parent=update_window)
+                return
+            ids = [int(item) for item in selected_items]
+            if add:
+                database.add_tags(ids, names)
+            else:
+                database.remove_tags(ids, names)
+            # Häufigkeiten ändern sich je nach vorhandenen Zuordnungen, daher den Index neu aufbauen
+            self.tag_index = autocomplete.PrefixIndex(database.load_tag_counts())
+            tag_entry.index = self.tag_index
+            update_window.destroy()
+            self.poll_changes_now()
+
+        tag_button_frame = tk.Frame(update_window)
+        tag_button_frame.grid(row=4, column=1, sticky="w")
+        tk.Button(tag_button_frame, text="Tags hinzufügen", command=lambda: change_tags(True)).pack(side='left')
+        tk.Button(tag_button_frame, text="Tags entfernen", command=lambda: change_tags(False)).pack(side='left', padx=(5, 0))
+
+    def open_tag_filter_window(self):
+        """
+        Öffnet ein Fenster, in dem Tags mit ihrer Häufigkeit ausgewählt und als UND- oder ODER-Filter angewendet werden.
+        """
+        filter_window = tk.Toplevel(self.root)
+        filter_window.title("Nach Tags filtern")
+
+        tag_counts = database.load_tag_counts()
+        listbox = tk.Listbox(filter_window, selectmode='multiple', width=40, height=15, exportselection=False)
+        listbox.pack(fill='both', expand=True, padx=10, pady=10)
+        active = {name.casefold() for name in self.tag_filter[0]} if self.tag_filter else set()
+        for index, (name, count) in enumerate(tag_counts):
+            listbox.insert(tk.END, f"{name} ({count})")
+            if name.casefold() in active:
+                listbox.selection_set(index)
+
+        match_all_var = tk.BooleanVar(filter_window, value=self.tag_filter[1] if self.tag_filter else True)
+        tk.Radiobutton(filter_window, text="Alle ausgewählten Tags", variable=match_all_var, value=True).pack(anchor='w', padx=10)
+        tk.Radiobutton(filter_window, text="Mindestens eines der Tags", variable=match_all_var, value=False).pack(anchor='w', padx=10)
+
+        def apply_filter():
+            self.set_tag_filter([tag_counts[index][0] for index in listbox.curselection()], match_all_var.get())
+            filter_window.destroy()
+
+        def reset_filter():
+            self.set_tag_filter([])
+            filter_window.destroy()
+
+        button_frame = tk.Frame(filter_window)
+        button_frame.pack(pady=10)
+        tk.Button(button_frame, text="Filtern", command=apply_filter).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Filter aufheben", command=reset_filter).pack(side='left', padx=5)
         
     def on_treeview_double_click(self, event):
         """
@@ -390,8 +981,7 @@ class DocumentManagerGUI:
         """
         selected_item = self.tree.selection()
         if selected_item:
-            item_values = self.tree.item(selected_item, "values")
-            id = database.get_document_id_by_link(item_values[4])
+            id = int(selected_item[0])  # Die Item-ID ist die Dokument-ID
             self.new_entry_window(id)
         else:
             messagebox.showinfo("Fehler", "Kein Element ausgewaehlt")
@@ -405,16 +995,12 @@ class DocumentManagerGUI:
         # Sammeln aller relevanten Dokumentinformationen vor jeglicher Verarbeitung
         documents_info = []
         for selected_item in selected_items:
-            item_values = self.tree.item(selected_item, "values")
-            document_id = database.get_document_id_by_link(item_values[4])  # Annahme: Link befindet sich im 5. Element von 'values'
-            if document_id:
-                document_data = database.get_document_by_id(document_id)
-                if document_data:
-                    documents_info.append((document_id, document_data))
-                else:
-                    messagebox.showerror("Fehler", f"Keine Daten für Dokument-ID {document_id} gefunden.")
+            document_id = int(selected_item)  # Die Item-ID ist die Dokument-ID
+            document_data = self.store.get(document_id)
+            if document_data:
+                documents_info.append((document_id, document_data))
             else:
-                messagebox.showerror("Fehler", f"Keine ID für das Dokument mit dem Link {item_values[4]} gefunden.")
+                messagebox.showerror("Fehler", f"Keine Daten für Dokument-ID {document_id} gefunden.")
         
         # Verarbeitung der gesammelten Dokumentinformationen
         for document_id, doc_data in documents_info:
@@ -479,7 +1065,7 @@ class DocumentManagerGUI:
                             print(f"von  {link}\nnach {new_name}")
                     shutil.move(link, new_name)
                     database.update_document_link(document_id, new_name)
-                    self.load_and_display_documents()
+                    self.poll_changes_now()
                     rename_window.destroy()
                     break  # Beende die Schleife, wenn erfolgreich
                 except IOError as e:
@@ -533,7 +1119,7 @@ class DocumentManagerGUI:
             if messagebox.askyesno("Bestaetigung", "Die Datei befindet sich nicht im erwarteten Verzeichnis.\nSoll sie kopiert werden?"):
                 try:
                     filename = os.path.basename(link)
-                    erstelldatum = time.strftime('%Y%m%d', time.localtime(os.path.getmtime(link))) + "_"
+                    erstelldatum = time.strftime('%Y%m%d', metadata.get_creation_time(link)) + "_"
                     new_filename = erstelldatum + filename
                     if filename.startswith(new_filename): 
                         erstelldatum = ""
@@ -553,13 +1139,17 @@ class DocumentManagerGUI:
                 entries['Link'].get(),
                 entries['Autor'].get()
             )
-            self.load_and_display_documents()
+            # Neue Dokumente übernimmt der Abgleich auch in die Autovervollständigung
+            self.poll_changes_now()
 
             
         window.destroy()
         
     def detect_changes_and_update(self, id, new_data):
-        existing_data = database.get_document_by_id(id)
+        try:
+            existing_data = self.store.get(int(id))  # Beim CSV-Import liegt die ID als Text vor
+        except (TypeError, ValueError):
+            existing_data = None
         if existing_data:
             changes = []
             columns = ['beschreibung', 'kategorie', 'seitenzahl', 'erstelldatum', 'link', 'autor']
@@ -572,15 +1162,108 @@ class DocumentManagerGUI:
                 for change in changes:
                     print(f"  {change}")
                     
-                # Aktualisieren des Datensatzes in der Datenbank
-                database.insert_document(id, *new_data)
-                self.load_and_display_documents()
+                # Aktualisieren des Datensatzes in der Datenbank, als Vorgang im Journal
+                database.update_documents({int(id): dict(zip(document_store.COLUMNS, new_data))},
+                                          f"Dokument bearbeiten: {new_data[0]}")
+                self.poll_changes_now()
                 return True
             return False
         else:
             print(f"Dokument {id} nicht gefunden.")
             return False
 
+    def switch_operation(self, operation_id=None, undo=True):
+        """
+        Macht einen Vorgang aus dem Journal rückgängig oder wiederholt ihn und aktualisiert die Ansicht.
+
+        :param operation_id: Die ID des Vorgangs; None für den letzten Vorgang bzw. den zuletzt rückgängig gemachten.
+        :param undo: True zum Rückgängigmachen, False zum Wiederholen.
+        :return: True, wenn der Vorgang ausgeführt wurde.
+        """
+        beschreibung, conflicts = database.switch_operation(operation_id, undo)
+        if beschreibung is None:
+            messagebox.showinfo("Hinweis", "Nichts rückgängig zu machen." if undo else "Nichts zu wiederholen.")
+            return False
+        if conflicts:
+            messagebox.showwarning("Konflikt", f"'{beschreibung}' kann nicht {'rückgängig gemacht' if undo else 'wiederholt'} werden: "
+                                               f"{conflicts} Dokumente wurden inzwischen geändert.")
+            return False
+        # Zurückgesetzte Werte übernimmt der Abgleich in die Autovervollständigung, wiederhergestellte Tags nicht
+        self.poll_changes_now()
+        self.tag_index = autocomplete.PrefixIndex(database.load_tag_counts())
+        self.progress_label.config(text=f"{'Rückgängig' if undo else 'Wiederholt'}: {beschreibung}")
+        return True
+
+    def open_journal_window(self):
+        """
+        Zeigt die letzten Vorgänge des Journals an. Jeder Vorgang kann einzeln rückgängig gemacht oder wiederholt werden,
+        solange die betroffenen Dokumente seitdem nicht anderweitig geändert wurden.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Verlauf")
+        columns = ('Zeitpunkt', 'Vorgang', 'Dokumente', 'Status')
+        tree = ttk.Treeview(window, columns=columns, show='headings', height=15, selectmode='browse')
+        for column, width in zip(columns, (130, 380, 80, 140)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        scroll = tk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scroll.set)
+        tree.grid(row=0, column=0, sticky='nsew', padx=(5, 0), pady=5)
+        scroll.grid(row=0, column=1, sticky='ns', pady=5)
+        window.grid_rowconfigure(0, weight=1)
+        window.grid_columnconfigure(0, weight=1)
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            for operation_id, zeitpunkt, beschreibung, anzahl, rueckgaengig in database.load_journal():
+                status = "wirksam" if rueckgaengig is None else \
+                    "rückgängig seit " + time.strftime('%H:%M', time.localtime(rueckgaengig))
+                tree.insert('', 'end', iid=str(operation_id), values=(
+                    time.strftime('%d.%m.%Y %H:%M', time.localtime(zeitpunkt)), beschreibung, anzahl, status))
+
+        def switch(undo):
+            selection = tree.selection()
+            if not selection:
+                messagebox.showinfo("Hinweis", "Bitte wählen Sie einen Vorgang aus.", parent=window)
+                return
+            if self.switch_operation(int(selection[0]), undo):
+                refresh()
+                if tree.exists(selection[0]):
+                    tree.selection_set(selection[0])
+
+        button_frame = tk.Frame(window)
+        button_frame.grid(row=1, column=0, columnspan=2, sticky='w', padx=5, pady=5)
+        tk.Button(button_frame, text="Rückgängig machen", command=lambda: switch(True)).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Wiederholen", command=lambda: switch(False)).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Aktualisieren", command=refresh).pack(side='left', padx=5)
+        refresh()
+
+    def update_autocomplete(self, new_data, old_data=None):
+        """
+        Aktualisiert die Präfixindizes der Autovervollständigung nach dem Ändern eines Dokuments.
+
+        :param new_data: Die neuen Werte in der Reihenfolge beschreibung, kategorie, seitenzahl, erstelldatum, link, autor.
+        :param old_data: Die bisherigen Werte oder None bei einem neuen Dokument.
+        """
+        for column, index in self.autocomplete_indexes.items():
+            position = document_store.COLUMNS.index(column)
+            if old_data is not None:
+                if str(old_data[position]) == str(new_data[position]):
+                    continue
+                index.discard(old_data[position])
+            index.add(new_data[position])
+
+    def remove_autocomplete(self, old_data):
+        """
+        Entfernt die Werte eines gelöschten Dokuments aus den Präfixindizes der Autovervollständigung.
+
+        :param old_data: Die bisherigen Werte oder None, wenn das Dokument nicht geladen war.
+        """
+        if old_data is None:
+            return
+        for column, index in self.autocomplete_indexes.items():
+            index.discard(old_data[document_store.COLUMNS.index(column)])
+
     def choose_date(self, entry):
         """
         Öffnet ein Kalender-Widget, um ein Datum auszuwählen und das ausgewählte Datum in das übergebene Eingabefeld einzufügen.
@@ -622,11 +1305,7 @@ class DocumentManagerGUI:
         :param col: Die Spalte, nach der sortiert werden soll.
         :param reverse: Gibt an, ob in aufsteigender oder absteigender Reihenfolge sortiert werden soll.
         """
-        # Speichere die aktuell ausgewählten Einträge
-        selected_items = [self.tree.item(item, "values") for item in self.tree.selection()]
-
-        children = self.tree.get_children()
-        if not children:
+        if not self.visible_order:
             return
 
         # Aktualisiere die Sortierkriterien
@@ -636,16 +1315,14 @@ class DocumentManagerGUI:
         else:    
             self.sort_direction = not self.sort_direction
 
-        # Lade die Einträge neu
-        self.load_and_display_documents()
+        # Im Speicher sortieren und die vorhandenen Einträge in einem Aufruf umordnen, die Auswahl bleibt dabei erhalten
+        self.visible_order = self.store.sorted_ids(self.sort_column, self.sort_direction, self.document_filter())
+        self.tree.set_children('', *map(str, self.visible_order))
 
-        # Stelle die ursprüngliche Auswahl und das mittlere sichtbare Item wieder her
-        index = 0
-        for item in self.tree.get_children():
-            if self.tree.item(item, "values") in selected_items:
-                self.tree.selection_add(item)
-                
-        # Setze den Fokus zurück auf das TreeView und wähle das erste Element in der Liste aus, wenn vorhanden
+        # Setze den Fokus zurück auf das TreeView und zeige das erste ausgewählte Element an, wenn vorhanden
+        selection = self.tree.selection()
+        if selection:
+            self.tree.see(selection[0])
         self.tree.focus_set()
             
     def import_from_csv(self):
@@ -667,18 +1344,30 @@ class DocumentManagerGUI:
             # Überschriftenzeile überspringen
             headers = rows.pop(0)
 
-            # Verarbeitung jeder Zeile
+            # Verarbeitung jeder Zeile; die Änderungen werden gesammelt und als ein Vorgang gespeichert
+            updates = {}
             for index, row in enumerate(rows, start=1):
                 id = row[0]
                 new_data = row[1:7]
                 # Entfernen des führenden Hochkommas bei der Seitenzahl, falls vorhanden
                 new_data[2] = new_data[2].replace("'", "")
-                self.detect_changes_and_update(id, new_data)
-                self.progress['value'] = index
-                self.progress_label.config(text=f"Verarbeitet {index} von {total_rows} Datensätzen")
-                self.root.update_idletasks()  # Aktualisieren der GUI, um den Fortschritt anzuzeigen
-
-            self.progress_label.config(text="Import abgeschlossen!")
+                try:
+                    existing_data = self.store.get(int(id))
+                except ValueError:
+                    existing_data = None
+                if existing_data is None:
+                    print(f"Dokument {id} nicht gefunden.")
+                elif any(str(new) != str(old) for new, old in zip(new_data, existing_data)):
+                    updates[int(id)] = dict(zip(document_store.COLUMNS, new_data))
+                if index % 500 == 0 or index == total_rows:
+                    self.progress['value'] = index
+                    self.progress_label.config(text=f"Verarbeitet {index} von {total_rows} Datensätzen")
+                    self.root.update_idletasks()  # Aktualisieren der GUI, um den Fortschritt anzuzeigen
+
+            if updates:
+                database.update_documents(updates, f"CSV-Import: {os.path.basename(csv_file_path)} ({len(updates)} Dokumente)")
+                self.poll_changes_now()
+            self.progress_label.config(text=f"Import abgeschlossen, {len(updates)} Dokumente geändert!")
             self.progress['value'] = 0  # Fortschrittsbalken zurücksetzen
 
     def export_to_csv(self):
@@ -703,14 +1392,179 @@ class DocumentManagerGUI:
         
         messagebox.showinfo("Export erfolgreich", f"Dokumente wurden erfolgreich nach '{csv_file_path}' exportiert.")
 
+    def export_bundle(self):
+        """
+        Exportiert die ausgewählten Dokumente, ohne Auswahl alle angezeigten (ggf. gefilterten) Dokumente,
+        als ZIP-Archiv mit Verzeichnis der Metadaten. Der Export läuft im Hintergrund.
+        """
+        if self.bundle_export is not None and self.bundle_export.is_running():
+            messagebox.showinfo("Export", "Es läuft bereits ein Export.")
+            return
+        ids = [int(item) for item in self.tree.selection()] or list(self.visible_order)
+        if not ids:
+            messagebox.showinfo("Hinweis", "Es sind keine Dokumente zum Exportieren vorhanden.")
+            return
+        target_path = filedialog.asksaveasfilename(title="Bündel exportieren", defaultextension=".zip",
+                                                   filetypes=[("ZIP-Archiv", "*.zip")], initialfile="dokumente.zip")
+        if not target_path:
+            return
+
+        self.bundle_export = export.BundleExport(target_path, [(doc_id, self.store.get(doc_id)) for doc_id in ids])
+        self.bundle_export.start()
+        self.cancel_export_button.pack(padx=5, pady=(0, 5))
+        self.check_export_progress()
+
+    def cancel_export(self):
+        if self.bundle_export is not None:
+            self.bundle_export.cancel()
+
+    def check_export_progress(self):
+        """
+        Zeigt Fortschritt und Durchsatz des laufenden Exports an.
+        """
+        files_done, files_total, bytes_done, bytes_total, throughput = self.bundle_export.progress()
+        megabyte = 1024 * 1024
+        self.progress['maximum'] = max(bytes_total, 1)
+        self.progress['value'] = bytes_done
+        self.progress_label.config(text=f"Exportiere {files_done}/{files_total} Dateien, "
+                                        f"{bytes_done / megabyte:.1f} von {bytes_total / megabyte:.1f} MB ({throughput / megabyte:.1f} MB/s)")
+
+        if self.bundle_export.is_running():
+            self.root.after(200, self.check_export_progress)
+            return
+
+        self.cancel_export_button.pack_forget()
+        self.progress['value'] = 0
+        if self.bundle_export.error is not None:
+            self.progress_label.config(text="Export fehlgeschlagen")
+            messagebox.showerror("Fehler", f"Der Export ist fehlgeschlagen: {self.bundle_export.error}")
+        elif self.bundle_export.cancelled.is_set():
+            self.progress_label.config(text="Export abgebrochen")
+        else:
+            self.progress_label.config(text=f"Export abgeschlossen: {files_total} Dokumente, {bytes_done / megabyte:.1f} MB "
+                                            f"({throughput / megabyte:.1f} MB/s)")
+            message = f"Dokumente wurden erfolgreich nach '{self.bundle_export.target_path}' exportiert."
+            if self.bundle_export.missing:
+                message += f"\n\n{len(self.bundle_export.missing)} Dateien wurden nicht gefunden und sind nur im Verzeichnis aufgeführt."
+            messagebox.showinfo("Export erfolgreich", message)
+
+    def search_duplicates(self):
+        """
+        Berechnet im Hintergrund die MinHash-Signaturen neuer PDF-Dokumente und sucht ähnliche Dokumente.
+        """
+        if self.duplicate_search is not None and self.duplicate_search.is_running():
+            messagebox.showinfo("Ähnliche Dokumente", "Die Suche läuft bereits.")
+            return
+        documents = [(doc_id, self.store.get(doc_id)[4]) for doc_id in self.store.values]
+        self.duplicate_search = duplicates.DuplicateSearch(documents, self.config.get('duplicates'))
+        self.duplicate_search.start()
+        self.cancel_duplicates_button.pack(padx=5, pady=(0, 5))
+        self.check_duplicate_progress()
+
+    def cancel_duplicate_search(self):
+        if self.duplicate_search is not None:
+            self.duplicate_search.cancel()
+
+    def check_duplicate_progress(self):
+        done, total, pair_count = self.duplicate_search.progress()
+        self.progress['maximum'] = max(total, 1)
+        self.progress['value'] = done
+        self.progress_label.config(text=f"Suche ähnliche Dokumente: {done}/{total} PDF-Dateien gelesen, {pair_count} Paare gefunden")
+
+        if self.duplicate_search.is_running():
+            self.root.after(200, self.check_duplicate_progress)
+            return
+
+        self.cancel_duplicates_button.pack_forget()
+        self.progress['value'] = 0
+        if self.duplicate_search.error is not None:
+            self.progress_label.config(text="Suche nach ähnlichen Dokumenten fehlgeschlagen")
+            messagebox.showerror("Fehler", f"Die Suche nach ähnlichen Dokumenten ist fehlgeschlagen: {self.duplicate_search.error}")
+            return
+        if self.duplicate_search.cancelled.is_set():
+            self.progress_label.config(text=f"Suche abgebrochen: {done} von {total} PDF-Dateien gelesen, {pair_count} neue Paare gefunden")
+            return
+        self.progress_label.config(text=f"Suche abgeschlossen: {done} PDF-Dateien gelesen, {pair_count} neue Paare gefunden")
+        self.open_duplicates_window()
+
+    def open_duplicates_window(self):
+        """
+        Zeigt die Gruppen wahrscheinlicher Duplikate zur Prüfung an. Gruppen können in der Hauptliste ausgewählt
+        (z. B. zum Löschen) oder als keine Duplikate verworfen werden.
+        """
+        window = tk.Toplevel(self.root)
+        window.title("Ähnliche Dokumente")
+        columns = ('Beschreibung', 'Kategorie', 'Erstelldatum', 'Link')
+        tree = ttk.Treeview(window, columns=columns, show='tree headings', height=20)
+        tree.heading('#0', text='Gruppe')
+        tree.column('#0', width=220, stretch=tk.NO)
+        for column, width in zip(columns, (250, 120, 100, 350)):
+            tree.heading(column, text=column)
+            tree.column(column, width=width)
+        scroll = tk.Scrollbar(window, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=scroll.set)
+        tree.grid(row=0, column=0, sticky='nsew', padx=(5, 0), pady=5)
+        scroll.grid(row=0, column=1, sticky='ns', pady=5)
+        window.grid_rowconfigure(0, weight=1)
+        window.grid_columnconfigure(0, weight=1)
+
+        clusters = {}  # Item-ID der Gruppe -> Dokument-IDs
+
+        def refresh():
+            tree.delete(*tree.get_children())
+            clusters.clear()
+            # Gelöschte Dokumente sind über den Trigger bereits aus den Paaren entfernt
+            for number, (ids, lowest) in enumerate(duplicates.build_clusters(database.load_duplicate_pairs()), start=1):
+                ids = [doc_id for doc_id in ids if doc_id in self.store]
+                if len(ids) < 2:
+                    continue
+                group = tree.insert('', 'end', text=f"Gruppe {number}: {len(ids)} Dokumente, ≥ {lowest:.0%}", open=True)
+                clusters[group] = ids
+                for doc_id in ids:
+                    beschreibung, kategorie, seitenzahl, erstelldatum, link, autor = self.store.get(doc_id)
+                    tree.insert(group, 'end', iid=f"{group}:{doc_id}", text=str(doc_id),
+                                values=(beschreibung, kategorie, erstelldatum, link))
+            if not clusters:
+                tree.insert('', 'end', text="Keine ähnlichen Dokumente gefunden")
+
+        def selected_group():
+            selection = tree.selection()
+            if not selection:
+                return None
+            return selection[0].split(':')[0] if ':' in selection[0] else selection[0]
+
+        def select_in_main_list():
+            group = selected_group()
+            if group in clusters:
+                ids = [str(doc_id) for doc_id in clusters[group] if self.tree.exists(str(doc_id))]
+                self.tree.selection_set(ids)
+                if ids:
+                    self.tree.see(ids[0])
+
+        def open_document_folder():
+            selection = tree.selection()
+            if selection and ':' in selection[0]:
+                self.open_folder(self.store.get(int(selection[0].split(':')[1]))[4])
+
+        def dismiss_group():
+            group = selected_group()
+            if group in clusters and messagebox.askyesno("Keine Duplikate", "Diese Gruppe als keine Duplikate markieren?", parent=window):
+                database.dismiss_duplicate_pairs(clusters[group])
+                refresh()
+
+        button_frame = tk.Frame(window)
+        button_frame.grid(row=1, column=0, columnspan=2, pady=(0, 5))
+        tk.Button(button_frame, text="In Hauptliste auswählen", command=select_in_main_list).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Ordner öffnen", command=open_document_folder).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Keine Duplikate", command=dismiss_group).pack(side='left', padx=5)
+        tk.Button(button_frame, text="Aktualisieren", command=refresh).pack(side='left', padx=5)
+        refresh()
+
     def clean_filename(self, filename):
         # Ersetze andere potenziell problematische Zeichen
         filename = filename.replace('/', '_').replace('\\', '_')
         return filename
 
-    def file_is_valid(self, file_path, extensions):
-        return any(file_path.lower().endswith(ext) for ext in extensions)
-
     def open_folder(self, path):
         """
         Öffnet den Ordner eines Dokuments im Dateimanager.
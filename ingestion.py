@@ -0,0 +1,471 @@
+# ingestion.py
+import os
+import queue
+import threading
+import time
+import hashlib
+import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import config
+import database
+import metadata
+import moves
+
+# Standardeinstellungen der Einlese-Pipeline, einzeln über den Konfigurationsschlüssel 'ingestion' überschreibbar
+DEFAULT_SETTINGS = {
+    'queue_size': 1000,  # Maximale Anzahl wartender Dateien je Warteschlange
+    'io_workers': 8,  # Threads für stat() und Fingerabdruck
+    'extract_workers': os.cpu_count() or 1,  # Prozesse für das Auslesen von PDF- und JPEG-Metadaten, 0 = im Thread
+    'batch_rows': 500,  # Spätestens nach so vielen Zeilen wird festgeschrieben
+    'batch_ms': 250,  # Spätestens nach so vielen Millisekunden wird festgeschrieben
+    'fingerprint_bytes': 64 * 1024,  # Gelesene Bytes vom Anfang und Ende einer Datei für den Fingerabdruck
+    'detect_moves': True,  # Verschobene oder umbenannte Dateien den bisherigen Dokumenten zuordnen
+}
+
+DONE = object()  # Markiert das Ende des Datenstroms in einer Warteschlange
+WAIT_INTERVAL = 0.1  # Sekunden, nach denen wartende Stufen prüfen, ob abgebrochen wurde
+
+class FileRecord:
+    """ Eine beim Einlesen gefundene Datei mit den in den einzelnen Stufen ermittelten Merkmalen. """
+    __slots__ = ('path', 'category', 'size', 'mtime_ns', 'device', 'inode', 'fingerprint', 'jpeg_metadata', 'seitenzahl')
+
+    def __init__(self, path, category):
+        self.path = path
+        self.category = category
+        self.size = None
+        self.mtime_ns = None
+        self.device = None
+        self.inode = None
+        self.fingerprint = None
+        self.jpeg_metadata = None
+        self.seitenzahl = "1"
+
+class StageStats:
+    """ Messwerte einer Pipeline-Stufe. """
+    __slots__ = ('name', 'items', 'errors', 'busy_seconds', 'started', 'finished')
+
+    def __init__(self, name):
+        self.name = name
+        self.items = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.started = None
+        self.finished = None
+
+    def as_dict(self):
+        elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        return {
+            'stufe': self.name,
+            'dateien': self.items,
+            'fehler': self.errors,
+            'aktiv_s': round(self.busy_seconds, 3),
+            'laufzeit_s': round(elapsed, 3),
+            'dateien_pro_s': round(self.items / elapsed, 1) if elapsed else 0.0,
+        }
+
+def compute_fingerprint(file_path, size, sample_bytes):
+    """
+    Berechnet einen Fingerabdruck aus Dateigröße sowie Anfang und Ende des Inhalts.
+    Bei kleinen Dateien wird der gesamte Inhalt verwendet.
+
+    :param file_path: Der Pfad der Datei.
+    :param size: Die Dateigröße in Bytes.
+    :param sample_bytes: Die Anzahl der Bytes, die am Anfang und am Ende gelesen werden.
+    :return: Der Fingerabdruck als Hex-String.
+    """
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(file_path, 'rb') as file:
+        digest.update(file.read(sample_bytes))
+        if size > 2 * sample_bytes:
+            file.seek(-sample_bytes, os.SEEK_END)
+        digest.update(file.read(sample_bytes))
+    return digest.hexdigest()
+
+class IngestionPipeline:
+    """
+    Liest neue Dateien in mehreren Stufen ein, die über begrenzte Warteschlangen verbunden sind:
+    Suchen (ein Thread) -> stat/Fingerabdruck (Thread-Pool) -> Metadaten (Prozesspool) -> Schreiben (ein Thread, in Stapeln).
+    Parallel dazu ermittelt der Abgleich die Dokumente, deren Dateien verschwunden sind, damit der Schreiber
+    verschobene Dateien dem bisherigen Dokument zuordnen kann, statt ein neues anzulegen.
+    """
+    def __init__(self, extensions, settings=None, db_name=None):
+        """
+        :param extensions: Die gültigen Dateiendungen.
+        :param settings: Abweichende Einstellungen, siehe DEFAULT_SETTINGS.
+        :param db_name: Die Datenbankdatei der Bibliothek, standardmäßig die der aktiven Bibliothek.
+        """
+        self.extensions = config.suffix_set(extensions)
+        self.db_name = db_name
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        size = self.settings['queue_size']
+        self.stat_queue = queue.Queue(size)
+        self.extract_queue = queue.Queue(size)
+        self.write_queue = queue.Queue(size)
+        self.stats = {name: StageStats(name) for name in ('abgleich', 'suchen', 'stat', 'extrahieren', 'schreiben')}
+        self.inserted_ids = []
+        self.relinked = []  # Paare aus verschwundenem Dokument und neuem Pfad
+        self.move_detector = None
+        self.file_info_backfill = []
+        self.move_detector_ready = threading.Event()
+        self.cancelled = threading.Event()
+        self.threads = []
+        self.io_workers_left = self.settings['io_workers']
+        self.io_lock = threading.Lock()
+        self.error = None  # Meldung, wenn die Pipeline wegen eines Fehlers abgebrochen wurde
+        self.started = None
+        self.finished = None
+
+    def start(self, sources=(), files=()):
+        """
+        Startet die Pipeline im Hintergrund.
+
+        :param sources: Paare aus Kategorie und Ordner, deren Dateien eingelesen werden sollen.
+        :param files: Paare aus Dateipfad und Kategorie, die direkt eingelesen werden sollen.
+        """
+        self.started = time.perf_counter()
+        stages = [(self.discover, (list(sources), list(files)))]
+        if self.settings['detect_moves']:
+            stages.append((self.find_vanished, ()))
+        else:
+            self.move_detector_ready.set()
+        stages += [(self.stat_worker, ())] * self.settings['io_workers']
+        stages += [(self.extract_dispatcher, ()), (self.writer, ())]
+        for target, args in stages:
+            thread = threading.Thread(target=target, args=args, daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def run(self, sources=(), files=()):
+        """ Führt die Pipeline aus und wartet auf ihr Ende. """
+        self.start(sources, files)
+        self.join()
+        return self.inserted_ids
+
+    def join(self, timeout=None):
+        for thread in self.threads:
+            thread.join(timeout)
+
+    def is_running(self):
+        return any(thread.is_alive() for thread in self.threads)
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        """ Liefert die Anzahl der gefundenen und der bereits verarbeiteten neuen Dateien. """
+        return self.stats['suchen'].items, self.stats['schreiben'].items
+
+    def summary(self):
+        """ Liefert die Messwerte aller Stufen, z. B. für die Ausgabe auf der Konsole. """
+        return [stats.as_dict() for stats in self.stats.values()]
+
+    def put(self, target_queue, item):
+        """
+        Legt ein Element in eine Warteschlange und wartet, solange sie voll ist (Gegendruck).
+        Nach einem Abbruch werden nur noch Endmarken weitergegeben; ist die Warteschlange voll, werden dafür
+        wartende Elemente verworfen. Die nächste Stufe beendet sich aber auch ohne Endmarke, siehe get.
+        """
+        while True:
+            if self.cancelled.is_set():
+                if item is not DONE:
+                    return
+                try:
+                    target_queue.put_nowait(item)
+                    return
+                except queue.Full:
+                    try:
+                        if target_queue.get_nowait() is DONE:
+                            continue  # Eine verworfene Endmarke ersetzt die neue
+                    except queue.Empty:
+                        pass
+                    continue
+            try:
+                target_queue.put(item, timeout=WAIT_INTERVAL)
+                return
+            except queue.Full:
+                continue
+
+    def get(self, source_queue, timeout=None):
+        """
+        Entnimmt ein Element aus einer Warteschlange. Gewartet wird in kurzen Abständen, damit eine Stufe
+        nach einem Abbruch auch dann endet, wenn die vorherige Stufe keine Endmarke mehr liefert.
+
+        :param timeout: Die höchstens zu wartende Zeit in Sekunden oder None.
+        :return: Das Element, DONE nach einem Abbruch oder None, wenn die Wartezeit abgelaufen ist.
+        """
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not self.cancelled.is_set():
+            wait = WAIT_INTERVAL if deadline is None else min(WAIT_INTERVAL, max(0.0, deadline - time.perf_counter()))
+            try:
+                return source_queue.get(timeout=wait)
+            except queue.Empty:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return None
+        return DONE
+
+    def find_vanished(self):
+        """
+        Abgleich: Ermittelt die Dokumente, deren Link nicht mehr existiert, und baut daraus die Zuordnung
+        für verschobene Dateien auf. Fehlende Dateimerkmale älterer Dokumente werden dabei nachgetragen.
+        """
+        stats = self.stats['abgleich']
+        stats.started = time.perf_counter()
+        sample_bytes = self.settings['fingerprint_bytes']
+
+        def check(row):
+            doc_id, link, size, mtime_ns, device, inode, fingerprint = row
+            try:
+                stat = os.stat(link) if link else None
+            except OSError:
+                stat = None
+            if stat is None:
+                return moves.VanishedDocument(doc_id, link, size, mtime_ns, device, inode, fingerprint), None
+            if fingerprint is None:
+                try:
+                    fingerprint = compute_fingerprint(link, stat.st_size, sample_bytes)
+                except OSError:
+                    return None, None
+                return None, (doc_id, stat.st_size, stat.st_mtime_ns, stat.st_dev, stat.st_ino, fingerprint)
+            return None, None
+
+        vanished = []
+        try:
+            with ThreadPoolExecutor(max_workers=self.settings['io_workers']) as executor:
+                for document, backfill in executor.map(check, database.load_file_index(self.db_name), chunksize=64):
+                    if self.cancelled.is_set():
+                        break
+                    stats.items += 1
+                    if document is not None:
+                        vanished.append(document)
+                    elif backfill is not None:
+                        self.file_info_backfill.append(backfill)
+            self.move_detector = moves.MoveDetector(vanished)
+        except Exception as e:
+            # Ohne Abgleich werden verschobene Dateien wie neue Dateien behandelt
+            stats.errors += 1
+            print(f"Der Abgleich verschwundener Dateien ist fehlgeschlagen: {e}")
+        finally:
+            stats.finished = time.perf_counter()
+            self.move_detector_ready.set()
+
+    def discover(self, sources, files):
+        """ Stufe 1: Sucht in den Ordnern nach gültigen Dateien, die noch nicht in der Datenbank sind. """
+        stats = self.stats['suchen']
+        stats.started = time.perf_counter()
+        try:
+            known_links = database.load_all_links(self.db_name)
+            if known_links is None:
+                # Ohne die bekannten Links würden alle Dateien erneut eingefügt
+                self.fail(f"Die Datenbank {self.db_name or ''} konnte nicht gelesen werden.")
+                return
+            for file_path, category in files:
+                if file_path not in known_links and database.file_is_valid(file_path, self.extensions):
+                    stats.items += 1
+                    self.put(self.stat_queue, FileRecord(file_path, category))
+            for category, directory in sources:
+                if self.cancelled.is_set():
+                    break
+                try:
+                    with os.scandir(directory) as entries:
+                        for entry in entries:
+                            if self.cancelled.is_set():
+                                break
+                            if entry.path in known_links or not database.file_is_valid(entry.path, self.extensions):
+                                continue
+                            if entry.is_file():
+                                stats.items += 1
+                                self.put(self.stat_queue, FileRecord(entry.path, category))
+                except OSError as e:
+                    stats.errors += 1
+                    print(f"Ordner {directory} konnte nicht gelesen werden: {e}")
+        except Exception as e:
+            stats.errors += 1
+            self.fail(f"Die Suche nach neuen Dateien ist fehlgeschlagen: {e}")
+        finally:
+            for _ in range(self.settings['io_workers']):
+                self.put(self.stat_queue, DONE)
+            stats.finished = time.perf_counter()
+
+    def fail(self, message):
+        """ Bricht die Pipeline wegen eines Fehlers ab; die erste Meldung bleibt für die Anzeige erhalten. """
+        print(message)
+        if self.error is None:
+            self.error = message
+        self.cancel()
+
+    def stat_worker(self):
+        """ Stufe 2: Ermittelt Dateisystemmerkmale und Fingerabdruck (mehrere Threads, E/A-gebunden). """
+        stats = self.stats['stat']
+        stats.started = stats.started or time.perf_counter()
+        sample_bytes = self.settings['fingerprint_bytes']
+        while True:
+            record = self.get(self.stat_queue)
+            if record is DONE or self.cancelled.is_set():
+                break
+            begin = time.perf_counter()
+            try:
+                stat = os.stat(record.path)
+                record.size = stat.st_size
+                record.mtime_ns = stat.st_mtime_ns
+                record.device = stat.st_dev
+                record.inode = stat.st_ino
+                record.fingerprint = compute_fingerprint(record.path, stat.st_size, sample_bytes)
+                failed = False
+            except OSError as e:
+                print(f"Datei {record.path} konnte nicht gelesen werden: {e}")
+                failed = True
+            with self.io_lock:
+                stats.busy_seconds += time.perf_counter() - begin
+                if failed:
+                    stats.errors += 1
+                else:
+                    stats.items += 1
+            if not failed:
+                self.put(self.extract_queue, record)
+
+        # Der letzte beendete Thread gibt das Ende an die nächste Stufe weiter
+        with self.io_lock:
+            self.io_workers_left -= 1
+            last = self.io_workers_left == 0
+        if last:
+            stats.finished = time.perf_counter()
+            self.put(self.extract_queue, DONE)
+
+    def extract_dispatcher(self):
+        """
+        Stufe 3: Liest PDF-Seitenzahlen und JPEG-Metadaten in einem Prozesspool.
+        Die Anzahl gleichzeitig laufender Aufträge ist begrenzt, damit der Speicherbedarf konstant bleibt.
+        """
+        stats = self.stats['extrahieren']
+        stats.started = time.perf_counter()
+        workers = self.settings['extract_workers']
+        pending = deque()
+        executor = None
+        try:
+            while not self.cancelled.is_set():
+                record = self.get(self.extract_queue)
+                if record is DONE:
+                    break
+                if not metadata.needs_extraction(record.path):
+                    self.finish_extraction(record, None)
+                    continue
+                if workers <= 0:
+                    begin = time.perf_counter()
+                    self.finish_extraction(record, metadata.extract_file_metadata(record.path))
+                    stats.busy_seconds += time.perf_counter() - begin
+                    continue
+                if executor is None:
+                    # Den Prozesspool erst starten, wenn tatsächlich Metadaten gelesen werden müssen
+                    executor = ProcessPoolExecutor(max_workers=workers)
+                pending.append((record, executor.submit(metadata.extract_file_metadata, record.path)))
+                while len(pending) >= 2 * workers:
+                    self.collect_extraction(pending.popleft())
+            while pending and not self.cancelled.is_set():
+                self.collect_extraction(pending.popleft())
+        except Exception as e:
+            self.fail(f"Das Auslesen der Metadaten ist fehlgeschlagen: {e}")
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+            stats.finished = time.perf_counter()
+            self.put(self.write_queue, DONE)
+
+    def collect_extraction(self, entry):
+        record, future = entry
+        begin = time.perf_counter()
+        try:
+            result = future.result()
+        except Exception as e:
+            self.stats['extrahieren'].errors += 1
+            print(f"Metadaten von {record.path} konnten nicht gelesen werden: {e}")
+            result = None
+        self.stats['extrahieren'].busy_seconds += time.perf_counter() - begin
+        self.finish_extraction(record, result)
+
+    def finish_extraction(self, record, result):
+        if result is not None:
+            record.jpeg_metadata = result['jpeg']
+            record.seitenzahl = result['seitenzahl']
+        self.stats['extrahieren'].items += 1
+        self.put(self.write_queue, record)
+
+    def writer(self):
+        """ Stufe 4: Schreibt die Dateien über eine einzige Verbindung in Stapeln von N Zeilen bzw. T Millisekunden. """
+        stats = self.stats['schreiben']
+        stats.started = time.perf_counter()
+        batch_rows = self.settings['batch_rows']
+        batch_seconds = self.settings['batch_ms'] / 1000
+        batch = []
+        deadline = None
+        conn = database.connect_db(self.db_name, report=False)
+        if conn is None:
+            self.fail(f"Die Datenbank {self.db_name or ''} konnte nicht geöffnet werden.")
+            stats.finished = self.finished = time.perf_counter()
+            return
+        try:
+            while True:
+                timeout = None if deadline is None else max(0.0, deadline - time.perf_counter())
+                record = self.get(self.write_queue, timeout)
+                if record is not None and record is not DONE:
+                    batch.append(record)
+                    if deadline is None:
+                        deadline = time.perf_counter() + batch_seconds
+                if batch and (record is None or record is DONE or len(batch) >= batch_rows):
+                    self.write_batch(conn, batch)
+                    batch = []
+                    deadline = None
+                if record is DONE or self.cancelled.is_set():
+                    break
+            # Nachgetragene Dateimerkmale auch dann speichern, wenn keine neue Datei gefunden wurde
+            if not self.cancelled.is_set():
+                self.wait_for_move_detector(conn)
+        except Exception as e:
+            self.fail(f"Das Schreiben der neuen Dateien ist fehlgeschlagen: {e}")
+        finally:
+            conn.close()
+            stats.finished = time.perf_counter()
+            self.finished = stats.finished
+
+    def wait_for_move_detector(self, conn):
+        """ Wartet vor dem ersten Schreiben auf den Abgleich und schreibt die nachgetragenen Dateimerkmale. """
+        while not self.move_detector_ready.wait(0.1):
+            if self.cancelled.is_set():
+                return
+        backfill, self.file_info_backfill = self.file_info_backfill, []
+        for start in range(0, len(backfill), self.settings['batch_rows']):
+            try:
+                database.update_file_info(conn.cursor(), backfill[start:start + self.settings['batch_rows']])
+                database.commit_with_retry(conn)
+            except sqlite3.Error as e:
+                conn.rollback()
+                print(f"Dateimerkmale konnten nicht gespeichert werden: {e}")
+
+    def write_batch(self, conn, batch):
+        stats = self.stats['schreiben']
+        begin = time.perf_counter()
+        if not self.move_detector_ready.is_set() or self.file_info_backfill:
+            self.wait_for_move_detector(conn)
+
+        # Verschobene Dateien dem bisherigen Dokument zuordnen, nur die übrigen werden neu angelegt
+        matches, new_records = [], []
+        for record in batch:
+            document = self.move_detector.match(record) if self.move_detector is not None else None
+            if document is not None:
+                matches.append((document, record))
+            else:
+                new_records.append(record)
+        try:
+            cursor = conn.cursor()
+            if matches:
+                database.relink_documents(cursor, matches)
+            inserted_ids = database.insert_new_files(cursor, new_records)
+            database.commit_with_retry(conn)
+            self.relinked.extend((document, record.path) for document, record in matches)
+            self.inserted_ids.extend(inserted_ids)
+        except sqlite3.Error as e:
+            conn.rollback()
+            stats.errors += len(batch)
+            print(f"Ein Fehler ist beim Schreiben von {len(batch)} Dateien aufgetreten: {e}")
+        stats.items += len(batch)
+        stats.busy_seconds += time.perf_counter() - begin
@@ -0,0 +1,87 @@
+# libraries.py
+import os
+import sqlite3
+import document_store
+
+MAX_ATTACHED = 10  # Standardgrenze von SQLite für gleichzeitig angehängte Datenbanken
+COLUMNS = ('beschreibung', 'kategorie', 'seitenzahl', 'erstelldatum', 'link', 'autor')
+# Sortierausdrücke je Spalte; Seitenzahl und Datum über dieselben Schlüssel wie die Hauptansicht (document_store),
+# die der Verbindung als SQL-Funktionen bekannt gemacht werden
+SORT_EXPRESSIONS = {
+    'beschreibung': 'beschreibung COLLATE NOCASE',
+    'kategorie': 'kategorie COLLATE NOCASE',
+    'seitenzahl': 'page_key(seitenzahl)',
+    'erstelldatum': 'date_key(erstelldatum)',
+    'link': 'link COLLATE NOCASE',
+    'autor': 'autor COLLATE NOCASE',
+    'bibliothek': 'bibliothek COLLATE NOCASE',
+}
+
+def read_only_uri(database_file):
+    return 'file:' + os.path.abspath(database_file).replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+
+class CombinedLibrary:
+    """
+    Gemeinsame, schreibgeschützte Sicht auf die Datenbanken mehrerer Bibliotheken.
+    Jede Datenbank wird per ATTACH an eine Verbindung im Speicher angehängt und ihre Dokumente werden
+    per UNION ALL vereint, sodass Suche und Sortierung über alle Bibliotheken in einer Abfrage laufen.
+    """
+    def __init__(self, libraries):
+        """
+        :param libraries: Die Bibliotheken aus config.library_list.
+        """
+        self.conn = sqlite3.connect(':memory:', uri=True)
+        self.conn.create_function('page_key', 1, document_store.page_key, deterministic=True)
+        self.conn.create_function('date_key', 1, document_store.date_key, deterministic=True)
+        self.libraries = []
+        self.unavailable = []  # Paare aus Bibliotheksname und Grund
+        for library in libraries:
+            if len(self.libraries) >= MAX_ATTACHED:
+                self.unavailable.append((library['name'], f"mehr als {MAX_ATTACHED} Bibliotheken"))
+                continue
+            if not os.path.isfile(library['database']):
+                self.unavailable.append((library['name'], "Datenbank nicht gefunden"))
+                continue
+            schema = f"bibliothek{len(self.libraries)}"
+            try:
+                self.conn.execute(f"ATTACH DATABASE ? AS {schema}", (read_only_uri(library['database']),))
+                self.conn.execute(f"SELECT 1 FROM {schema}.dokumente LIMIT 1")
+            except sqlite3.Error as e:
+                self.unavailable.append((library['name'], str(e)))
+                continue
+            self.libraries.append((schema, library))
+
+        selects = [f"SELECT ? AS bibliothek, id, {', '.join(COLUMNS)} FROM {schema}.dokumente" for schema, _ in self.libraries]
+        # Die Namen der Bibliotheken werden als Parameter übergeben, daher eine Unterabfrage statt einer Sicht
+        self.view_params = [library['name'] for _, library in self.libraries]
+        self.source = "(" + " UNION ALL ".join(selects) + ")" if selects else None
+
+    def search(self, text='', kategorie=None, sort='erstelldatum', descending=False, limit=500, offset=0):
+        """
+        Sucht in allen Bibliotheken und liefert eine sortierte Seite der Treffer.
+
+        :param text: Suchtext für Beschreibung, Link und Autor.
+        :param kategorie: Optional nur Dokumente dieser Kategorie.
+        :param sort: Die Sortierspalte, eine der Spalten in SORT_EXPRESSIONS.
+        :param descending: True für absteigende Sortierung.
+        :return: Ein Tupel (Anzahl aller Treffer, Zeilen als (bibliothek, id, beschreibung, ..., autor)).
+        """
+        if self.source is None:
+            return 0, []
+        conditions, values = [], []
+        if text:
+            conditions.append("(beschreibung LIKE ? OR link LIKE ? OR autor LIKE ?)")
+            values += ['%' + text + '%'] * 3
+        if kategorie:
+            conditions.append("kategorie = ?")
+            values.append(kategorie)
+        where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+        order = f"{SORT_EXPRESSIONS[sort]} {'DESC' if descending else 'ASC'}, bibliothek, id"
+
+        total = self.conn.execute(f"SELECT COUNT(*) FROM {self.source}{where}", self.view_params + values).fetchone()[0]
+        rows = self.conn.execute(f"SELECT * FROM {self.source}{where} ORDER BY {order} LIMIT ? OFFSET ?",
+                                 self.view_params + values + [limit, offset]).fetchall()
+        return total, rows
+
+    def close(self):
+        self.conn.close()
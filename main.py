@@ -1,12 +1,23 @@
 # main.py
+import time
+import profiling
+# Vor den übrigen Importen, damit im Profiling-Modus (--profile) auch deren Importzeiten erfasst werden
+profiling.enable()
 import tkinter as tk
-from gui import DocumentManagerGUI
+from gui import DocumentManagerGUI, PROFILED_METHODS
 
 def main():
+    started = time.perf_counter()
+    profiling.instrument_methods(DocumentManagerGUI, PROFILED_METHODS)
     root = tk.Tk()
     root.geometry("800x600")
     app = DocumentManagerGUI(root)
+    if profiling.profiler is not None:
+        # Zeit bis zur ersten Anzeige, sobald Tk nach dem Aufbau wieder untätig ist
+        root.after_idle(lambda: profiling.profiler.record('Start bis zur Anzeige', 'start', (time.perf_counter() - started) * 1000))
     root.mainloop()
+    if profiling.profiler is not None:
+        profiling.profiler.write_report()
     
 if __name__ == "__main__":
     main()
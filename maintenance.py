@@ -0,0 +1,213 @@
+# maintenance.py
+import os
+import sqlite3
+import time
+import config
+import database
+
+HOUR = 60 * 60
+DAY = 24 * HOUR
+
+# Aufgaben mit ihrem Mindestabstand in Sekunden
+TASK_INTERVALS = {
+    'optimize': DAY,
+    'incremental_vacuum': DAY,
+    'quick_check': 7 * DAY,
+    'backup': DAY,
+    'trim_changelog': HOUR,
+}
+TASK_LABELS = {
+    'optimize': "Statistiken aktualisieren (PRAGMA optimize/ANALYZE)",
+    'incremental_vacuum': "Freie Seiten freigeben (incremental_vacuum)",
+    'quick_check': "Integritätsprüfung (quick_check)",
+    'backup': "Online-Sicherung",
+    'trim_changelog': "Änderungsprotokoll kürzen",
+    'enable_incremental_vacuum': "Umstellung auf auto_vacuum=INCREMENTAL (VACUUM)",
+}
+VACUUM_STEP_PAGES = 500  # Freigegebene Seiten je Schritt, damit andere Instanzen zwischendurch schreiben können
+BACKUP_STEP_PAGES = 256  # Kopierte Seiten je Schritt der Online-Sicherung
+BACKUP_STEP_SLEEP = 0.01  # Pause zwischen zwei Schritten in Sekunden
+BACKUP_KEEP = 7  # Anzahl der aufbewahrten Sicherungen
+STEP_SLEEP = 0.05
+AUTO_VACUUM_MODES = {0: 'NONE', 1: 'FULL', 2: 'INCREMENTAL'}
+
+def database_file():
+    return config.get_config()['database']
+
+def connect():
+    """ Öffnet eine eigene Verbindung im Autocommit-Modus, da VACUUM und einige PRAGMAs keine Transaktion erlauben. """
+    conn = sqlite3.connect(database_file(), timeout=database.BUSY_TIMEOUT)
+    conn.isolation_level = None
+    return conn
+
+def optimize(conn):
+    """ Aktualisiert die Statistiken des Abfrageplaners. Beim ersten Lauf wird ANALYZE vollständig ausgeführt. """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name='sqlite_stat1'").fetchone() is None:
+        conn.execute("ANALYZE")
+        return "ANALYZE ausgeführt"
+    conn.execute("PRAGMA optimize")
+    return "PRAGMA optimize ausgeführt"
+
+def auto_vacuum_mode(conn):
+    return AUTO_VACUUM_MODES.get(conn.execute("PRAGMA auto_vacuum").fetchone()[0])
+
+def incremental_vacuum(conn):
+    """
+    Gibt freie Seiten schrittweise an das Dateisystem zurück. Datenbanken ohne auto_vacuum=INCREMENTAL werden
+    übersprungen, da die Umstellung ein vollständiges VACUUM erfordert, das alle Instanzen sperrt; sie wird
+    ausdrücklich über enable_incremental_vacuum gestartet.
+    """
+    mode = auto_vacuum_mode(conn)
+    if mode != 'INCREMENTAL':
+        return f"auto_vacuum={mode}, Umstellung erforderlich"
+    released = 0
+    while True:
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if free_pages == 0:
+            break
+        conn.execute(f"PRAGMA incremental_vacuum({VACUUM_STEP_PAGES})").fetchall()
+        released += min(free_pages, VACUUM_STEP_PAGES)
+        time.sleep(STEP_SLEEP)
+    return f"{released} Seiten freigegeben"
+
+def enable_incremental_vacuum(conn):
+    """
+    Stellt die Datenbank auf auto_vacuum=INCREMENTAL um. Das dafür nötige VACUUM baut die Datei neu auf und sperrt
+    sie währenddessen für alle Instanzen, daher wird es nie zeitgesteuert, sondern nur auf Wunsch ausgeführt.
+    """
+    if auto_vacuum_mode(conn) == 'INCREMENTAL':
+        return "auto_vacuum=INCREMENTAL bereits eingestellt"
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return "auf auto_vacuum=INCREMENTAL umgestellt (VACUUM)"
+
+def quick_check(conn):
+    """ Prüft die Struktur der Datenbank, ohne die Indizes vollständig zu vergleichen. """
+    results = [row[0] for row in conn.execute("PRAGMA quick_check")]
+    if results == ['ok']:
+        return "ok"
+    raise sqlite3.DatabaseError("; ".join(results[:10]))
+
+def backup_directory():
+    return config.get_config().get('backup_dir') or os.path.join(os.path.dirname(os.path.abspath(database_file())), 'backups')
+
+def backup(conn):
+    """
+    Erstellt eine Online-Sicherung über die Backup-API von SQLite in kleinen Schritten, damit andere
+    Verbindungen zwischendurch weiterarbeiten können, und löscht die ältesten Sicherungen.
+    """
+    directory = backup_directory()
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(database_file()))[0]
+    target = os.path.join(directory, f"{stem}-{time.strftime('%Y%m%d-%H%M%S')}.db")
+    temporary = target + '.tmp'
+    destination = sqlite3.connect(temporary)
+    try:
+        conn.backup(destination, pages=BACKUP_STEP_PAGES, sleep=BACKUP_STEP_SLEEP)
+        destination.close()
+        os.replace(temporary, target)
+    finally:
+        # Bei einem Fehler (z. B. Datenträger voll) keine unvollständige Sicherung zurücklassen
+        destination.close()
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+    keep = config.get_config().get('backup_keep', BACKUP_KEEP)
+    backups = sorted(name for name in os.listdir(directory) if name.startswith(stem + '-') and name.endswith('.db'))
+    for name in backups[:-keep] if keep > 0 else []:
+        os.remove(os.path.join(directory, name))
+    return f"gesichert nach {target}"
+
+def trim_changelog(conn):
+    """ Kürzt das Änderungsprotokoll auch bei Instanzen, die lange ohne Neustart laufen. """
+    return f"{database.trim_changelog(conn.cursor())} Einträge entfernt"
+
+TASKS = {
+    'optimize': optimize,
+    'incremental_vacuum': incremental_vacuum,
+    'quick_check': quick_check,
+    'backup': backup,
+    'trim_changelog': trim_changelog,
+    'enable_incremental_vacuum': enable_incremental_vacuum,
+}
+
+def load_history(conn):
+    """ Liefert je Aufgabe den letzten Lauf als Dictionary mit zuletzt, dauer_s und ergebnis. """
+    return {row[0]: {'zuletzt': row[1], 'dauer_s': row[2], 'ergebnis': row[3]}
+            for row in conn.execute("SELECT aufgabe, zuletzt, dauer_s, ergebnis FROM wartung")}
+
+def due_tasks(conn, now=None):
+    """ Ermittelt die Aufgaben, deren Mindestabstand seit dem letzten Lauf überschritten ist. """
+    now = now or time.time()
+    history = load_history(conn)
+    return [task for task, interval in TASK_INTERVALS.items()
+            if now - (history.get(task, {}).get('zuletzt') or 0) >= interval]
+
+def claim_task(conn, task, now):
+    """
+    Reserviert eine Aufgabe, damit sie nicht gleichzeitig von einer anderen Instanz ausgeführt wird.
+
+    :return: True, wenn diese Instanz die Aufgabe ausführen soll.
+    """
+    interval = TASK_INTERVALS[task]
+    conn.execute("INSERT OR IGNORE INTO wartung (aufgabe, zuletzt) VALUES (?, 0)", (task,))
+    cursor = conn.execute("UPDATE wartung SET zuletzt=? WHERE aufgabe=? AND zuletzt <= ?", (now, task, now - interval))
+    return cursor.rowcount == 1
+
+def run_tasks(tasks=None, force=False, cancelled=None):
+    """
+    Führt Wartungsaufgaben aus und speichert Zeitpunkt, Dauer und Ergebnis in der Tabelle wartung.
+
+    :param tasks: Die auszuführenden Aufgaben, standardmäßig alle fälligen der zeitgesteuerten Aufgaben (TASK_INTERVALS).
+    :param force: True, um die Aufgaben unabhängig vom letzten Lauf auszuführen.
+    :param cancelled: Optionales threading.Event, um zwischen zwei Aufgaben abzubrechen.
+    :return: Ein Dictionary Aufgabe -> Ergebnis.
+    """
+    results = {}
+    conn = connect()
+    try:
+        for task in tasks or list(TASK_INTERVALS):
+            if cancelled is not None and cancelled.is_set():
+                break
+            now = time.time()
+            if force:
+                conn.execute("INSERT OR REPLACE INTO wartung (aufgabe, zuletzt) VALUES (?, ?)", (task, now))
+            elif not claim_task(conn, task, now):
+                continue
+            started = time.perf_counter()
+            try:
+                result = TASKS[task](conn)
+            except (sqlite3.Error, OSError) as e:
+                result = f"Fehler: {e}"
+            duration = time.perf_counter() - started
+            conn.execute("UPDATE wartung SET dauer_s=?, ergebnis=? WHERE aufgabe=?", (duration, result, task))
+            print(f"Wartung {task}: {result} ({duration:.2f} s)")
+            results[task] = result
+    finally:
+        conn.close()
+    return results
+
+def collect_statistics():
+    """
+    Ermittelt Kennzahlen für die Diagnoseansicht.
+
+    :return: Ein Dictionary mit Dateigröße, Seitenangaben, Fragmentierung, Vacuum-Modus und dem Verlauf der Wartung.
+    """
+    conn = connect()
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = auto_vacuum_mode(conn)
+        return {
+            'datei': os.path.abspath(database_file()),
+            'groesse_bytes': os.path.getsize(database_file()),
+            'seitengroesse': page_size,
+            'seiten': page_count,
+            'freie_seiten': free_pages,
+            'fragmentierung': free_pages / page_count if page_count else 0.0,
+            'auto_vacuum': auto_vacuum,
+            'verlauf': load_history(conn),
+        }
+    finally:
+        conn.close()
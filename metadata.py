@@ -0,0 +1,197 @@
+# metadata.py
+import os
+import struct
+import time
+import PyPDF2
+
+JPEG_EXTENSIONS = ('.jpg', '.jpeg')
+EXIF_DATE_FORMAT = '%Y:%m:%d %H:%M:%S'
+
+# EXIF-Tags, die beim Einlesen ausgewertet werden
+TAG_ORIENTATION = 0x0112
+TAG_DATETIME = 0x0132
+TAG_EXIF_IFD = 0x8769
+TAG_DATETIME_ORIGINAL = 0x9003
+TAG_DATETIME_DIGITIZED = 0x9004
+TAG_PIXEL_X = 0xA002
+TAG_PIXEL_Y = 0xA003
+
+# Größe der EXIF-Datentypen in Bytes (BYTE, ASCII, SHORT, LONG, RATIONAL, ..., SLONG, SRATIONAL)
+TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8}
+
+# Start-of-Frame-Marker, die die Bildabmessungen enthalten (ohne DHT, JPG und DAC)
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+def is_jpeg(file_path):
+    return file_path.lower().endswith(JPEG_EXTENSIONS)
+
+def read_ifd(tiff, offset, byte_order):
+    """
+    Liest die Einträge eines Image File Directory aus dem TIFF-Block der EXIF-Daten.
+
+    :param tiff: Der TIFF-Block als Bytes.
+    :param offset: Die Position des Verzeichnisses im TIFF-Block.
+    :param byte_order: '<' für Intel- oder '>' für Motorola-Byte-Reihenfolge.
+    :return: Ein Dictionary Tag -> Wert (Zahl oder Text).
+    """
+    entries = {}
+    if offset + 2 > len(tiff):
+        return entries
+    count = struct.unpack_from(byte_order + 'H', tiff, offset)[0]
+    for index in range(count):
+        position = offset + 2 + index * 12
+        if position + 12 > len(tiff):
+            break
+        tag, value_type, value_count = struct.unpack_from(byte_order + 'HHI', tiff, position)
+        size = TYPE_SIZES.get(value_type, 1) * value_count
+        # Werte bis vier Bytes stehen direkt im Eintrag, größere an der angegebenen Position
+        if size <= 4:
+            value_offset = position + 8
+        else:
+            value_offset = struct.unpack_from(byte_order + 'I', tiff, position + 8)[0]
+        if value_offset + size > len(tiff):
+            continue
+        if value_type == 2:
+            entries[tag] = tiff[value_offset:value_offset + size].split(b'\x00', 1)[0].decode('ascii', 'replace').strip()
+        elif value_type == 3:
+            entries[tag] = struct.unpack_from(byte_order + 'H', tiff, value_offset)[0]
+        elif value_type == 4:
+            entries[tag] = struct.unpack_from(byte_order + 'I', tiff, value_offset)[0]
+    return entries
+
+def parse_exif(tiff, result):
+    """
+    Wertet den TIFF-Block eines APP1/EXIF-Segments aus.
+
+    :param tiff: Der TIFF-Block (APP1-Daten ohne die Kennung 'Exif\\0\\0').
+    :param result: Das Dictionary, in das die gefundenen Metadaten eingetragen werden.
+    """
+    if tiff[:2] == b'II':
+        byte_order = '<'
+    elif tiff[:2] == b'MM':
+        byte_order = '>'
+    else:
+        return
+    if len(tiff) < 8 or struct.unpack_from(byte_order + 'H', tiff, 2)[0] != 42:
+        return
+    ifd0 = read_ifd(tiff, struct.unpack_from(byte_order + 'I', tiff, 4)[0], byte_order)
+    exif = read_ifd(tiff, ifd0[TAG_EXIF_IFD], byte_order) if TAG_EXIF_IFD in ifd0 else {}
+
+    aufnahmedatum = exif.get(TAG_DATETIME_ORIGINAL) or exif.get(TAG_DATETIME_DIGITIZED) or ifd0.get(TAG_DATETIME)
+    if aufnahmedatum:
+        try:
+            result['aufnahmedatum'] = time.strftime('%Y-%m-%d %H:%M:%S', time.strptime(aufnahmedatum, EXIF_DATE_FORMAT))
+        except ValueError:
+            pass  # Ungültige oder leere Datumsangaben wie '0000:00:00 00:00:00' ignorieren
+    if TAG_ORIENTATION in ifd0:
+        result['orientierung'] = ifd0[TAG_ORIENTATION]
+    if TAG_PIXEL_X in exif and TAG_PIXEL_Y in exif:
+        result['breite'] = exif[TAG_PIXEL_X]
+        result['hoehe'] = exif[TAG_PIXEL_Y]
+
+def read_jpeg_metadata(file_path):
+    """
+    Liest Aufnahmedatum, Orientierung und Abmessungen eines JPEG-Bildes, ohne das Bild zu dekodieren.
+    Es werden nur die Segmente vor den eigentlichen Bilddaten gelesen.
+
+    :param file_path: Der Pfad zur JPEG-Datei.
+    :return: Ein Dictionary mit den gefundenen Metadaten oder None, wenn die Datei kein lesbares JPEG ist.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            if file.read(2) != b'\xff\xd8':
+                return None
+            result = {}
+            while True:
+                byte = file.read(1)
+                if not byte:
+                    break
+                if byte != b'\xff':
+                    continue
+                marker = file.read(1)
+                # Füllbytes überspringen
+                while marker == b'\xff':
+                    marker = file.read(1)
+                if not marker:
+                    break
+                marker = marker[0]
+                if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+                    continue  # Marker ohne Längenangabe
+                if marker in (0xD9, 0xDA):
+                    break  # Ende des Bildes oder Beginn der Bilddaten
+                length_bytes = file.read(2)
+                if len(length_bytes) < 2:
+                    break
+                length = struct.unpack('>H', length_bytes)[0] - 2
+                if marker == 0xE1 and 'exif' not in result:
+                    data = file.read(length)
+                    if data.startswith(b'Exif\x00\x00'):
+                        result['exif'] = True
+                        parse_exif(data[6:], result)
+                elif marker in SOF_MARKERS:
+                    data = file.read(length)
+                    if len(data) >= 5:
+                        # Die Abmessungen aus dem Frame-Header sind verlässlicher als die EXIF-Angaben
+                        result['hoehe'], result['breite'] = struct.unpack_from('>HH', data, 1)
+                    break  # EXIF-Daten stehen immer vor dem Frame-Header
+                else:
+                    file.seek(length, os.SEEK_CUR)
+            result.pop('exif', None)
+            return result
+    except (OSError, struct.error) as e:
+        print(f"Fehler beim Lesen der JPEG-Metadaten von {file_path}: {e}")
+        return None
+
+def get_creation_time(file_path, jpeg_metadata=None, mtime=None):
+    """
+    Ermittelt das Erstellungsdatum einer Datei. Bei JPEG-Bildern wird das Aufnahmedatum aus den
+    EXIF-Daten verwendet, da das Änderungsdatum beim Kopieren verloren geht.
+
+    :param file_path: Der Pfad der Datei.
+    :param jpeg_metadata: Bereits gelesene JPEG-Metadaten, sonst werden sie bei Bedarf gelesen.
+    :param mtime: Bereits ermitteltes Änderungsdatum als Zeitstempel, sonst wird es vom Dateisystem gelesen.
+    :return: Das Erstellungsdatum als time.struct_time.
+    """
+    if jpeg_metadata is None and is_jpeg(file_path):
+        jpeg_metadata = read_jpeg_metadata(file_path)
+    if jpeg_metadata and jpeg_metadata.get('aufnahmedatum'):
+        return time.strptime(jpeg_metadata['aufnahmedatum'], '%Y-%m-%d %H:%M:%S')
+    return time.localtime(mtime if mtime is not None else os.path.getmtime(file_path))
+
+def read_pdf_page_count(file_path):
+    """
+    Ermittelt die Anzahl der Seiten einer PDF-Datei.
+
+    :param file_path: Der Pfad zur PDF-Datei.
+    :return: Die Anzahl der Seiten oder None bei einem Fehler.
+    """
+    try:
+        with open(file_path, 'rb') as file:
+            return len(PyPDF2.PdfReader(file).pages)
+    except Exception as e:
+        print(f"Fehler beim Lesen der PDF-Datei {file_path}: {e}")
+        return None
+
+def format_page_count(page_count):
+    """ Formatiert eine Seitenanzahl wie im Eingabefenster als '1' bzw. '1-<Anzahl>'. """
+    if page_count is not None and page_count > 1:
+        return "1-" + str(page_count)
+    return "1"
+
+def needs_extraction(file_path):
+    """ Prüft, ob aus einer Datei Metadaten gelesen werden können, die das Öffnen der Datei erfordern. """
+    return is_jpeg(file_path) or file_path.lower().endswith('.pdf')
+
+def extract_file_metadata(file_path):
+    """
+    Liest die Metadaten einer Datei, geeignet für die Ausführung in einem Prozesspool.
+
+    :param file_path: Der Pfad der Datei.
+    :return: Ein Dictionary mit 'jpeg' (JPEG-Metadaten) und 'seitenzahl' (formatierte Seitenanzahl).
+    """
+    result = {'jpeg': None, 'seitenzahl': "1"}
+    if is_jpeg(file_path):
+        result['jpeg'] = read_jpeg_metadata(file_path)
+    elif file_path.lower().endswith('.pdf'):
+        result['seitenzahl'] = format_page_count(read_pdf_page_count(file_path))
+    return result
@@ -0,0 +1,93 @@
+# minhash.py
+import hashlib
+import re
+import struct
+import PyPDF2
+
+SHINGLE_SIZE = 5  # Zeichen je Schindel; Zeichenfolgen sind robuster gegen OCR-Fehler als ganze Wörter
+NUM_HASHES = 128  # Länge der Signatur
+BANDS = 16  # LSH: Anzahl der Bänder ...
+ROWS = NUM_HASHES // BANDS  # ... zu je 8 Werten, Kandidat ab einer Ähnlichkeit von etwa (1/16)^(1/8) = 0,71
+MIN_SHINGLES = 50  # Dokumente mit weniger Text (z. B. Scans ohne Textebene) werden nicht verglichen
+MAX_PAGES = 20  # Für den Vergleich genügen die ersten Seiten
+VALUE_BITS = 49  # Bits des Hashwertes nach Abzug der Bucket-Nummer (56 - 7)
+EMPTY = (1 << 64) - 1
+
+def normalize_text(text):
+    """ Vereinheitlicht Groß-/Kleinschreibung und ersetzt Satzzeichen und Zeilenumbrüche durch einfache Leerzeichen. """
+    return re.sub(r'\W+', ' ', text.casefold()).strip()
+
+def shingles(text, size=SHINGLE_SIZE):
+    """ Liefert die Menge aller Zeichenfolgen der angegebenen Länge aus dem normalisierten Text. """
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def signature(shingle_set):
+    """
+    Berechnet die MinHash-Signatur einer Schindelmenge mit nur einer Hashfunktion (One Permutation Hashing):
+    Jede Schindel fällt in einen von NUM_HASHES Buckets, je Bucket zählt der kleinste Wert.
+    Leere Buckets übernehmen den Wert des nächsten belegten Buckets, um den Abstand verschoben (Densifizierung),
+    damit die Übereinstimmung zweier Signaturen weiterhin die Jaccard-Ähnlichkeit schätzt.
+
+    :return: Eine Liste von NUM_HASHES Ganzzahlen.
+    """
+    values = [EMPTY] * NUM_HASHES
+    for shingle in shingle_set:
+        digest = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=7).digest(), 'little')
+        bucket, value = digest % NUM_HASHES, digest // NUM_HASHES
+        if value < values[bucket]:
+            values[bucket] = value
+    if all(value == EMPTY for value in values):
+        return values
+    result = list(values)
+    for bucket, value in enumerate(values):
+        distance = 1
+        while value == EMPTY:
+            value = values[(bucket + distance) % NUM_HASHES]
+            if value != EMPTY:
+                value += distance << VALUE_BITS
+            distance += 1
+        result[bucket] = value
+    return result
+
+def pack_signature(values):
+    return struct.pack(f'<{NUM_HASHES}Q', *values)
+
+def unpack_signature(data):
+    return list(struct.unpack(f'<{NUM_HASHES}Q', data))
+
+def band_hashes(values):
+    """
+    Fasst die Signatur in BANDS Bänder zu je ROWS Werten zusammen. Dokumente mit einem gleichen Band sind Kandidaten.
+
+    :return: Eine Liste mit einem Hashwert je Band, passend für eine SQLite-Ganzzahl.
+    """
+    hashes = []
+    for band in range(BANDS):
+        data = struct.pack(f'<{ROWS}Q', *values[band * ROWS:(band + 1) * ROWS])
+        hashes.append(int.from_bytes(hashlib.blake2b(data, digest_size=7).digest(), 'little'))
+    return hashes
+
+def similarity(first, second):
+    """ Schätzt die Jaccard-Ähnlichkeit zweier Dokumente aus dem Anteil übereinstimmender Signaturwerte. """
+    return sum(a == b for a, b in zip(first, second)) / NUM_HASHES
+
+def extract_pdf_text(file_path, max_pages=MAX_PAGES):
+    with open(file_path, 'rb') as file:
+        reader = PyPDF2.PdfReader(file)
+        return " ".join(page.extract_text() or "" for page in reader.pages[:max_pages])
+
+def pdf_signature(file_path):
+    """
+    Liest den Text einer PDF-Datei und berechnet seine MinHash-Signatur, geeignet für die Ausführung in einem Prozesspool.
+
+    :param file_path: Der Pfad der PDF-Datei.
+    :return: Ein Tupel (Signatur als Bytes oder None bei zu wenig Text, Anzahl der Schindeln).
+    """
+    try:
+        shingle_set = shingles(normalize_text(extract_pdf_text(file_path)))
+    except Exception as e:
+        print(f"Fehler beim Lesen der PDF-Datei {file_path}: {e}")
+        return None, 0
+    if len(shingle_set) < MIN_SHINGLES:
+        return None, len(shingle_set)
+    return pack_signature(signature(shingle_set)), len(shingle_set)
@@ -0,0 +1,85 @@
+# moves.py
+
+class VanishedDocument:
+    """ Ein Dokument, dessen Link nicht mehr existiert, mit den zuletzt bekannten Dateimerkmalen. """
+    __slots__ = ('doc_id', 'link', 'size', 'mtime_ns', 'device', 'inode', 'fingerprint')
+
+    def __init__(self, doc_id, link, size, mtime_ns, device, inode, fingerprint):
+        self.doc_id = doc_id
+        self.link = link
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.device = device
+        self.inode = inode
+        self.fingerprint = fingerprint
+
+class MoveDetector:
+    """
+    Ordnet neu gefundene Dateien verschwundenen Dokumenten zu, damit umbenannte oder verschobene Dateien
+    ihre Metadaten behalten. Alle Zuordnungen laufen über Hash-Tabellen, der Aufwand wächst linear.
+
+    Reihenfolge der Merkmale, jeweils nur bei eindeutiger Zuordnung:
+    1. Gerät und Inode (bzw. Datei-ID unter Windows) bei gleicher Größe, bleibt beim Umbenennen erhalten
+    2. Fingerabdruck des Inhalts
+    3. Größe und Änderungszeitpunkt, nur um mehrere Dokumente mit gleichem Fingerabdruck (Kopien) zu unterscheiden
+
+    Größe und Änderungszeitpunkt allein oder der Dateiname genügen nicht: Scanner vergeben Namen wie scan_0001.pdf
+    immer wieder, und ein veraltetes Dokument würde seine Metadaten an eine fremde Datei weitergeben.
+    Ältere Dokumente ohne gespeicherte Dateimerkmale werden daher nicht automatisch zugeordnet.
+    """
+    def __init__(self, vanished):
+        """
+        :param vanished: Die verschwundenen Dokumente als VanishedDocument.
+        """
+        self.documents = {}
+        self.by_inode = {}
+        self.by_fingerprint = {}
+        for document in vanished:
+            self.documents[document.doc_id] = document
+            if document.inode:
+                self.by_inode.setdefault((document.device, document.inode, document.size), []).append(document.doc_id)
+            if document.fingerprint:
+                self.by_fingerprint.setdefault(document.fingerprint, []).append(document.doc_id)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def candidates(self, index, key):
+        """ Liefert die IDs der noch nicht zugeordneten Dokumente zu einem Schlüssel. """
+        return [doc_id for doc_id in index.get(key, ()) if doc_id in self.documents]
+
+    def unique(self, index, key):
+        """ Liefert die ID eines noch nicht zugeordneten Dokuments, wenn der Schlüssel eindeutig ist. """
+        candidates = self.candidates(index, key)
+        return candidates[0] if len(candidates) == 1 else None
+
+    def match(self, record):
+        """
+        Sucht das verschwundene Dokument zu einer neu gefundenen Datei.
+
+        :param record: Die Datei als ingestion.FileRecord.
+        :return: Das zugeordnete VanishedDocument oder None. Jedes Dokument wird höchstens einmal zugeordnet.
+        """
+        if not self.documents:
+            return None
+        doc_id = None
+        if record.inode:
+            doc_id = self.unique(self.by_inode, (record.device, record.inode, record.size))
+            # Ein abweichender Inhalt bedeutet, dass das Dateisystem die Inode neu vergeben hat
+            fingerprint = self.documents[doc_id].fingerprint if doc_id is not None else None
+            if fingerprint and record.fingerprint and fingerprint != record.fingerprint:
+                doc_id = None
+        if doc_id is None and record.fingerprint:
+            candidates = self.candidates(self.by_fingerprint, record.fingerprint)
+            if len(candidates) > 1:
+                # Mehrere Dokumente mit gleichem Inhalt: Größe und Änderungszeitpunkt müssen eindeutig passen
+                candidates = [candidate for candidate in candidates
+                              if (self.documents[candidate].size, self.documents[candidate].mtime_ns) == (record.size, record.mtime_ns)]
+            doc_id = candidates[0] if len(candidates) == 1 else None
+        if doc_id is None:
+            return None
+        return self.documents.pop(doc_id)
+
+    def unmatched(self):
+        """ Liefert die Dokumente, für die keine neue Datei gefunden wurde. """
+        return list(self.documents.values())
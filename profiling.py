@@ -0,0 +1,296 @@
+# profiling.py
+import atexit
+import bisect
+import contextlib
+import cProfile
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+
+# Der Profiling-Modus wird über den Kommandozeilenparameter --profile bzw. --profile=cprofile
+# oder über die Umgebungsvariable DOKUMENTVERWALTUNG_PROFILE=1 bzw. =cprofile eingeschaltet.
+ENVIRONMENT_VARIABLE = 'DOKUMENTVERWALTUNG_PROFILE'
+OUTPUT_VARIABLE = 'DOKUMENTVERWALTUNG_PROFILE_DIR'  # Ordner für den Bericht, standardmäßig das Arbeitsverzeichnis
+SAMPLE_INTERVAL = 0.005  # Sekunden zwischen zwei Stichproben des Hauptthreads
+BUCKETS_MS = [1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000]  # Obergrenzen der Histogrammklassen
+KEEP_DURATIONS = 10000  # Je Ereignis behaltene Einzelmessungen für die Perzentile
+KEEP_SLOWEST = 50  # Anzahl der langsamsten Ereignisse im Bericht
+
+profiler = None  # Der aktive Profiler oder None, wenn der Profiling-Modus aus ist
+
+def requested_mode(argv):
+    """
+    Ermittelt aus Kommandozeile und Umgebung, ob und wie profiliert werden soll.
+
+    :return: None, 'timing' für Zeitmessung mit Stichproben oder 'cprofile' zusätzlich mit cProfile.
+    """
+    value = os.environ.get(ENVIRONMENT_VARIABLE, '')
+    for argument in argv[1:]:
+        if argument == '--profile' or argument.startswith('--profile='):
+            value = argument.partition('=')[2] or '1'
+    if not value or value == '0':
+        return None
+    return 'cprofile' if value.lower() == 'cprofile' else 'timing'
+
+def enable(argv=None):
+    """
+    Schaltet den Profiling-Modus ein, wenn er angefordert wurde. Muss vor dem Import der übrigen Module
+    aufgerufen werden, damit deren Importzeiten erfasst werden. Der Bericht wird beim Beenden geschrieben.
+
+    :return: Der Profiler oder None.
+    """
+    global profiler
+    mode = requested_mode(sys.argv if argv is None else argv)
+    if mode is None or profiler is not None:
+        return profiler
+    profiler = Profiler(use_cprofile=(mode == 'cprofile'))
+    sys.meta_path.insert(0, ImportTimer(profiler))
+    profiler.install_tk_hook()
+    profiler.sampler.start()
+    atexit.register(profiler.write_report)
+    print(f"Profiling-Modus aktiv ({mode}), der Bericht wird beim Beenden geschrieben.")
+    return profiler
+
+def phase(name):
+    """ Misst einen Abschnitt des Starts; ohne Profiling-Modus ein leerer Kontextmanager. """
+    if profiler is None:
+        return contextlib.nullcontext()
+    return profiler.measure(name, 'start')
+
+def instrument_methods(cls, names):
+    """
+    Ersetzt Methoden einer Klasse durch gemessene Varianten, damit sie auch bei Aufrufen innerhalb anderer
+    Ereignisse (z. B. Sortieren über einen Lambda-Ausdruck) unter ihrem Namen erscheinen. Ohne Profiling-Modus wirkungslos.
+    """
+    if profiler is None:
+        return
+    for name in names:
+        function = getattr(cls, name)
+        label = f"{cls.__name__}.{name}"
+
+        @functools.wraps(function)
+        def wrapper(*args, _function=function, _label=label, **kwargs):
+            with profiler.measure(_label, 'methode'):
+                return _function(*args, **kwargs)
+        setattr(cls, name, wrapper)
+
+def callback_name(function):
+    """ Liefert einen lesbaren Namen für einen Tk-Callback; after() verpackt die Funktion in einer Hilfsfunktion. """
+    code = getattr(function, '__code__', None)
+    if code is not None and code.co_name == 'callit' and 'func' in code.co_freevars:
+        function = function.__closure__[code.co_freevars.index('func')].cell_contents
+    function = getattr(function, '__func__', function)
+    return getattr(function, '__qualname__', None) or repr(function)
+
+class EventStats:
+    """ Messwerte eines Ereignisses: Anzahl, Summe, Histogramm und die letzten Einzelmessungen. """
+    __slots__ = ('kind', 'count', 'total', 'maximum', 'histogram', 'durations')
+
+    def __init__(self, kind):
+        self.kind = kind
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.histogram = [0] * (len(BUCKETS_MS) + 1)
+        self.durations = deque(maxlen=KEEP_DURATIONS)
+
+    def add(self, duration_ms):
+        self.count += 1
+        self.total += duration_ms
+        self.maximum = max(self.maximum, duration_ms)
+        self.histogram[bisect.bisect_left(BUCKETS_MS, duration_ms)] += 1
+        self.durations.append(duration_ms)
+
+    def as_dict(self):
+        ordered = sorted(self.durations)
+
+        def percentile(fraction):
+            return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 2) if ordered else 0.0
+        labels = [f"<{limit} ms" for limit in BUCKETS_MS] + [f">={BUCKETS_MS[-1]} ms"]
+        return {
+            'art': self.kind,
+            'anzahl': self.count,
+            'summe_ms': round(self.total, 2),
+            'mittel_ms': round(self.total / self.count, 2) if self.count else 0.0,
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'max_ms': round(self.maximum, 2),
+            'histogramm': {label: count for label, count in zip(labels, self.histogram) if count},
+        }
+
+class Profiler:
+    """
+    Sammelt die Messwerte des Profiling-Modus: Dauer der Startabschnitte, Importzeiten je Modul, Latenzen der
+    Tk-Ereignisse und Stichproben des Hauptthreads als zusammengefasste Aufrufstapel für Flame Graphs.
+    """
+    def __init__(self, use_cprofile=False):
+        self.started = time.time()
+        self.main_thread = threading.main_thread()
+        self.lock = threading.Lock()
+        self.events = {}  # Name -> EventStats
+        self.phases = []  # Paare aus Name und Dauer in ms, in der Reihenfolge des Starts
+        self.imports = []  # Tupel (Modul, gesamt ms, ohne Untermodule ms)
+        self.slowest = []  # Tupel (Dauer ms, Name, Zeitpunkt), aufsteigend sortiert
+        self.active = []  # Namen der laufenden Messungen im Hauptthread, außen zuerst
+        self.stacks = Counter()
+        self.samples = 0
+        self.cprofile = cProfile.Profile() if use_cprofile else None
+        self.sampler = threading.Thread(target=self.sample, name='profiling', daemon=True)
+        self.report_written = False
+
+    @contextlib.contextmanager
+    def measure(self, name, kind):
+        """ Misst die Dauer eines Ereignisses; verschachtelte Messungen erscheinen zusätzlich einzeln. """
+        main = threading.current_thread() is self.main_thread
+        outermost = main and not self.active
+        if main:
+            self.active.append(name)
+        if outermost and self.cprofile is not None:
+            self.cprofile.enable()
+        begin = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration_ms = (time.perf_counter() - begin) * 1000
+            if outermost and self.cprofile is not None:
+                self.cprofile.disable()
+            if main:
+                self.active.pop()
+            self.record(name, kind, duration_ms)
+
+    def record(self, name, kind, duration_ms):
+        with self.lock:
+            if kind == 'start':
+                self.phases.append((name, round(duration_ms, 2)))
+            stats = self.events.get(name)
+            if stats is None:
+                stats = self.events[name] = EventStats(kind)
+            stats.add(duration_ms)
+            if len(self.slowest) < KEEP_SLOWEST or duration_ms > self.slowest[0][0]:
+                bisect.insort(self.slowest, (duration_ms, name, time.time() - self.started))
+                del self.slowest[:-KEEP_SLOWEST]
+
+    def install_tk_hook(self):
+        """
+        Misst alle Callbacks, die Tk aufruft (Befehle von Schaltflächen und Menüs, Bindungen, after), indem die
+        Registrierung der Callbacks in tkinter umschlossen wird.
+        """
+        import tkinter
+        original = tkinter.Misc._register
+        profiler = self
+
+        def register(widget, function, subst=None, needcleanup=1):
+            name = callback_name(function)
+
+            @functools.wraps(function)
+            def timed(*args):
+                with profiler.measure(name, 'ereignis'):
+                    return function(*args)
+            return original(widget, timed, subst, needcleanup)
+        tkinter.Misc._register = register
+
+    def sample(self):
+        """ Nimmt in festen Abständen den Aufrufstapel des Hauptthreads auf, solange dort gemessen wird. """
+        thread_id = self.main_thread.ident
+        while True:
+            time.sleep(SAMPLE_INTERVAL)
+            active = list(self.active)
+            if not active:
+                continue
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            # Der äußerste Messname bildet die Wurzel des Flame Graphs
+            stack = ";".join([active[0]] + frames[::-1])
+            with self.lock:
+                self.stacks[stack] += 1
+                self.samples += 1
+
+    def summary(self):
+        with self.lock:
+            events = {name: stats.as_dict() for name, stats in self.events.items()}
+            return {
+                'gestartet': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+                'laufzeit_s': round(time.time() - self.started, 1),
+                'python': sys.version.split()[0],
+                'startphasen': [{'name': name, 'dauer_ms': duration} for name, duration in self.phases],
+                'importe': [{'modul': module, 'gesamt_ms': round(total, 2), 'selbst_ms': round(own, 2)}
+                            for module, total, own in sorted(self.imports, key=lambda entry: -entry[1])],
+                'ereignisse': dict(sorted(events.items(), key=lambda item: -item[1]['summe_ms'])),
+                'langsamste': [{'name': name, 'dauer_ms': round(duration, 2), 'nach_s': round(offset, 1)}
+                               for duration, name, offset in reversed(self.slowest)],
+                'stichproben': {'intervall_ms': SAMPLE_INTERVAL * 1000, 'anzahl': self.samples},
+            }
+
+    def write_report(self):
+        """
+        Schreibt den Bericht: profil-<Zeit>.json mit der Zusammenfassung, profil-<Zeit>.folded mit den Aufrufstapeln
+        im zusammengefassten Format (z. B. für flamegraph.pl oder speedscope) und bei cProfile profil-<Zeit>.pstats.
+
+        :return: Der Pfad der JSON-Datei.
+        """
+        if self.report_written:
+            return None
+        self.report_written = True
+        directory = os.environ.get(OUTPUT_VARIABLE) or os.getcwd()
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, 'profil-' + time.strftime('%Y%m%d-%H%M%S', time.localtime(self.started)))
+        with open(base + '.json', 'w', encoding='utf-8') as report:
+            json.dump(self.summary(), report, ensure_ascii=False, indent=2)
+        with self.lock:
+            stacks = sorted(self.stacks.items())
+        with open(base + '.folded', 'w', encoding='utf-8') as folded:
+            folded.writelines(f"{stack} {count}\n" for stack, count in stacks)
+        if self.cprofile is not None:
+            self.cprofile.dump_stats(base + '.pstats')
+        print(f"Profiling-Bericht geschrieben: {base}.json")
+        return base + '.json'
+
+class ImportTimer:
+    """
+    Eintrag in sys.meta_path, der die Ausführungszeit jedes importierten Moduls misst. Die Suche wird an die
+    übrigen Finder weitergereicht; gemessen wird exec_module des gefundenen Loaders.
+    """
+    def __init__(self, profiler):
+        self.profiler = profiler
+        self.local = threading.local()  # Je Thread ein Stapel mit der Zeit der Untermodule je laufendem Import
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                break
+        else:
+            return None
+        loader = spec.loader
+        # Eingebaute und eingefrorene Module verwenden die Loader-Klasse selbst, die nicht verändert werden soll
+        if loader is None or isinstance(loader, type) or not hasattr(loader, 'exec_module'):
+            return spec
+        exec_module = loader.exec_module
+
+        def timed_exec_module(module):
+            stack = self.local.__dict__.setdefault('stack', [])
+            stack.append(0.0)
+            begin = time.perf_counter()
+            try:
+                return exec_module(module)
+            finally:
+                total = (time.perf_counter() - begin) * 1000
+                children = stack.pop()
+                if stack:
+                    stack[-1] += total
+                with self.profiler.lock:
+                    self.profiler.imports.append((fullname, total, total - children))
+        loader.exec_module = timed_exec_module
+        return spec
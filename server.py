@@ -0,0 +1,295 @@
+# server.py
+import argparse
+import asyncio
+import hashlib
+import json
+import mimetypes
+import os
+import queue
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs
+import config
+
+DATABASE_FILE = 'default.db'
+DEFAULT_HOST = '127.0.0.1'  # Nur lokal erreichbar
+DEFAULT_PORT = 8765
+POOL_SIZE = 4  # Anzahl der schreibgeschützten Datenbankverbindungen
+CHUNK_SIZE = 256 * 1024  # Blockgröße beim Ausliefern von Dateien
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+MAX_HEADER_LINES = 100
+KEEP_ALIVE_TIMEOUT = 15  # Sekunden, die eine unbenutzte Verbindung offen bleibt
+
+COLUMNS = ('id', 'beschreibung', 'kategorie', 'seitenzahl', 'erstelldatum', 'link', 'autor')
+REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class ReadOnlyPool:
+    """
+    Kleiner Pool schreibgeschützter SQLite-Verbindungen. Die Abfragen laufen in einem Thread-Pool,
+    damit die Ereignisschleife nicht blockiert.
+    """
+    def __init__(self, database_file, size=POOL_SIZE):
+        self.database_file = database_file
+        self.connections = queue.Queue()
+        for _ in range(size):
+            uri = 'file:' + os.path.abspath(database_file).replace('?', '%3f').replace('#', '%23') + '?mode=ro'
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute("PRAGMA query_only = ON")
+            self.connections.put(conn)
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='sqlite')
+
+    def call(self, function, *args):
+        conn = self.connections.get()
+        try:
+            return function(conn, *args)
+        finally:
+            self.connections.put(conn)
+
+    async def run(self, function, *args):
+        """ Führt function(conn, *args) mit einer freien Verbindung aus. """
+        return await asyncio.get_running_loop().run_in_executor(self.executor, self.call, function, *args)
+
+    def close(self):
+        self.executor.shutdown()
+        while not self.connections.empty():
+            self.connections.get().close()
+
+def row_to_dict(row):
+    return dict(zip(COLUMNS, row))
+
+def get_change_version(conn):
+    """
+    Ermittelt einen Zähler, der sich bei jeder Änderung der Dokumente ändert. Verwendet das Änderungsprotokoll,
+    bei älteren Datenbanken ohne Protokoll den Änderungszeitpunkt der Datei.
+    """
+    try:
+        return conn.execute("SELECT COALESCE(MAX(version), 0) FROM aenderungen").fetchone()[0]
+    except sqlite3.OperationalError:
+        return os.stat(conn.execute("PRAGMA database_list").fetchone()[2]).st_mtime_ns
+
+def search_documents(conn, params):
+    """
+    Sucht Dokumente anhand der Abfrageparameter q (Volltext in Beschreibung, Link und Autor),
+    kategorie, autor, sort, order, limit und offset.
+    """
+    conditions, values = [], []
+    if params.get('q'):
+        conditions.append("(beschreibung LIKE ? OR link LIKE ? OR autor LIKE ?)")
+        values += ['%' + params['q'] + '%'] * 3
+    for column in ('kategorie', 'autor'):
+        if params.get(column):
+            conditions.append(f"{column} = ?")
+            values.append(params[column])
+    where = (" WHERE " + " AND ".join(conditions)) if conditions else ""
+
+    sort = params.get('sort', 'id')
+    if sort not in COLUMNS:
+        raise HttpError(400, f"Unbekannte Sortierspalte '{sort}'")
+    direction = 'DESC' if params.get('order', 'asc').lower() == 'desc' else 'ASC'
+    try:
+        limit = max(1, min(int(params.get('limit', DEFAULT_LIMIT)), MAX_LIMIT))  # LIMIT -1 wäre in SQLite unbegrenzt
+        offset = max(int(params.get('offset', 0)), 0)
+    except ValueError:
+        raise HttpError(400, "limit und offset müssen Zahlen sein")
+
+    total = conn.execute(f"SELECT COUNT(*) FROM dokumente{where}", values).fetchone()[0]
+    rows = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM dokumente{where} ORDER BY {sort} {direction}, id LIMIT ? OFFSET ?",
+                        values + [limit, offset]).fetchall()
+    return {'gesamt': total, 'limit': limit, 'offset': offset, 'dokumente': [row_to_dict(row) for row in rows]}
+
+def get_document(conn, doc_id):
+    row = conn.execute(f"SELECT {', '.join(COLUMNS)} FROM dokumente WHERE id=?", (doc_id,)).fetchone()
+    if row is None:
+        raise HttpError(404, f"Dokument {doc_id} nicht gefunden")
+    return row_to_dict(row)
+
+class DocumentServer:
+    """
+    Schreibgeschützte HTTP/JSON-Schnittstelle auf die Tabelle dokumente.
+
+    GET /dokumente?q=&kategorie=&autor=&sort=&order=&limit=&offset=  Suche und Filter
+    GET /dokumente/<id>                                              Ein Dokument
+    GET /dokumente/<id>/datei                                        Die Datei des Dokuments
+    """
+    def __init__(self, database_file, pool_size=POOL_SIZE, access_log=True):
+        self.pool = ReadOnlyPool(database_file, pool_size)
+        self.access_log = access_log
+        self.file_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='datei')
+
+    async def handle_client(self, reader, writer):
+        """ Bearbeitet die Anfragen einer Verbindung, solange der Client sie offen hält (Keep-Alive). """
+        try:
+            while True:
+                try:
+                    request_line = await asyncio.wait_for(reader.readline(), KEEP_ALIVE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    break
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                keep_alive = await self.handle_request(request_line.decode('latin-1'), headers, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_request(self, request_line, headers, writer):
+        """
+        Bearbeitet eine einzelne Anfrage.
+
+        :return: True, wenn die Verbindung für weitere Anfragen offen bleiben soll.
+        """
+        started = time.perf_counter()
+        parts = request_line.split()
+        version = parts[2] if len(parts) == 3 else 'HTTP/1.0'
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+        status = 500
+        try:
+            if len(parts) != 3:
+                raise HttpError(400, "Ungültige Anfragezeile")
+            method, target = parts[0], parts[1]
+            if method not in ('GET', 'HEAD'):
+                raise HttpError(405, f"Methode {method} wird nicht unterstützt")
+            status = await self.route(method, urlsplit(target), headers, writer, keep_alive)
+        except HttpError as e:
+            status = e.status
+            self.send_json(writer, e.status, {'fehler': e.message}, keep_alive)
+        except ConnectionError:
+            raise
+        except Exception as e:
+            status = 500
+            self.send_json(writer, 500, {'fehler': str(e)}, keep_alive)
+        if self.access_log:
+            print(f"{request_line.strip()} {status} {(time.perf_counter() - started) * 1000:.1f} ms")
+        return keep_alive
+
+    async def route(self, method, url, headers, writer, keep_alive):
+        segments = [segment for segment in url.path.split('/') if segment]
+        if not segments or segments[0] != 'dokumente' or len(segments) > 3:
+            raise HttpError(404, "Unbekannter Pfad")
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+
+        if len(segments) == 1:
+            return await self.send_cached_json(method, writer, headers, keep_alive, url.query, search_documents, params)
+        try:
+            doc_id = int(segments[1])
+        except ValueError:
+            raise HttpError(404, "Ungültige Dokument-ID")
+        if len(segments) == 2:
+            return await self.send_cached_json(method, writer, headers, keep_alive, str(doc_id), get_document, doc_id)
+        if segments[2] == 'datei':
+            return await self.send_file(method, writer, headers, keep_alive, doc_id)
+        raise HttpError(404, "Unbekannter Pfad")
+
+    async def send_cached_json(self, method, writer, headers, keep_alive, cache_key, function, *args):
+        """
+        Sendet das Ergebnis einer Abfrage als JSON. Das ETag setzt sich aus dem Stand des Änderungsprotokolls
+        und der Anfrage zusammen; stimmt es mit If-None-Match überein, entfällt die eigentliche Abfrage.
+        """
+        version = await self.pool.run(get_change_version)
+        etag = '"' + hashlib.blake2b(f"{version}:{cache_key}".encode(), digest_size=8).hexdigest() + '"'
+        if etag in headers.get('if-none-match', ''):
+            self.send_head(writer, 304, {'ETag': etag}, keep_alive)
+            return 304
+        body = json.dumps(await self.pool.run(function, *args), ensure_ascii=False).encode('utf-8')
+        self.send_head(writer, 200, {'Content-Type': 'application/json; charset=utf-8', 'Content-Length': len(body),
+                                     'ETag': etag, 'Cache-Control': 'no-cache'}, keep_alive)
+        if method == 'GET':
+            writer.write(body)
+        return 200
+
+    async def send_file(self, method, writer, headers, keep_alive, doc_id):
+        """ Liefert die Datei eines Dokuments in Blöcken aus, ohne sie vollständig in den Speicher zu laden. """
+        link = (await self.pool.run(get_document, doc_id))['link']
+        loop = asyncio.get_running_loop()
+        try:
+            stat = await loop.run_in_executor(self.file_executor, os.stat, link)
+        except OSError:
+            raise HttpError(404, "Die Datei des Dokuments existiert nicht")
+        etag = f'"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+        if etag in headers.get('if-none-match', ''):
+            self.send_head(writer, 304, {'ETag': etag}, keep_alive)
+            return 304
+
+        content_type = mimetypes.guess_type(link)[0] or 'application/octet-stream'
+        file = await loop.run_in_executor(self.file_executor, open, link, 'rb')
+        try:
+            self.send_head(writer, 200, {'Content-Type': content_type, 'Content-Length': stat.st_size, 'ETag': etag,
+                                         'Content-Disposition': f'inline; filename="{os.path.basename(link)}"'}, keep_alive)
+            if method == 'GET':
+                while True:
+                    try:
+                        chunk = await loop.run_in_executor(self.file_executor, file.read, CHUNK_SIZE)
+                    except OSError as e:
+                        # Die Kopfzeilen sind bereits gesendet, daher bleibt nur das Schließen der Verbindung
+                        raise ConnectionAbortedError(f"Lesefehler in {link}: {e}")
+                    if not chunk:
+                        break
+                    writer.write(chunk)
+                    await writer.drain()  # Gegendruck: erst weiterlesen, wenn der Client die Daten abgenommen hat
+        finally:
+            file.close()
+        return 200
+
+    def send_head(self, writer, status, headers, keep_alive):
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}"]
+        headers = dict(headers, Connection='keep-alive' if keep_alive else 'close')
+        if status == 304:
+            headers.setdefault('Content-Length', 0)
+        lines += [f"{name}: {value}" for name, value in headers.items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1', 'replace'))
+
+    def send_json(self, writer, status, data, keep_alive):
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_head(writer, status, {'Content-Type': 'application/json; charset=utf-8', 'Content-Length': len(body)}, keep_alive)
+        writer.write(body)
+
+    async def serve(self, host, port):
+        server = await asyncio.start_server(self.handle_client, host, port, backlog=1024)
+        print(f"Dokumentenserver läuft auf http://{host}:{port}/dokumente")
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.pool.close()
+        self.file_executor.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Schreibgeschützte HTTP/JSON-Schnittstelle der Dokumentenverwaltung")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--database', default=config.get_config()['database'])
+    parser.add_argument('--pool-size', type=int, default=POOL_SIZE)
+    parser.add_argument('--quiet', action='store_true', help="Keine Ausgabe je Anfrage")
+    args = parser.parse_args()
+
+    if not os.path.isfile(args.database):
+        parser.error(f"Die Datenbank '{args.database}' existiert nicht.")
+    document_server = DocumentServer(args.database, args.pool_size, access_log=not args.quiet)
+    try:
+        asyncio.run(document_server.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        document_server.close()
+
+if __name__ == "__main__":
+    main()
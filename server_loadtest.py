@@ -0,0 +1,87 @@
+# server_loadtest.py
+import argparse
+import asyncio
+import statistics
+import time
+
+DEFAULT_PATHS = ['/dokumente?limit=50', '/dokumente?sort=erstelldatum&order=desc&limit=20', '/dokumente/1']
+
+async def request(reader, writer, host, path, etag=None):
+    """
+    Sendet eine GET-Anfrage über eine bestehende Keep-Alive-Verbindung und liest die Antwort vollständig.
+
+    :return: Statuscode, ETag und Anzahl der empfangenen Bytes.
+    """
+    lines = [f"GET {path} HTTP/1.1", f"Host: {host}"]
+    if etag:
+        lines.append(f"If-None-Match: {etag}")
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get('content-length', 0))
+    received = 0
+    while received < length:
+        chunk = await reader.read(min(length - received, 256 * 1024))
+        if not chunk:
+            raise ConnectionError("Verbindung vorzeitig geschlossen")
+        received += len(chunk)
+    return status, headers.get('etag'), received
+
+async def client(host, port, paths, requests, conditional, latencies, statuses):
+    """ Ein Client mit eigener Verbindung, der nacheinander die angegebene Anzahl von Anfragen sendet. """
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        for number in range(requests):
+            path = paths[number % len(paths)]
+            started = time.perf_counter()
+            status, etag, _ = await request(reader, writer, host, path, etags.get(path) if conditional else None)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+            if etag:
+                etags[path] = etag
+    finally:
+        writer.close()
+
+async def run(host, port, concurrency, requests, paths, conditional):
+    latencies, statuses = [], {}
+    started = time.perf_counter()
+    results = await asyncio.gather(*(client(host, port, paths, requests, conditional, latencies, statuses)
+                                     for _ in range(concurrency)), return_exceptions=True)
+    elapsed = time.perf_counter() - started
+    errors = [result for result in results if isinstance(result, Exception)]
+
+    latencies.sort()
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+
+    print(f"{len(latencies)} Anfragen über {concurrency} Verbindungen in {elapsed:.2f} s "
+          f"({len(latencies) / elapsed:.0f} Anfragen/s), {len(errors)} Verbindungsfehler")
+    print(f"Statuscodes: {dict(sorted(statuses.items()))}")
+    if latencies:
+        print(f"Latenz: Mittel {statistics.mean(latencies) * 1000:.1f} ms, p50 {percentile(0.5):.1f} ms, "
+              f"p95 {percentile(0.95):.1f} ms, p99 {percentile(0.99):.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+    for error in errors[:5]:
+        print(f"Fehler: {error!r}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Lasttest für den Dokumentenserver (server.py)")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--concurrency', type=int, default=200, help="Anzahl gleichzeitiger Verbindungen")
+    parser.add_argument('--requests', type=int, default=50, help="Anfragen je Verbindung")
+    parser.add_argument('--conditional', action='store_true', help="If-None-Match mit dem zuletzt erhaltenen ETag senden")
+    parser.add_argument('paths', nargs='*', default=DEFAULT_PATHS)
+    args = parser.parse_args()
+    asyncio.run(run(args.host, args.port, args.concurrency, args.requests, args.paths, args.conditional))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+import database
+import ingestion
+
+SETTINGS = {'io_workers': 2, 'extract_workers': 0, 'batch_ms': 50}
+
+class IngestionPipelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.directory.name, 'Finanzen')
+        os.makedirs(self.folder)
+        self.db_name = os.path.join(self.directory.name, 'test.db')
+        # Die Hintergrund-Threads dürfen keine Dialoge öffnen, da Tk nicht threadsicher ist
+        patcher = mock.patch.object(database, 'messagebox')
+        dialogs = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(dialogs.showerror.assert_not_called)
+        self.addCleanup(self.directory.cleanup)
+
+    def create_files(self, count):
+        for number in range(count):
+            with open(os.path.join(self.folder, f"scan_{number:04d}.txt"), 'w') as file:
+                file.write(f"Inhalt {number}")
+
+    def test_normal_completion(self):
+        self.create_files(20)
+        database.create_table(self.db_name)
+        pipeline = ingestion.IngestionPipeline(['.txt'], SETTINGS, self.db_name)
+        pipeline.start(sources=[('Finanzen', self.folder)])
+        pipeline.join(10)
+        self.assertFalse(pipeline.is_running())
+        self.assertIsNone(pipeline.error)
+        self.assertEqual(len(pipeline.inserted_ids), 20)
+        self.assertEqual(len(database.load_all_links(self.db_name)), 20)
+
+    def test_cancel_during_scan(self):
+        self.create_files(2000)
+        database.create_table(self.db_name)
+        # Kleine Warteschlangen, damit die Suche beim Abbruch noch blockiert
+        pipeline = ingestion.IngestionPipeline(['.txt'], dict(SETTINGS, queue_size=2), self.db_name)
+        pipeline.start(sources=[('Finanzen', self.folder)])
+        pipeline.cancel()
+        pipeline.join(5)
+        self.assertFalse(pipeline.is_running())
+
+    def test_database_cannot_be_opened(self):
+        self.create_files(5)
+        # Ein Ordner lässt sich nicht als Datenbank öffnen
+        pipeline = ingestion.IngestionPipeline(['.txt'], SETTINGS, self.folder)
+        pipeline.start(sources=[('Finanzen', self.folder)])
+        pipeline.join(5)
+        self.assertFalse(pipeline.is_running())
+        self.assertIsNotNone(pipeline.error)
+        self.assertEqual(pipeline.inserted_ids, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+import config
+import database
+
+DOCUMENTS = [
+    ('Rechnung Strom', 'Finanzen', '2', '01.02.2024', '/a/strom.pdf', 'Meier'),
+    ('Rechnung Gas', 'Finanzen', '1', '03.02.2024', '/a/gas.pdf', 'Meier'),
+    ('Mietvertrag', 'Wohnen', '1-12', '01.01.2020', '/a/miete.pdf', 'Schulz'),
+]
+
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db_name = os.path.join(self.directory.name, 'test.db')
+        patcher = mock.patch.object(config, 'get_config', return_value={'database': self.db_name})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(database, 'messagebox')
+        dialogs = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(dialogs.showerror.assert_not_called)
+        database.create_table()
+        with sqlite3.connect(self.db_name) as conn:
+            conn.executemany("INSERT INTO dokumente (beschreibung, kategorie, seitenzahl, erstelldatum, link, autor) "
+                             "VALUES (?, ?, ?, ?, ?, ?)", DOCUMENTS)
+        conn.close()
+
+    def documents(self):
+        conn = sqlite3.connect(self.db_name)
+        try:
+            return {row[0]: row[1:] for row in conn.execute("SELECT * FROM dokumente ORDER BY id")}
+        finally:
+            conn.close()
+
+    def test_update_undo_redo_round_trip(self):
+        before = self.documents()
+        operation_id = database.update_multiple_documents([1, 2], {'autor': 'Neu'})
+        self.assertIsNotNone(operation_id)
+        after = self.documents()
+        self.assertEqual([after[1][5], after[2][5], after[3][5]], ['Neu', 'Neu', 'Schulz'])
+
+        self.assertEqual(database.switch_operation(undo=True), (database.load_journal()[0][2], 0))
+        self.assertEqual(self.documents(), before)
+        self.assertEqual(database.switch_operation(undo=False)[1], 0)
+        self.assertEqual(self.documents(), after)
+
+    def test_only_changed_columns_are_recorded(self):
+        # Dokument 3 hat den Wert bereits und erhält kein Delta
+        database.update_multiple_documents([1, 2, 3], {'kategorie': 'Wohnen', 'autor': 'Schulz'})
+        conn = sqlite3.connect(self.db_name)
+        try:
+            deltas = conn.execute("SELECT dokument_id, vorher FROM journal_deltas ORDER BY dokument_id").fetchall()
+        finally:
+            conn.close()
+        self.assertEqual(deltas, [(1, '{"kategorie": "Finanzen", "autor": "Meier"}'),
+                                  (2, '{"kategorie": "Finanzen", "autor": "Meier"}')])
+        self.assertIsNone(database.update_multiple_documents([3], {'autor': 'Schulz'}))
+        self.assertEqual(len(database.load_journal()), 1)
+
+    def test_undo_delete_restores_rows_and_tags(self):
+        before = self.documents()
+        database.add_tags([1, 3], ['Übersicht', 'Steuer'])
+        database.delete_documents([1, 3])
+        self.assertEqual(list(self.documents()), [2])
+        self.assertEqual(database.switch_operation(undo=True)[1], 0)
+        self.assertEqual(self.documents(), before)
+        self.assertEqual(database.find_documents_by_tags(['übersicht', 'steuer']), {1, 3})
+        self.assertEqual(database.switch_operation(undo=False)[1], 0)
+        self.assertEqual(list(self.documents()), [2])
+
+    def test_conflicting_change_refuses_undo(self):
+        database.update_multiple_documents([1, 2], {'autor': 'Neu'})
+        # Eine andere Instanz ändert eines der Dokumente ohne Journal
+        with sqlite3.connect(self.db_name) as conn:
+            conn.execute("UPDATE dokumente SET autor = 'Anders' WHERE id = 2")
+        conn.close()
+        changed = self.documents()
+        beschreibung, conflicts = database.switch_operation(undo=True)
+        self.assertIsNotNone(beschreibung)
+        self.assertEqual(conflicts, 1)
+        self.assertEqual(self.documents(), changed)
+        self.assertIsNone(database.load_journal()[0][4])
+
+    def test_new_operation_drops_redo(self):
+        database.update_multiple_documents([1], {'autor': 'Neu'})
+        database.switch_operation(undo=True)
+        database.update_multiple_documents([2], {'seitenzahl': '3'})
+        self.assertEqual(database.switch_operation(undo=False), (None, 0))
+        self.assertEqual(len(database.load_journal()), 1)
+        self.assertEqual(self.documents()[1][5], 'Meier')
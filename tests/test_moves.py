@@ -0,0 +1,57 @@
+import unittest
+import moves
+
+class Record:
+    """ Eine neu gefundene Datei mit denselben Merkmalen wie ingestion.FileRecord. """
+    def __init__(self, path, size, mtime_ns, device=1, inode=None, fingerprint=None):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.device = device
+        self.inode = inode
+        self.fingerprint = fingerprint
+
+def vanished(doc_id, link, size=100, mtime_ns=5, device=1, inode=None, fingerprint=None):
+    return moves.VanishedDocument(doc_id, link, size, mtime_ns, device, inode, fingerprint)
+
+class MoveDetectorTest(unittest.TestCase):
+    def test_inode_match(self):
+        detector = moves.MoveDetector([vanished(1, '/a/alt.pdf', inode=42, fingerprint='f1')])
+        document = detector.match(Record('/a/neu.pdf', 100, 9, inode=42, fingerprint='f1'))
+        self.assertEqual(document.doc_id, 1)
+        self.assertEqual(len(detector), 0)
+
+    def test_reused_inode_with_other_content_is_rejected(self):
+        detector = moves.MoveDetector([vanished(1, '/a/alt.pdf', inode=42, fingerprint='f1')])
+        self.assertIsNone(detector.match(Record('/a/neu.pdf', 100, 9, inode=42, fingerprint='f2')))
+
+    def test_fingerprint_match(self):
+        detector = moves.MoveDetector([vanished(1, '/a/alt.pdf', inode=7, fingerprint='f1')])
+        self.assertEqual(detector.match(Record('/b/neu.pdf', 100, 9, device=2, inode=8, fingerprint='f1')).doc_id, 1)
+
+    def test_each_document_is_matched_once(self):
+        detector = moves.MoveDetector([vanished(1, '/a/alt.pdf', fingerprint='f1')])
+        self.assertIsNotNone(detector.match(Record('/b/eins.pdf', 100, 5, fingerprint='f1')))
+        self.assertIsNone(detector.match(Record('/b/zwei.pdf', 100, 5, fingerprint='f1')))
+
+    def test_copies_are_told_apart_by_size_and_mtime(self):
+        detector = moves.MoveDetector([vanished(1, '/a/kopie1.pdf', mtime_ns=5, fingerprint='f1'),
+                                       vanished(2, '/a/kopie2.pdf', mtime_ns=6, fingerprint='f1')])
+        self.assertEqual(detector.match(Record('/b/kopie.pdf', 100, 6, fingerprint='f1')).doc_id, 2)
+
+    def test_ambiguous_copies_are_not_matched(self):
+        detector = moves.MoveDetector([vanished(1, '/a/kopie1.pdf', fingerprint='f1'),
+                                       vanished(2, '/a/kopie2.pdf', fingerprint='f1')])
+        self.assertIsNone(detector.match(Record('/b/kopie.pdf', 100, 5, fingerprint='f1')))
+
+    def test_size_and_mtime_alone_are_not_enough(self):
+        detector = moves.MoveDetector([vanished(1, '/a/alt.pdf', fingerprint='f1')])
+        self.assertIsNone(detector.match(Record('/b/fremd.pdf', 100, 5, fingerprint='f2')))
+
+    def test_same_name_is_not_enough(self):
+        # Ältere Dokumente ohne Dateimerkmale, Scanner vergeben denselben Namen erneut
+        detector = moves.MoveDetector([vanished(1, '/a/scan_0001.pdf', size=None, mtime_ns=None)])
+        self.assertIsNone(detector.match(Record('/b/scan_0001.pdf', 100, 5, fingerprint='f3')))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+import database
+import watcher
+
+SETTINGS = {'mode': 'poll', 'poll_s': 0.1, 'stable_s': 0.1, 'debounce_s': 0.1, 'max_backoff_s': 0.2}
+
+class FolderWatcherTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.folder = os.path.join(self.directory.name, 'Finanzen')
+        os.makedirs(self.folder)
+        self.db_name = os.path.join(self.directory.name, 'test.db')
+        # Die Hintergrund-Threads dürfen keine Dialoge öffnen, da Tk nicht threadsicher ist
+        patcher = mock.patch.object(database, 'messagebox')
+        dialogs = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(dialogs.showerror.assert_not_called)
+        self.addCleanup(self.directory.cleanup)
+
+    def start_watcher(self):
+        folder_watcher = watcher.FolderWatcher([('Finanzen', self.folder)], ['.txt'], SETTINGS, self.db_name)
+        folder_watcher.start()
+        self.addCleanup(folder_watcher.thread.join, 5)
+        self.addCleanup(folder_watcher.cancel)
+        return folder_watcher
+
+    def wait_for(self, condition, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return condition()
+
+    def test_new_file_is_ingested(self):
+        database.create_table(self.db_name)
+        folder_watcher = self.start_watcher()
+        with open(os.path.join(self.folder, 'scan.txt'), 'w') as file:
+            file.write("Inhalt")
+        self.assertTrue(self.wait_for(lambda: folder_watcher.progress()[1] == 1))
+        self.assertEqual(len(database.load_all_links(self.db_name)), 1)
+
+    def test_survives_unreadable_database(self):
+        # Ohne Tabellen schlägt das Laden der Links fehl wie bei einem getrennten Netzlaufwerk
+        folder_watcher = self.start_watcher()
+        self.assertTrue(self.wait_for(lambda: folder_watcher.progress()[3] is not None))
+        self.assertTrue(folder_watcher.is_running())
+        with open(os.path.join(self.folder, 'scan.txt'), 'w') as file:
+            file.write("Inhalt")
+        database.create_table(self.db_name)
+        self.assertTrue(self.wait_for(lambda: folder_watcher.progress()[1] == 1))
+        self.assertIsNone(folder_watcher.progress()[3])
@@ -0,0 +1,358 @@
+# watcher.py
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+import config
+import database
+import ingestion
+
+# Standardeinstellungen der Ordnerüberwachung, einzeln über den Konfigurationsschlüssel 'watcher' überschreibbar
+DEFAULT_SETTINGS = {
+    'enabled': True,
+    'mode': 'auto',  # 'inotify', 'poll' oder 'auto' (inotify, außer auf Netzlaufwerken und anderen Systemen als Linux)
+    'poll_s': 5.0,  # Abstand, in dem beim Abfragen die Änderungszeitpunkte der Ordner geprüft werden
+    'rescan_s': 300.0,  # Spätestens nach so vielen Sekunden werden die Ordner beim Abfragen vollständig gelesen
+    'stable_s': 2.0,  # So lange müssen Größe und Änderungszeitpunkt einer neuen Datei unverändert sein
+    'debounce_s': 3.0,  # Ruhezeit nach dem letzten Ereignis, bevor ein Stapel eingelesen wird
+    'batch_size': 200,  # Spätestens bei so vielen fertigen Dateien wird eingelesen
+    'ingest_timeout_s': 600.0,  # Höchstens so lange wird auf eine Einlese-Pipeline gewartet
+    'max_backoff_s': 300.0,  # Längste Wartezeit vor einem neuen Versuch nach einem Fehler, z. B. bei getrenntem Netzlaufwerk
+}
+TICK = 0.5  # Sekunden zwischen zwei Prüfungen der wartenden Dateien
+# Dateisysteme, deren Änderungen auf anderen Rechnern inotify nicht meldet
+NETWORK_FILESYSTEMS = {'cifs', 'smb3', 'smbfs', 'nfs', 'nfs4', '9p', 'fuse.sshfs', 'davfs', 'afs'}
+
+# Ereignismasken aus <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_ISDIR = 0x40000000
+IN_ONLYDIR = 0x01000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT_HEADER = struct.Struct('iIII')
+
+def filesystem_type(path):
+    """ Ermittelt unter Linux den Dateisystemtyp eines Pfades aus /proc/mounts, sonst None. """
+    try:
+        with open('/proc/mounts') as mounts:
+            entries = [line.split()[1:3] for line in mounts]
+    except OSError:
+        return None
+    path = os.path.realpath(path)
+    best, fstype = '', None
+    for mount_point, mount_type in entries:
+        mount_point = mount_point.replace('\\040', ' ')
+        if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best):
+            best, fstype = mount_point, mount_type
+    return fstype
+
+class PollingBackend:
+    """
+    Erkennt neue Dateien durch Abfragen: Ein Ordner wird nur dann gelesen, wenn sich sein Änderungszeitpunkt
+    geändert hat, was beim Anlegen, Umbenennen und Löschen von Dateien geschieht. In größeren Abständen werden
+    alle Ordner vollständig gelesen, falls ein Dateisystem den Änderungszeitpunkt zu grob auflöst.
+    """
+    def __init__(self, sources, settings):
+        self.settings = settings
+        self.directories = {}  # Ordner -> [Kategorie, Änderungszeitpunkt, Dateinamen]
+        for category, directory in sources:
+            self.directories[directory] = [category, None, set()]
+            self.read_directory(directory)
+        self.last_poll = time.monotonic()
+        self.last_rescan = self.last_poll
+
+    def read_directory(self, directory):
+        """ Liest einen Ordner neu und liefert die hinzugekommenen Namen sowie, ob Namen verschwunden sind. """
+        state = self.directories[directory]
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            with os.scandir(directory) as entries:
+                names = {entry.name for entry in entries}
+        except OSError:
+            return [], False
+        added, removed = names - state[2], bool(state[2] - names)
+        state[1], state[2] = mtime_ns, names
+        return added, removed
+
+    def poll(self, timeout, cancelled):
+        """
+        :return: Ein Tupel (Paare aus Pfad und Kategorie neuer Dateien, ob Dateien verschwunden sind, ob vollständig neu gelesen werden muss).
+        """
+        now = time.monotonic()
+        if now - self.last_poll < self.settings['poll_s']:
+            cancelled.wait(timeout)
+            return [], False, False
+        self.last_poll = now
+        rescan = now - self.last_rescan >= self.settings['rescan_s']
+        if rescan:
+            self.last_rescan = now
+        added, removed = [], False
+        for directory, state in self.directories.items():
+            if not rescan:
+                try:
+                    if os.stat(directory).st_mtime_ns == state[1]:
+                        continue
+                except OSError:
+                    continue
+            names, directory_removed = self.read_directory(directory)
+            added += [(os.path.join(directory, name), state[0]) for name in names]
+            removed = removed or directory_removed
+        return added, removed, False
+
+    def close(self):
+        pass
+
+class InotifyBackend:
+    """ Erhält neue Dateien unter Linux als Ereignisse des Kernels über inotify, ohne die Ordner abzufragen. """
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_MOVED_FROM | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+    def __init__(self, sources):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 fehlgeschlagen")
+        self.watches = {}  # Watch-Deskriptor -> (Ordner, Kategorie)
+        for category, directory in sources:
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                self.close()
+                raise OSError(error, f"Ordner {directory} kann nicht überwacht werden: {os.strerror(error)}")
+            self.watches[wd] = (directory, category)
+
+    def poll(self, timeout, cancelled):
+        """
+        :return: Ein Tupel (Paare aus Pfad und Kategorie neuer Dateien, ob Dateien verschwunden sind, ob vollständig neu gelesen werden muss).
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return [], False, False
+        try:
+            buffer = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False, False
+        added, removed, rescan = [], False, False
+        offset = 0
+        while offset + EVENT_HEADER.size <= len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            name = buffer[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b'\0')
+            offset += EVENT_HEADER.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Ereignisse sind verloren gegangen, die Ordner müssen gelesen werden
+                rescan = True
+            elif mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                directory, _ = self.watches.pop(wd, (None, None))
+                print(f"Überwachter Ordner {directory} wurde entfernt oder verschoben.")
+            elif mask & (IN_MOVED_FROM | IN_DELETE):
+                removed = True
+            elif wd in self.watches and not mask & IN_ISDIR:
+                directory, category = self.watches[wd]
+                added.append((os.path.join(directory, os.fsdecode(name)), category))
+        return added, removed, rescan
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+class FolderWatcher:
+    """
+    Überwacht die Kategorieordner einer Bibliothek und liest neue Dateien ein, sobald sie vollständig geschrieben sind,
+    z. B. die Dateien eines Scanners. Neue Dateien werden gesammelt, bis ihre Größe unverändert bleibt und nach dem
+    letzten Ereignis eine kurze Ruhezeit vergangen ist, und dann als Stapel durch die Einlese-Pipeline geschickt.
+    Die Ansicht übernimmt die neuen Dokumente über den Abgleich mit dem Änderungsprotokoll.
+    """
+    def __init__(self, sources, extensions, settings=None, db_name=None, after=None):
+        """
+        :param sources: Paare aus Kategorie und Ordner, die überwacht werden sollen.
+        :param extensions: Die gültigen Dateiendungen.
+        :param settings: Abweichende Einstellungen, siehe DEFAULT_SETTINGS.
+        :param db_name: Die Datenbankdatei der Bibliothek, standardmäßig die der aktiven Bibliothek.
+        :param after: Optional eine laufende Einlese-Pipeline, deren Ende vor dem ersten Abgleich abgewartet wird.
+        """
+        self.sources = [(category, directory) for category, directory in sources if os.path.isdir(directory)]
+        self.extensions = config.suffix_set(extensions)
+        self.settings = dict(DEFAULT_SETTINGS, **(settings or {}))
+        self.db_name = db_name
+        self.after = after
+        self.cancelled = threading.Event()
+        self.thread = None
+        self.lock = threading.Lock()
+        self.mode = None
+        self.pending = {}  # Pfad -> [Kategorie, Größe, Änderungszeitpunkt, unverändert seit]
+        self.ready = []
+        self.last_event = 0.0
+        self.removal_seen = False
+        self.ingested = 0
+        self.batches = 0
+        self.catch_up = True  # Die Ordner müssen vollständig mit der Datenbank abgeglichen werden
+        self.last_error = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='ordnerueberwachung', daemon=True)
+        self.thread.start()
+
+    def is_running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cancel(self):
+        self.cancelled.set()
+
+    def progress(self):
+        """ :return: Ein Tupel (wartende Dateien, eingelesene Dateien, eingelesene Stapel, letzter Fehler oder None). """
+        with self.lock:
+            return len(self.pending) + len(self.ready), self.ingested, self.batches, self.last_error
+
+    def create_backend(self):
+        """ Wählt inotify, wo es Änderungen zuverlässig meldet, sonst das Abfragen der Änderungszeitpunkte. """
+        mode = self.settings['mode']
+        if mode == 'auto':
+            local = sys.platform.startswith('linux') and not any(
+                filesystem_type(directory) in NETWORK_FILESYSTEMS for _, directory in self.sources)
+            mode = 'inotify' if local else 'poll'
+        if mode == 'inotify':
+            try:
+                backend = InotifyBackend(self.sources)
+                self.mode = 'inotify'
+                return backend
+            except (OSError, AttributeError) as e:
+                print(f"Ordnerüberwachung: inotify nicht verfügbar ({e}), Ordner werden abgefragt.")
+        self.mode = 'poll'
+        return PollingBackend(self.sources, self.settings)
+
+    def run(self):
+        if not self.sources:
+            return
+        if self.after is not None:
+            self.wait_for_pipeline(self.after)
+        backend = self.create_backend()
+        print(f"Ordnerüberwachung ({self.mode}) für {len(self.sources)} Ordner gestartet.")
+        backoff = 0.0
+        try:
+            while not self.cancelled.is_set():
+                try:
+                    self.step(backend)
+                    backoff = 0.0
+                except Exception as e:
+                    if self.cancelled.is_set():
+                        break
+                    # Z. B. ein kurzzeitig getrenntes Netzlaufwerk: mit wachsender Wartezeit erneut versuchen
+                    backoff = min(max(2 * backoff, self.settings['poll_s']), self.settings['max_backoff_s'])
+                    with self.lock:
+                        self.last_error = str(e)
+                    print(f"Ordnerüberwachung: {e}; neuer Versuch in {backoff:.0f} s")
+                    self.cancelled.wait(backoff)
+        finally:
+            backend.close()
+
+    def step(self, backend):
+        """ Ein Durchlauf: Ereignisse abholen, wartende Dateien prüfen und fertige Dateien einlesen. """
+        if self.catch_up:
+            # Dateien, die seit dem Einlesen beim Start oder während eines Fehlers hinzugekommen sind
+            self.queue_unknown_files()
+            self.catch_up = False
+        added, removed, rescan = backend.poll(TICK, self.cancelled)
+        now = time.monotonic()
+        for path, category in added:
+            if database.file_is_valid(path, self.extensions):
+                with self.lock:
+                    self.pending.setdefault(path, [category, None, None, now])
+                self.last_event = now
+        self.removal_seen = self.removal_seen or removed
+        self.catch_up = rescan
+        self.check_pending(now)
+        if self.ready and (now - self.last_event >= self.settings['debounce_s'] or len(self.ready) >= self.settings['batch_size']):
+            self.ingest()
+        with self.lock:
+            self.last_error = None
+
+    def wait_for_pipeline(self, pipeline):
+        """
+        Wartet auf das Ende einer Einlese-Pipeline, höchstens ingest_timeout_s Sekunden.
+
+        :return: True, wenn die Pipeline beendet ist.
+        """
+        deadline = time.monotonic() + self.settings['ingest_timeout_s']
+        while pipeline.is_running() and not self.cancelled.is_set():
+            if time.monotonic() >= deadline:
+                print(f"Ordnerüberwachung: Die Einlese-Pipeline ist nach {self.settings['ingest_timeout_s']:.0f} s nicht beendet.")
+                return False
+            pipeline.join(TICK)
+        return not pipeline.is_running()
+
+    def queue_unknown_files(self):
+        """ Nimmt alle Dateien der überwachten Ordner, die noch nicht in der Datenbank sind, in die Warteliste auf. """
+        known_links = database.load_all_links(self.db_name)
+        if known_links is None:
+            raise OSError(f"Die Datenbank {self.db_name or ''} konnte nicht gelesen werden")
+        now = time.monotonic()
+        for category, directory in self.sources:
+            try:
+                with os.scandir(directory) as entries:
+                    paths = [entry.path for entry in entries if entry.path not in known_links
+                             and database.file_is_valid(entry.path, self.extensions) and entry.is_file()]
+            except OSError as e:
+                print(f"Ordner {directory} konnte nicht gelesen werden: {e}")
+                continue
+            with self.lock:
+                for path in paths:
+                    self.pending.setdefault(path, [category, None, None, now])
+            if paths:
+                self.last_event = now
+
+    def check_pending(self, now):
+        """ Verschiebt Dateien, deren Größe und Änderungszeitpunkt lange genug unverändert sind, in den nächsten Stapel. """
+        for path, state in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except OSError:
+                # Inzwischen gelöscht oder umbenannt, der neue Name kommt als eigenes Ereignis
+                with self.lock:
+                    del self.pending[path]
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (state[1], state[2]):
+                state[1], state[2], state[3] = stat.st_size, stat.st_mtime_ns, now
+            elif stat.st_size > 0 and now - state[3] >= self.settings['stable_s']:
+                with self.lock:
+                    del self.pending[path]
+                    self.ready.append((path, state[0]))
+
+    def ingest(self):
+        """ Liest die fertigen Dateien mit der Einlese-Pipeline als einen Stapel ein. """
+        with self.lock:
+            batch, self.ready = self.ready, []
+        settings = dict(config.get_config().get('ingestion') or {})
+        # Verschobene Dateien nur suchen, wenn seit dem letzten Stapel Dateien verschwunden sind, da dafür alle
+        # Dokumente geprüft werden; für wenige Dateien lohnt sich kein Prozesspool
+        settings['detect_moves'] = settings.get('detect_moves', True) and self.removal_seen
+        if len(batch) < 8:
+            settings['extract_workers'] = 0
+        self.removal_seen = False
+        pipeline = ingestion.IngestionPipeline(self.extensions, settings, self.db_name)
+        pipeline.start(files=batch)
+        if not self.wait_for_pipeline(pipeline):
+            pipeline.cancel()
+            pipeline.join(5)
+        if pipeline.error is not None or pipeline.cancelled.is_set():
+            # Der Stapel wird beim nächsten Versuch erneut eingelesen, bereits eingefügte Links werden übersprungen
+            with self.lock:
+                self.ready = batch + self.ready
+            self.removal_seen = self.removal_seen or settings['detect_moves']
+            raise RuntimeError(pipeline.error or "Das Einlesen wurde abgebrochen")
+        inserted = pipeline.inserted_ids
+        with self.lock:
+            self.ingested += len(inserted) + len(pipeline.relinked)
+            self.batches += 1
+        print(f"Ordnerüberwachung: {len(inserted)} neue Dateien eingelesen, "
+              f"{len(pipeline.relinked)} verschobene Dateien zugeordnet.")